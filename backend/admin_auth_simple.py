@@ -2,10 +2,12 @@
 import secrets
 from datetime import datetime, timedelta
 from fastapi import HTTPException, Header
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from .database import SessionLocal
+from .async_database import AsyncSessionLocal
 from .models import AdminSession, User
 
 SESSION_TTL_MINUTES = 120  # change via env if desired
@@ -33,29 +35,40 @@ def get_session(token: str) -> Optional[AdminSession]:
     finally:
         db.close()
 
-def require_admin_session(Authorization: Optional[str] = Header(default=None)) -> dict:
+async def require_admin_session(Authorization: Optional[str] = Header(default=None)) -> dict:
+    # async: every admin request runs this, so keep it off the threadpool
     if not Authorization or not Authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Missing bearer token")
     token = Authorization.split(" ", 1)[1].strip()
-    sess = get_session(token)
-    if not sess:
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            select(AdminSession.expires_at, User.id, User.username, User.is_admin)
+            .outerjoin(User, User.id == AdminSession.user_id)
+            .where(AdminSession.token == token)
+        )).first()
+    if not row:
         raise HTTPException(status_code=401, detail="Invalid admin session")
-    if sess.expires_at <= _now_utc():
+    expires_at, user_id, username, is_admin = row
+    if expires_at <= _now_utc():
         raise HTTPException(status_code=401, detail="Admin session expired")
     # Optional: verify user still admin
+    if user_id is None or not is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges revoked")
+    return {"user_id": user_id, "username": username}
+
+def revoke_admin_session(token: str):
     db = SessionLocal()
     try:
-        user = db.query(User).filter(User.id == sess.user_id).first()
-        if not user or not user.is_admin:
-            raise HTTPException(status_code=403, detail="Admin privileges revoked")
-        return {"user_id": user.id, "username": user.username}
+        db.query(AdminSession).filter(AdminSession.token == token).delete()
+        db.commit()
     finally:
         db.close()
 
-def revoke_admin_session(token: str):
+def purge_expired_sessions() -> int:
     db = SessionLocal()
     try:
-        db.query(AdminSession).filter(AdminSession.token == token).delete()
+        n = db.query(AdminSession).filter(AdminSession.expires_at <= _now_utc()).delete(synchronize_session=False)
         db.commit()
+        return n
     finally:
         db.close()
@@ -1,11 +1,20 @@
 # backend/admin_routes.py
 from fastapi import APIRouter, Depends, HTTPException, Body, Header
-from sqlalchemy import func, desc, text
-from datetime import datetime, timedelta
+from sqlalchemy import func, text
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .database import SessionLocal
-from .models import User, Article, Topic, ArticleTopic, Sentiment
+from .database import SessionLocal, engine
+from .async_database import get_async_read_db
+from .db_routing import read_session, router as db_router
+from .models import GeocodeCache
 from .auth_service import login_user
+from .near_dup import cluster_stats
+from .hydrate_fulltext import hydration_progress
+from .enrich_worker import enrichment_backlog
+from .scheduler import scheduler_status
+from .prefetch import prefetch_stats
+from .partitioning import partition_status
+from . import geocode_cache, lean_queries as lean, related, rollups, topic_cache
 from .admin_auth_simple import (
     create_admin_session,
     require_admin_session,
@@ -49,132 +58,132 @@ def admin_me(claims: dict = Depends(require_admin_session)):
     return {"user_id": claims["user_id"], "username": claims["username"]}
 
 @router.get("/users")
-def list_users(_claims: dict = Depends(require_admin_session)):
-    db = SessionLocal()
-    try:
-        rows = db.query(User).order_by(User.created_at.desc()).limit(200).all()
-        return [
-            {
-                "id": u.id,
-                "username": u.username,
-                "email": u.email,
-                "is_admin": bool(u.is_admin),
-                "created_at": u.created_at.isoformat() if u.created_at else None,
-            }
-            for u in rows
-        ]
-    finally:
-        db.close()
+async def list_users(_claims: dict = Depends(require_admin_session), db: AsyncSession = Depends(get_async_read_db)):
+    rows = await db.execute(lean.recent_users(200))
+    return [
+        {
+            "id": uid,
+            "username": username,
+            "email": email,
+            "is_admin": bool(is_admin),
+            "created_at": created_at.isoformat() if created_at else None,
+        }
+        for uid, username, email, is_admin, created_at in rows
+    ]
 
 @router.get("/stats/trend")
-def admin_trend(days: int = 30, _claims: dict = Depends(require_admin_session)):
-    db = SessionLocal()
-    try:
-        since = datetime.utcnow() - timedelta(days=days)
-        points = (
-            db.query(
-                func.date(Article.published_at).label("date"),
-                Topic.name.label("topic"),
-                func.count(Article.id).label("topic_count"),
-                func.avg(Sentiment.sentiment).label("avg_sentiment"),
-            )
-            .join(ArticleTopic, ArticleTopic.article_id == Article.id)
-            .join(Topic, Topic.id == ArticleTopic.topic_id)
-            .join(Sentiment, Sentiment.article_id == Article.id)
-            .filter(Article.published_at.isnot(None))
-            .filter(Article.published_at >= since)
-            .group_by(func.date(Article.published_at), Topic.name)
-            .all()
-        )
-
-        sentiment_dist = dict(
-            db.query(Sentiment.sentiment_label, func.count(Sentiment.id))
-              .group_by(Sentiment.sentiment_label)
-              .all()
-        )
-
-        return {
-            "points": [
-                {
-                    "date": str(d),
-                    "topic": topic,
-                    "topic_count": int(cnt or 0),
-                    "avg_sentiment": float(avg or 0.0),
-                }
-                for d, topic, cnt, avg in points
-            ],
-            "sentiment_distribution": sentiment_dist,
-        }
-    finally:
-        db.close()
+async def admin_trend(days: int = 30, _claims: dict = Depends(require_admin_session),
+                      db: AsyncSession = Depends(get_async_read_db)):
+    return {
+        "points": [
+            {k: p[k] for k in ("date", "topic", "topic_count", "avg_sentiment")}
+            for p in await rollups.trend_points(db, days)
+        ],
+        "sentiment_distribution": await rollups.sentiment_counts(db),
+    }
 
 # NEW: insights badges for dashboard (uses same admin session dependency)
 @router.get("/insights")
-def admin_insights(days: int = 30, _claims: dict = Depends(require_admin_session)):
-    db = SessionLocal()
-    try:
-        since = datetime.utcnow() - timedelta(days=days)
-
-        # Sentiment counts over window
-        s_rows = (
-            db.query(Sentiment.sentiment_label, func.count(Sentiment.id))
-            .join(Article, Article.id == Sentiment.article_id)
-            .filter(Article.published_at.isnot(None))
-            .filter(Article.published_at >= since)
-            .group_by(Sentiment.sentiment_label)
-            .all()
-        )
-        sentiment_counts = {label: int(c) for label, c in s_rows}
-
-        # Topic counts over window
-        t_rows = (
-            db.query(Topic.name, func.count(ArticleTopic.article_id))
-            .join(ArticleTopic, Topic.id == ArticleTopic.topic_id)
-            .join(Article, Article.id == ArticleTopic.article_id)
-            .filter(Article.published_at.isnot(None))
-            .filter(Article.published_at >= since)
-            .group_by(Topic.name)
-            .all()
-        )
-        topic_counts = {name: int(c) for name, c in t_rows}
-
-        dominant_sentiment = (
-            max(sentiment_counts, key=sentiment_counts.get) if sentiment_counts else None
-        )
-        hot_topic = max(topic_counts, key=topic_counts.get) if topic_counts else None
-
-        return {
-            "window_days": days,
-            "dominant_sentiment": dominant_sentiment,
-            "hot_topic": hot_topic,
-            "sentiment_counts": sentiment_counts,
-            "topic_counts": topic_counts,
-        }
-    finally:
-        db.close()
+async def admin_insights(days: int = 30, _claims: dict = Depends(require_admin_session),
+                         db: AsyncSession = Depends(get_async_read_db)):
+    # Sentiment / topic counts over window, from the daily rollups
+    sentiment_counts = await rollups.sentiment_counts(db, days)
+    topic_counts = dict(await rollups.topic_counts(db, days))
+
+    dominant_sentiment = (
+        max(sentiment_counts, key=sentiment_counts.get) if sentiment_counts else None
+    )
+    hot_topic = max(topic_counts, key=topic_counts.get) if topic_counts else None
+
+    return {
+        "window_days": days,
+        "dominant_sentiment": dominant_sentiment,
+        "hot_topic": hot_topic,
+        "sentiment_counts": sentiment_counts,
+        "topic_counts": topic_counts,
+    }
 
 # NEW: sorted top-topic summary for list in UI
 @router.get("/topics/summary")
-def admin_topics_summary(
+async def admin_topics_summary(
     days: int = 30,
     limit: int = 10,
     _claims: dict = Depends(require_admin_session),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
-    db = SessionLocal()
+    return [{"topic": name, "count": cnt} for name, cnt in await rollups.topic_counts(db, days, limit)]
+    
+# NEW: near-duplicate clusters and inference saved by reusing canonical enrichment
+@router.get("/dedupe/stats")
+def admin_dedupe_stats(top: int = 10, _claims: dict = Depends(require_admin_session)):
+    db = read_session()
+    try:
+        return cluster_stats(db, top=top)
+    finally:
+        db.close()
+
+# NEW: full-text hydration progress (rows per hydrate_status; "pending" = not tried yet)
+@router.get("/hydration/stats")
+def admin_hydration_stats(_claims: dict = Depends(require_admin_session)):
+    db = read_session()
     try:
-        since = datetime.utcnow() - timedelta(days=days)
-        rows = (
-            db.query(Topic.name, func.count(ArticleTopic.article_id).label("cnt"))
-            .join(ArticleTopic, Topic.id == ArticleTopic.topic_id)
-            .join(Article, Article.id == ArticleTopic.article_id)
-            .filter(Article.published_at.isnot(None))
-            .filter(Article.published_at >= since)
-            .group_by(Topic.name)
-            .order_by(desc("cnt"))
-            .limit(limit)
-            .all()
-        )
-        return [{"topic": name, "count": int(cnt)} for name, cnt in rows]
+        return hydration_progress(db)
     finally:
         db.close()
-    
\ No newline at end of file
+
+# NEW: geocode cache size and in-process LRU hit ratio
+@router.get("/geocode/stats")
+def admin_geocode_stats(_claims: dict = Depends(require_admin_session)):
+    db = read_session()
+    try:
+        rows = db.query(GeocodeCache.source, func.count(GeocodeCache.key)).group_by(GeocodeCache.source).all()
+        return {"table_entries": {src or "unknown": int(n) for src, n in rows}, **geocode_cache.stats()}
+    finally:
+        db.close()
+
+# NEW: sentiment/topic enrichment backlog (drained by enrich_worker.py)
+@router.get("/enrichment/stats")
+def admin_enrichment_stats(_claims: dict = Depends(require_admin_session)):
+    db = read_session()
+    try:
+        return enrichment_backlog(db)
+    finally:
+        db.close()
+
+# NEW: related-article embeddings stored vs loaded into this process's index
+@router.get("/related/stats")
+def admin_related_stats(_claims: dict = Depends(require_admin_session)):
+    db = read_session()
+    try:
+        return related.index_stats(db)
+    finally:
+        db.close()
+
+# NEW: in-process topic id cache (topic_cache.py)
+@router.get("/topics/cache")
+def admin_topic_cache(_claims: dict = Depends(require_admin_session)):
+    return topic_cache.stats()
+
+# NEW: scheduler leadership and job runs on the node that answers
+@router.get("/scheduler/status")
+def admin_scheduler_status(_claims: dict = Depends(require_admin_session)):
+    return scheduler_status()
+
+# NEW: /news warm-cache hit ratio, overall and per query
+@router.get("/prefetch/stats")
+def admin_prefetch_stats(top: int = 50, _claims: dict = Depends(require_admin_session)):
+    db = read_session()
+    try:
+        return prefetch_stats(db, top=top)
+    finally:
+        db.close()
+
+# NEW: monthly article partitions and retention settings (partitioning.py)
+@router.get("/partitions")
+def admin_partitions(_claims: dict = Depends(require_admin_session)):
+    return partition_status(engine)
+
+# NEW: read-replica health, replay lag and primary fallbacks (db_routing.py)
+@router.get("/db/replicas")
+def admin_db_replicas(_claims: dict = Depends(require_admin_session)):
+    return db_router.status()
@@ -0,0 +1,47 @@
+# backend/async_database.py
+#
+# Async engine (psycopg 3, or aiosqlite with DB_BACKEND=sqlite; same database and pooling strategy as
+# database.py) for the read-heavy API routes, so their throughput is bound
+# by the database rather than by FastAPI's threadpool. Kept apart from
+# database.py so ingestion/worker processes don't need greenlet.
+#
+#   @app.get("/x")
+#   async def x(db: AsyncSession = Depends(get_async_db)):
+#       rows = (await db.execute(select(...))).all()
+#
+# The async pool is separate from the sync one; budget both against the
+# server's connection limit (DB_ASYNC_POOL_SIZE, default 5).
+import os
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from . import pool_metrics
+from .database import ASYNC_DATABASE_URL, IS_SQLITE, _port, configure_sqlite, engine_kwargs
+
+ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "5"))
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_kwargs(_port, ASYNC_POOL_SIZE, 0))
+if IS_SQLITE:
+    configure_sqlite(async_engine.sync_engine)     # aiosqlite; same pragmas as the sync engine
+pool_metrics.instrument(async_engine.sync_engine, "async")
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    db: AsyncSession = AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def get_async_read_db():
+    """Read-only routes: a healthy replica within the lag tolerance, else the primary (db_routing.py)."""
+    from .db_routing import router
+
+    replica = router.pick()
+    db: AsyncSession = AsyncSessionLocal(bind=replica.async_engine) if replica else AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
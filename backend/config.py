@@ -11,7 +11,8 @@ import os
 load_dotenv()
 
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
-BASE_URL = "https://newsapi.org/v2/everything"
+# NEWSAPI_BASE_URL points ingestion at a local replay server (tools/replay_server.py)
+BASE_URL = os.getenv("NEWSAPI_BASE_URL", "https://newsapi.org/v2/everything")
 
 # NEWSDATA_API_KEY = os.getenv("NEWSDATA_API_KEY")
 # NEWSDATA_BASE_URL = "https://newsdata.io/api/1/news"
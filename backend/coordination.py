@@ -0,0 +1,209 @@
+# backend/coordination.py
+#
+# Cross-node coordination on Postgres, so work that must happen once (scheduled
+# ingestion, backfills) runs on exactly one API node.
+#
+# - "advisory": pg_try_advisory_lock on a dedicated connection. The lock lives as
+#   long as that connection, so a crashed node releases it immediately.
+# - "lease": a row in job_leases with an expiry, renewed by the holder. Used when
+#   session-level advisory locks are unsafe (transaction pooler on port 6543) or
+#   when COORDINATION_BACKEND=lease. A dead holder is replaced once its lease expires.
+#   Always used with DB_BACKEND=sqlite.
+import hashlib
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, create_engine, func, text
+from sqlalchemy.pool import NullPool
+
+from .database import DATABASE_URL, IS_SQLITE, SessionLocal, upsert, use_transaction_pool
+from .models import JobLease
+
+NODE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+LEASE_TTL = float(os.getenv("COORDINATION_LEASE_TTL", "60"))
+
+_lock_engine = None
+
+
+def _get_lock_engine():
+    # Lock connections are held for as long as we lead; keep them out of the API pool
+    global _lock_engine
+    if _lock_engine is None:
+        _lock_engine = create_engine(DATABASE_URL, poolclass=NullPool, connect_args={"sslmode": "require"})
+    return _lock_engine
+
+
+def advisory_key(name: str) -> int:
+    """Stable signed 64-bit key for pg_advisory_lock."""
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+class AdvisoryLock:
+    def __init__(self, name: str):
+        self.name = name
+        self.key = advisory_key(name)
+        self._conn = None
+        self._guard = threading.RLock()  # heartbeat and resign may race on the connection
+
+    def try_acquire(self) -> bool:
+        with self._guard:
+            if self._conn is not None:
+                return self.still_held()
+            return self._acquire()
+
+    def _acquire(self) -> bool:
+        conn = _get_lock_engine().connect()
+        try:
+            got = conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": self.key}).scalar()
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        if got:
+            self._conn = conn
+        else:
+            conn.close()
+        return bool(got)
+
+    def still_held(self) -> bool:
+        # session advisory locks only go away on unlock or disconnect, so a live
+        # connection means we still hold it
+        with self._guard:
+            if self._conn is None:
+                return False
+            try:
+                self._conn.execute(text("SELECT 1"))
+                self._conn.commit()
+                return True
+            except Exception:
+                self._drop()
+                return False
+
+    def release(self):
+        with self._guard:
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": self.key})
+                self._conn.commit()
+            except Exception:
+                pass
+            self._drop()
+
+    def _drop(self):
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+
+class LeaseLock:
+    def __init__(self, name: str, ttl: float = LEASE_TTL, holder: str = NODE_ID):
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder
+
+    def try_acquire(self) -> bool:
+        """Take the lease if it is free or expired, or renew it if we hold it. Uses DB time only."""
+        # SQLite can't do interval arithmetic; embedded means a single node and clock anyway
+        now = datetime.utcnow() if IS_SQLITE else func.now()
+        expires = now + timedelta(seconds=self.ttl)
+        stmt = upsert(JobLease).values(name=self.name, holder=self.holder, acquired_at=now, expires_at=expires)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[JobLease.name],
+            set_={
+                "holder": stmt.excluded.holder,
+                # renewals keep the original acquisition time
+                "acquired_at": case((JobLease.holder == stmt.excluded.holder, JobLease.acquired_at), else_=now),
+                "expires_at": stmt.excluded.expires_at,
+            },
+            where=(JobLease.holder == stmt.excluded.holder) | (JobLease.expires_at < now),
+        ).returning(JobLease.holder)
+        db = SessionLocal()
+        try:
+            got = db.execute(stmt).scalar()
+            db.commit()
+        finally:
+            db.close()
+        return got == self.holder
+
+    def still_held(self) -> bool:
+        return self.try_acquire()
+
+    def release(self):
+        db = SessionLocal()
+        try:
+            db.query(JobLease).filter(JobLease.name == self.name, JobLease.holder == self.holder).delete()
+            db.commit()
+        finally:
+            db.close()
+
+
+def make_lock(name: str, backend: str | None = None, ttl: float = LEASE_TTL):
+    backend = backend or os.getenv("COORDINATION_BACKEND") or (
+        "lease" if use_transaction_pool or IS_SQLITE else "advisory")
+    if backend == "advisory":
+        if IS_SQLITE:
+            raise ValueError("advisory locks need Postgres; use COORDINATION_BACKEND=lease with DB_BACKEND=sqlite")
+        return AdvisoryLock(name)
+    if backend == "lease":
+        return LeaseLock(name, ttl=ttl)
+    raise ValueError(f"unknown coordination backend: {backend}")
+
+
+class LeaderElector:
+    """
+    Campaign for a named leadership. While leading, a heartbeat thread re-checks
+    (advisory) or renews (lease) the lock every ttl/3 seconds; `is_leader` turns
+    False as soon as leadership is lost.
+    """
+
+    def __init__(self, name: str, backend: str | None = None, ttl: float = LEASE_TTL):
+        self.name = name
+        self.ttl = ttl
+        self.lock = make_lock(name, backend, ttl)
+        self._leading = threading.Event()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leading.is_set()
+
+    def campaign(self) -> bool:
+        if self.is_leader:
+            return True
+        try:
+            got = self.lock.try_acquire()
+        except Exception as e:
+            print(f"[leader:{self.name}] campaign failed: {e}")
+            return False
+        if got:
+            self._leading.set()
+            print(f"[leader:{self.name}] {NODE_ID} is now leader")
+            self._heartbeat = threading.Thread(target=self._beat, name=f"leader-{self.name}", daemon=True)
+            self._heartbeat.start()
+        return got
+
+    def _beat(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                held = self.lock.still_held()
+            except Exception as e:
+                print(f"[leader:{self.name}] heartbeat failed: {e}")
+                held = False
+            if not held:
+                self._leading.clear()
+                print(f"[leader:{self.name}] {NODE_ID} lost leadership")
+                return
+
+    def resign(self):
+        self._stop.set()
+        if self._leading.is_set():
+            self._leading.clear()
+            self.lock.release()
+            print(f"[leader:{self.name}] {NODE_ID} resigned")
@@ -1,11 +1,12 @@
-
 # -----------------------------------------------------------------------------------------------------------------------------------------------------------
 #                                                     *****     Database Tabel    *****
 # -----------------------------------------------------------------------------------------------------------------------------------------------------------
 
 from backend.database import engine, Base
 from backend import models  # <-- Import models to register them!
+from backend.schema_upgrades import apply_upgrades
 
 print("Creating tables...")
 Base.metadata.create_all(bind=engine)
+apply_upgrades(engine)   # new columns on tables that already existed
 print("Tables created successfully!")
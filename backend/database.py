@@ -42,7 +42,9 @@
 #                                                     *****     Database     *****
 # -----------------------------------------------------------------------------------------------------------------------------------------------------------
 
-from sqlalchemy import create_engine
+from sqlalchemy import Date, create_engine, event, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool  # ADD: for transaction pool (6543)
@@ -52,17 +54,36 @@ import os
 from urllib.parse import quote_plus
 from urllib.parse import urlparse  # ADD: to inspect port
 
+from . import pool_metrics
+
 # Load .env from project root
 env_path = Path(__file__).resolve().parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
+# Storage backend:
+# - postgres (default): DB_USER / DB_PASSWORD / DB_HOST / DB_PORT / DB_NAME
+# - sqlite: embedded single-file database at SQLITE_PATH, for single-node
+#   deployments and local benchmarks. No replicas, partitioning or advisory
+#   locks; the scheduler coordinates through job_leases instead. The async
+#   routes run on aiosqlite.
+DB_BACKEND = os.getenv("DB_BACKEND", "postgres").lower()
+IS_SQLITE = DB_BACKEND == "sqlite"
+SQLITE_PATH = os.getenv("SQLITE_PATH", str(Path(__file__).resolve().parent.parent / "appnews.db"))
+
 DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = quote_plus(os.getenv("DB_PASSWORD"))
+DB_PASSWORD = quote_plus(os.getenv("DB_PASSWORD") or "")
 DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
 
-DATABASE_URL = f"postgresql+psycopg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+if IS_SQLITE:
+    DATABASE_URL = f"sqlite:///{SQLITE_PATH}"
+    ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{SQLITE_PATH}"
+elif DB_BACKEND == "postgres":
+    DATABASE_URL = f"postgresql+psycopg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    ASYNC_DATABASE_URL = DATABASE_URL       # psycopg 3 does both
+else:
+    raise ValueError(f"unknown DB_BACKEND {DB_BACKEND!r} (postgres | sqlite)")
 
 print("DEBUG DATABASE_URL:", DATABASE_URL)
 
@@ -70,26 +91,78 @@ print("DEBUG DATABASE_URL:", DATABASE_URL)
 # - 6543 = transaction pool: let external pooler manage connections (NullPool)
 # - 5432 = session pool: keep a small in-app pool to avoid exceeding server pool size
 _port = int(DB_PORT) if DB_PORT and DB_PORT.isdigit() else None
-use_transaction_pool = (_port == 6543)
-
-if use_transaction_pool:
-    # External pooler (PgBouncer/Supavisor) in transaction mode
-    engine = create_engine(
-        DATABASE_URL,
-        poolclass=NullPool,        # don't hold connections in-app
-        pool_pre_ping=True,        # validate before use
-        connect_args={"sslmode": "require"},  # Supabase
-    )
-else:
-    # Session mode: keep pool tiny so you don't hit MaxClients
-    engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,
-        pool_recycle=1800,
-        pool_size=5,               # keep small
-        max_overflow=0,            # do not burst beyond pool_size
-        connect_args={"sslmode": "require"},
-    )
+use_transaction_pool = (_port == 6543) and not IS_SQLITE
+
+
+def engine_kwargs(port: int | None, pool_size: int, max_overflow: int) -> dict:
+    """create_engine/create_async_engine options for a server on `port` (primary, async, replicas)."""
+    if IS_SQLITE:
+        # one file, many threads: WAL lets readers run alongside the single writer
+        return {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "connect_args": {"check_same_thread": False, "timeout": 30},
+        }
+    if port == 6543:
+        # External pooler (PgBouncer/Supavisor) in transaction mode
+        return {
+            "poolclass": NullPool,        # don't hold connections in-app
+            "pool_pre_ping": True,        # validate before use
+            "connect_args": {"sslmode": "require"},  # Supabase
+        }
+    # Session mode: keep pool small so you don't hit MaxClients
+    return {
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "connect_args": {"sslmode": "require"},
+    }
+
+
+# Primary: all writes, and reads when no healthy replica is available (db_routing.py).
+# Pool sizes from env; the defaults keep the old 5 connections / no overflow.
+# DB_POOL_MODE=adaptive sizes it from worker count and observed concurrency (pool_metrics.py).
+POOL_SIZE, MAX_OVERFLOW = pool_metrics.initial_sizes(int(os.getenv("DB_POOL_SIZE", "5")),
+                                                     int(os.getenv("DB_MAX_OVERFLOW", "0")))
+engine = create_engine(DATABASE_URL, **engine_kwargs(_port, POOL_SIZE, MAX_OVERFLOW))
+pool_metrics.enable_adaptive(engine, pool_metrics.instrument(engine, "primary"))
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",          # readers don't block the writer (persistent, per file)
+    "PRAGMA synchronous=NORMAL",        # fsync at checkpoints only; safe with WAL
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA busy_timeout=30000",        # wait for the write lock instead of failing
+    "PRAGMA cache_size=-65536",         # 64 MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",       # 256 MB memory-mapped reads
+)
+
+
+def configure_sqlite(sync_engine):
+    """Apply SQLITE_PRAGMAS to every new connection (sync engine, or AsyncEngine.sync_engine)."""
+    @event.listens_for(sync_engine, "connect")
+    def _pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cur.execute(pragma)
+        cur.close()
+
+
+if IS_SQLITE:
+    Path(SQLITE_PATH).parent.mkdir(parents=True, exist_ok=True)
+    configure_sqlite(engine)
+
+
+def upsert(table):
+    """INSERT supporting .on_conflict_do_update / .on_conflict_do_nothing / .excluded on either backend."""
+    return sqlite_insert(table) if IS_SQLITE else pg_insert(table)
+
+
+def utc_date(column):
+    """date(column) as a Python date on both backends (SQLite returns text, typed back here)."""
+    return func.date(column, type_=Date)
+
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
@@ -0,0 +1,144 @@
+# backend/db_routing.py
+#
+# Read/write routing. Writes always go to the primary (database.engine);
+# analytics, geo and admin read endpoints ask the router for a read replica.
+#
+#   DB_REPLICA_HOSTS=replica-1.example.com:5432,replica-2.example.com:6543
+#                                   same DB_USER / DB_PASSWORD / DB_NAME as the primary
+#   DB_REPLICA_MAX_LAG_SECONDS=30   replicas further behind than this are skipped
+#   DB_REPLICA_CHECK_SECONDS=10     health/lag probe interval
+#   DB_REPLICA_POOL_SIZE=5, DB_REPLICA_MAX_OVERFLOW=5, DB_REPLICA_ASYNC_POOL_SIZE=5
+#
+# A background thread probes every replica (connectivity + replay lag) and
+# requests pick round-robin among the healthy ones, so choosing never waits
+# on the network. Unreachable, lagging or not-yet-probed replicas are skipped;
+# with none left, reads fall back to the primary. No replicas configured means
+# everything uses the primary, exactly as before.
+#
+#   db = read_session()                                    # sync
+#   db: AsyncSession = Depends(get_async_read_db)          # async (async_database.py)
+import itertools
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+
+from . import pool_metrics
+from .database import DB_NAME, DB_PASSWORD, DB_USER, IS_SQLITE, SessionLocal, engine_kwargs
+
+MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "30"))
+CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_SECONDS", "10"))
+POOL_SIZE = int(os.getenv("DB_REPLICA_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_REPLICA_MAX_OVERFLOW", "5"))
+ASYNC_POOL_SIZE = int(os.getenv("DB_REPLICA_ASYNC_POOL_SIZE", "5"))
+
+# Seconds of replay lag; 0 when the replica has replayed everything it received
+# (an idle primary makes pg_last_xact_replay_timestamp() look old) or on a primary.
+_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    def __init__(self, host: str, port: int):
+        self.name = f"{host}:{port}"
+        self.url = f"postgresql+psycopg://{DB_USER}:{DB_PASSWORD}@{host}:{port}/{DB_NAME}"
+        self.port = port
+        kwargs = engine_kwargs(port, POOL_SIZE, MAX_OVERFLOW)
+        # fail fast: an unreachable replica must not stall the probe loop
+        kwargs["connect_args"] = {**kwargs["connect_args"], "connect_timeout": 5}
+        self.engine = create_engine(self.url, **kwargs)
+        pool_metrics.instrument(self.engine, f"replica {self.name}")
+        self._async_engine = None
+        self.healthy = False        # until the first probe succeeds
+        self.lag = None
+        self.error = None
+        self.checked_at = None
+
+    @property
+    def async_engine(self):
+        if self._async_engine is None:
+            from sqlalchemy.ext.asyncio import create_async_engine
+            self._async_engine = create_async_engine(self.url, **engine_kwargs(self.port, ASYNC_POOL_SIZE, 0))
+            pool_metrics.instrument(self._async_engine.sync_engine, f"replica {self.name} async")
+        return self._async_engine
+
+    def probe(self, max_lag: float):
+        try:
+            with self.engine.connect() as conn:
+                self.lag = float(conn.execute(_LAG_SQL).scalar() or 0.0)
+            self.error = None if self.lag <= max_lag else f"lag {self.lag:.1f}s > {max_lag:.0f}s"
+        except Exception as e:
+            self.lag = None
+            self.error = f"{type(e).__name__}: {e}"
+        self.healthy = self.error is None
+        self.checked_at = time.time()
+
+
+def _parse_hosts(value: str) -> list[tuple[str, int]]:
+    hosts = []
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        host, _, port = part.partition(":")
+        hosts.append((host, int(port or 5432)))
+    return hosts
+
+
+class ReplicaRouter:
+    def __init__(self, replicas: list[Replica], max_lag: float = MAX_LAG, interval: float = CHECK_INTERVAL):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.interval = interval
+        self._rr = itertools.count()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.fallbacks = 0          # reads sent to the primary although replicas are configured
+
+    def _run(self):
+        while True:
+            for r in self.replicas:
+                r.probe(self.max_lag)
+            time.sleep(self.interval)
+
+    def _ensure_probing(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="replica-probe", daemon=True)
+                    self._thread.start()
+
+    def pick(self) -> Replica | None:
+        """A healthy replica, round-robin; None means use the primary."""
+        if not self.replicas:
+            return None
+        self._ensure_probing()
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            self.fallbacks += 1
+            return None
+        return healthy[next(self._rr) % len(healthy)]
+
+    def status(self) -> dict:
+        return {
+            "max_lag_s": self.max_lag,
+            "fallbacks_to_primary": self.fallbacks,
+            "replicas": [
+                {"name": r.name, "healthy": r.healthy, "lag_s": r.lag, "error": r.error,
+                 "checked_s_ago": round(time.time() - r.checked_at, 1) if r.checked_at else None}
+                for r in self.replicas
+            ],
+        }
+
+
+# embedded SQLite has no replicas
+router = ReplicaRouter([] if IS_SQLITE else [Replica(h, p) for h, p in _parse_hosts(os.getenv("DB_REPLICA_HOSTS", ""))])
+
+
+def read_session():
+    """Session for read-only work: a healthy replica, else the primary. Never write through it."""
+    replica = router.pick()
+    return SessionLocal(bind=replica.engine) if replica else SessionLocal()
@@ -0,0 +1,205 @@
+# backend/enrich_worker.py
+#
+# Background sentiment/topic enrichment for articles that were stored without
+# it (GDELT ingest, pipeline runs that skipped NLP, ...). Workers claim batches
+# with SELECT ... FOR UPDATE SKIP LOCKED, so any number of processes on any
+# number of hosts can drain the same backlog without double work or a queue.
+# Each batch is also embedded for related-article lookup (related.py).
+#
+# A batch that raises is rolled back and split in halves, each retried in its
+# own transaction, so the good rows still commit. An article that fails on its
+# own gets articles.enrich_failures incremented and is no longer claimed after
+# ENRICH_MAX_ATTEMPTS (default 3); reset the column to retry it.
+#
+#   python -m backend.enrich_worker --processes 4 --batch-size 64
+#   python -m backend.enrich_worker --once          # drain the backlog and exit
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from sqlalchemy import exists, func, update
+
+from . import related
+from .database import SessionLocal
+from .enrichment import analyze_texts, write_enrichment
+from .models import Article, ArticleTopic, Sentiment, Topic
+
+BATCH_SIZE = 64
+IDLE_SLEEP = 15.0
+MAX_ATTEMPTS = int(os.getenv("ENRICH_MAX_ATTEMPTS", "3"))
+
+
+def _failed():
+    return func.coalesce(Article.enrich_failures, 0) >= MAX_ATTEMPTS
+
+
+def _unenriched():
+    return ~exists().where(Sentiment.article_id == Article.id) & ~_failed()
+
+
+def claim_batch(db, size: int = BATCH_SIZE, ids: list[int] | None = None) -> list:
+    """
+    Lock up to `size` un-enriched articles (optionally only among `ids`) for this
+    transaction. Rows locked by other workers are skipped, not waited on. Locks
+    are released on commit.
+    """
+    q = db.query(Article.id, Article.title, Article.description, Article.canonical_id).filter(_unenriched())
+    if ids is not None:
+        q = q.filter(Article.id.in_(ids))
+    return q.order_by(Article.id.desc()).limit(size).with_for_update(skip_locked=True, of=Article).all()
+
+
+def inherited_results(db, rows) -> dict[int, dict]:
+    """Results for near-duplicates whose canonical article is already enriched."""
+    canon_ids = {r.canonical_id for r in rows if r.canonical_id}
+    if not canon_ids:
+        return {}
+    sentiments = {
+        aid: (label, score)
+        for aid, label, score in db.query(Sentiment.article_id, Sentiment.sentiment_label, Sentiment.sentiment)
+        .filter(Sentiment.article_id.in_(canon_ids))
+    }
+    topics: dict[int, list[str]] = {}
+    for aid, name in (
+        db.query(ArticleTopic.article_id, Topic.name)
+        .join(Topic, Topic.id == ArticleTopic.topic_id)
+        .filter(ArticleTopic.article_id.in_(sentiments.keys()))
+    ):
+        topics.setdefault(aid, []).append(name)
+    return {
+        r.id: {"label": sentiments[r.canonical_id][0], "score": sentiments[r.canonical_id][1],
+               "topics": topics.get(r.canonical_id) or ["General"]}
+        for r in rows if r.canonical_id in sentiments
+    }
+
+
+def enrich_rows(db, rows) -> tuple[int, int]:
+    """Enrich and write claimed rows. Returns (articles written, of which inherited). Caller commits."""
+    if not rows:
+        return 0, 0
+    results = inherited_results(db, rows)
+    inherited = len(results)
+    todo = [r for r in rows if r.id not in results]
+    if todo:
+        analyzed = analyze_texts([r.description or r.title or "" for r in todo])
+        results.update({r.id: res for r, res in zip(todo, analyzed)})
+    # write_enrichment re-checks for existing sentiment rows, which covers a
+    # row enriched and committed by another worker after our snapshot was taken
+    written = write_enrichment(db, [(r.id, r.title, results[r.id]) for r in rows])
+    if related.EMBED_ON_ENRICH and related.available():
+        related.embed_articles(db, rows)
+    return written, inherited
+
+
+def process_batch(db, size: int = BATCH_SIZE) -> tuple[int, int]:
+    """Claim, enrich and write one batch. Caller commits."""
+    return enrich_rows(db, claim_batch(db, size))
+
+
+def record_failure(article_id: int, error: Exception):
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(Article)
+            .where(Article.id == article_id)
+            .values(enrich_failures=func.coalesce(Article.enrich_failures, 0) + 1)
+        )
+        db.commit()
+    finally:
+        db.close()
+    print(f"[enrich {os.getpid()}] article {article_id} failed: {error}")
+
+
+def _run(size: int, ids: list[int] | None = None) -> tuple[int, int, int]:
+    """One batch in its own transaction, bisected on failure. Returns (claimed, written, inherited)."""
+    db = SessionLocal()
+    claimed = []
+    try:
+        rows = claim_batch(db, size, ids)
+        claimed = [r.id for r in rows]
+        n, inh = enrich_rows(db, rows)
+        db.commit()
+        return len(claimed), n, inh
+    except Exception as e:
+        db.rollback()
+        if not claimed:
+            raise       # failed before claiming anything (database down, ...)
+        error = e
+    finally:
+        db.close()
+
+    if len(claimed) == 1:
+        record_failure(claimed[0], error)
+        return 1, 0, 0
+    written = inherited = 0
+    half = len(claimed) // 2
+    for part in (claimed[:half], claimed[half:]):
+        _, n, inh = _run(len(part), part)
+        written += n
+        inherited += inh
+    return len(claimed), written, inherited
+
+
+def run_worker(batch_size: int = BATCH_SIZE, once: bool = False, idle_sleep: float = IDLE_SLEEP,
+               max_batches: int | None = None) -> dict:
+    pid = os.getpid()
+    written = inherited = batches = 0
+    t0 = time.perf_counter()
+    while max_batches is None or batches < max_batches:
+        try:
+            claimed, n, inh = _run(batch_size)
+        except Exception as e:
+            print(f"[enrich {pid}] batch failed: {e}")
+            claimed = n = inh = 0
+        if claimed == 0:
+            if once:
+                break
+            time.sleep(idle_sleep)
+            continue
+        batches += 1
+        written += n
+        inherited += inh
+        elapsed = time.perf_counter() - t0
+        print(f"[enrich {pid}] {written} articles ({inherited} inherited), {written / elapsed:.1f}/s")
+    elapsed = time.perf_counter() - t0
+    return {"pid": pid, "articles": written, "inherited": inherited, "batches": batches,
+            "seconds": round(elapsed, 2)}
+
+
+def enrichment_backlog(db) -> dict:
+    total = db.query(func.count(Article.id)).scalar() or 0
+    pending = db.query(func.count(Article.id)).filter(_unenriched()).scalar() or 0
+    failed = (
+        db.query(func.count(Article.id))
+        .filter(~exists().where(Sentiment.article_id == Article.id), _failed())
+        .scalar() or 0
+    )
+    return {"articles": int(total), "enriched": int(total - pending - failed), "pending": int(pending),
+            "failed": int(failed)}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Enrich stored articles with sentiment and topics")
+    ap.add_argument("--processes", type=int, default=1)
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    ap.add_argument("--once", action="store_true", help="exit when the backlog is empty")
+    ap.add_argument("--idle-sleep", type=float, default=IDLE_SLEEP)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    if args.processes <= 1:
+        reports = [run_worker(args.batch_size, args.once, args.idle_sleep)]
+    else:
+        # spawn: each worker gets its own engine/connection pool and model copy
+        with ProcessPoolExecutor(args.processes, mp_context=get_context("spawn")) as pool:
+            futures = [pool.submit(run_worker, args.batch_size, args.once, args.idle_sleep)
+                       for _ in range(args.processes)]
+            reports = [f.result() for f in futures]
+    elapsed = time.perf_counter() - t0
+    total = sum(r["articles"] for r in reports)
+    for r in reports:
+        print(r)
+    print(f"Enriched {total} articles with {len(reports)} worker(s) in {elapsed:.1f}s "
+          f"({total / elapsed if elapsed else 0:.1f}/s)")
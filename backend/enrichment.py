@@ -0,0 +1,97 @@
+# backend/enrichment.py
+#
+# Sentiment + topic tagging shared by /news, the ingestion pipeline and
+# background workers. The transformer model is loaded lazily, once per process.
+from . import topic_cache
+from .database import upsert
+from .models import Sentiment
+from .rollups import mark_sentiments
+
+_sentiment_analyzer = None
+
+
+def tag_topics(text: str) -> list[str]:
+    """Keyword topic tagger (formerly main.topic_modeling)."""
+    topics = []
+    description = (text or "").lower()
+    if "ai" in description or "artificial intelligence" in description:
+        topics.append("AI")
+    if "finance" in description or "economy" in description:
+        topics.append("Finance")
+    if "technology" in description or "tech" in description:
+        topics.append("Technology")
+    return topics if topics else ["General"]
+
+
+def get_sentiment_analyzer():
+    global _sentiment_analyzer
+    if _sentiment_analyzer is None:
+        from .sentement_analyzer import NewsSentimentEmotionAnalyzer
+        _sentiment_analyzer = NewsSentimentEmotionAnalyzer()
+    return _sentiment_analyzer
+
+
+def analyze_texts(texts: list[str]) -> list[dict]:
+    """
+    Batched sentiment + topics for a list of texts.
+    Returns [{"label": str, "score": float, "topics": [str, ...]}, ...].
+    Top-level function so it can run inside a process pool.
+    """
+    if not texts:
+        return []
+    texts = [t or "" for t in texts]
+    results = get_sentiment_analyzer().batch_analyze_sentiment(texts)
+    return [
+        {
+            "label": r.get("label") or "neutral",
+            "score": float(r.get("score", 0.0)),
+            "topics": tag_topics(t),
+        }
+        for t, r in zip(texts, results)
+    ]
+
+
+def insert_sentiments(db, rows: list[dict]) -> set[int]:
+    """
+    Insert sentiment rows (article_id, title, sentiment, sentiment_label), skipping
+    articles that already have one. Returns the article ids written. Caller commits.
+    """
+    rows = list({r["article_id"]: r for r in rows}.values())
+    if not rows:
+        return set()
+    # first writer wins: an update would replace a value the rollups already counted
+    stmt = (
+        upsert(Sentiment)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=[Sentiment.article_id])
+        .returning(Sentiment.article_id)
+    )
+    added = set(db.execute(stmt).scalars())
+    # Core insert, so tell the rollup hooks explicitly
+    mark_sentiments(db, added)
+    return added
+
+
+def write_enrichment(db, items: list[tuple[int, str, dict]]) -> int:
+    """
+    Bulk-write sentiment rows and topic mappings.
+    items: [(article_id, title, analyze_texts() result), ...]. Skips articles that
+    already have a sentiment row. Caller commits.
+    """
+    if not items:
+        return 0
+    ids = [aid for aid, _, _ in items]
+    done = {a for (a,) in db.query(Sentiment.article_id).filter(Sentiment.article_id.in_(ids))}
+    items = [it for it in items if it[0] not in done]
+    if not items:
+        return 0
+
+    added = insert_sentiments(db, [
+        {"article_id": aid, "title": title, "sentiment": float(r["score"]), "sentiment_label": r["label"]}
+        for aid, title, r in items
+    ])
+    # articles another writer enriched meanwhile keep that writer's topics too
+    items = [it for it in items if it[0] in added]
+    tids = topic_cache.ids(db, (name for _, _, r in items for name in r["topics"]))
+    topic_cache.map_topics(db, [(aid, tids[name]) for aid, _, r in items for name in r["topics"]])
+    return len(added)
@@ -0,0 +1,78 @@
+# backend/feed_stream.py
+#
+# Incremental JSON parsing for large feed responses (NewsAPI, GDELT).
+# Items of the top-level article array are decoded one at a time as the body
+# downloads, so memory stays proportional to one article, not the payload.
+import codecs
+import json
+import re
+from typing import Iterable, Iterator
+
+CHUNK_SIZE = 64 * 1024
+
+_SKIP = " \t\r\n,"
+
+
+def iter_json_array(chunks: Iterable[bytes], keys=("articles",)) -> Iterator[dict]:
+    """
+    Yield the elements of the first array found under any of `keys`
+    (e.g. {"status": "ok", "articles": [...]}) from a stream of byte chunks.
+    Raises ValueError if the body is not JSON or the array is never found.
+    """
+    decoder = json.JSONDecoder()
+    key_re = re.compile(r'"(?:%s)"\s*:\s*\[' % "|".join(re.escape(k) for k in keys))
+    text = codecs.iterdecode(chunks, "utf-8")
+    buf, pos = "", 0
+    head = ""
+
+    def more() -> bool:
+        nonlocal buf, pos, head
+        for piece in text:
+            if piece:
+                if len(head) < 200:
+                    head += piece[:200 - len(head)]
+                buf, pos = buf[pos:] + piece, 0
+                return True
+        return False
+
+    # 1. find the start of the array
+    while True:
+        m = key_re.search(buf, pos)
+        if m:
+            pos = m.end()
+            break
+        # keep a short tail in case the key straddles two chunks
+        pos = max(pos, len(buf) - 64)
+        if not more():
+            if head.lstrip().startswith("{"):
+                return  # valid JSON object without any articles
+            raise ValueError(f"Non-JSON body: {head}")
+
+    # 2. decode one element at a time
+    while True:
+        while True:
+            while pos < len(buf) and buf[pos] in _SKIP:
+                pos += 1
+            if pos < len(buf):
+                break
+            if not more():
+                raise ValueError("Truncated JSON array")
+        if buf[pos] == "]":
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # element not fully downloaded yet
+            if not more():
+                raise ValueError("Truncated JSON element")
+            continue
+        pos = end
+        yield obj
+
+
+def iter_response_items(resp, keys=("articles",), chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+    """Stream-parse a `requests` response opened with stream=True."""
+    try:
+        yield from iter_json_array(resp.iter_content(chunk_size=chunk_size), keys=keys)
+    finally:
+        resp.close()
@@ -0,0 +1,131 @@
+# backend/gazetteer.py
+#
+# Offline geocoder: a bundled gazetteer of country, region and major-city
+# centroids (data/gazetteer.csv) behind an in-memory normalized-name index.
+# No network, no rate limit; resolves a location string in microseconds.
+import csv
+import re
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+GAZETTEER_PATH = Path(__file__).resolve().parent / "data" / "gazetteer.csv"
+
+# When a name is ambiguous ("Georgia"), prefer the bigger feature unless the
+# string carries a country qualifier ("Atlanta, Georgia, US").
+_KIND_RANK = {"country": 0, "region": 1, "city": 2}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+class Place(NamedTuple):
+    name: str
+    kind: str
+    country: str
+    lat: float
+    lon: float
+
+
+class GeoMatch(NamedTuple):
+    lat: float
+    lon: float
+    name: str
+    kind: str
+    source: str
+    confidence: float
+
+
+def normalize_location(s: str | None) -> str:
+    """'  São Paulo, BR ' -> 'sao paulo br'"""
+    if not s:
+        return ""
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    s = _NON_ALNUM.sub(" ", s.lower()).strip()
+    if s.startswith("the "):
+        s = s[4:]
+    return s
+
+
+class Gazetteer:
+    def __init__(self, places: list[Place], aliases: dict[Place, tuple[str, ...]] | None = None):
+        self.places = places
+        aliases = aliases or {}
+        self._index: dict[str, list[Place]] = {}
+        self._codes: dict[str, Place] = {}
+        self._country_names: dict[str, str] = {}  # normalized name/alias -> ISO2
+        for p in places:
+            for name in (p.name, *aliases.get(p, ())):
+                key = normalize_location(name)
+                if key:
+                    self._index.setdefault(key, []).append(p)
+                    if p.kind == "country":
+                        self._country_names[key] = p.country
+            if p.kind == "country" and p.country:
+                self._codes[p.country.lower()] = p
+                self._country_names[p.country.lower()] = p.country
+        for matches in self._index.values():
+            matches.sort(key=lambda p: _KIND_RANK.get(p.kind, 9))
+
+    @classmethod
+    def load(cls, path: Path = GAZETTEER_PATH) -> "Gazetteer":
+        places = []
+        aliases = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                p = Place(row["name"], row["kind"], row["country"] or "", float(row["lat"]), float(row["lon"]))
+                places.append(p)
+                aliases[p] = tuple(a for a in (row.get("aliases") or "").split("|") if a)
+        return cls(places, aliases)
+
+    def __len__(self):
+        return len(self.places)
+
+    def _pick(self, key: str, country: str | None) -> Place | None:
+        matches = self._index.get(key)
+        if not matches:
+            return None
+        if country:
+            for p in matches:
+                if p.country == country:
+                    return p
+        return matches[0]
+
+    def lookup(self, location: str | None) -> GeoMatch | None:
+        """
+        Resolve a free-form location string. Tries the whole string, then
+        comma-separated parts (most specific first) qualified by any country
+        part, then an ISO2 country code.
+        """
+        key = normalize_location(location)
+        if not key:
+            return None
+
+        p = self._pick(key, None)
+        if p:
+            return GeoMatch(p.lat, p.lon, p.name, p.kind, "gazetteer", 1.0)
+
+        parts = [normalize_location(x) for x in (location or "").split(",")]
+        parts = [x for x in parts if x]
+        country = next((self._country_names[x] for x in reversed(parts) if x in self._country_names), None)
+        for i, part in enumerate(parts):
+            p = self._pick(part, country)
+            # "Punjab, Pakistan": a match in another country is worse than the country itself
+            if p and (not country or p.kind == "country" or p.country in ("", country)):
+                # the first (most specific) part matching is best; later parts are coarser
+                return GeoMatch(p.lat, p.lon, p.name, p.kind, "gazetteer", 0.9 if i == 0 else 0.7)
+
+        p = self._codes.get(key)
+        if p:
+            return GeoMatch(p.lat, p.lon, p.name, p.kind, "gazetteer", 0.6)
+        return None
+
+
+@lru_cache(maxsize=1)
+def get_gazetteer() -> Gazetteer:
+    return Gazetteer.load()
+
+
+def geocode_offline(location: str | None) -> GeoMatch | None:
+    return get_gazetteer().lookup(location)
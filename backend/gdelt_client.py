@@ -1,7 +1,19 @@
 # backend/gdelt_client.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+
 import requests
 
-BASE = "https://api.gdeltproject.org/api/v2/doc/doc"
+from backend.feed_stream import iter_response_items
+
+# GDELT_BASE_URL points ingestion at a local replay server (tools/replay_server.py)
+BASE = os.getenv("GDELT_BASE_URL", "https://api.gdeltproject.org/api/v2/doc/doc")
+
+# DOC 2.0 never returns more than this many rows per ArtList request
+GDELT_MAX_RECORDS = 250
 
 # Minimal ISO2 -> country name map (extend as needed)
 ISO2_TO_COUNTRY = {
@@ -19,7 +31,41 @@ ISO2_TO_COUNTRY = {
     "ZA": "South Africa",
 }
 
-def fetch_docs(hours=24, query="india", max_records=150, use_jsonfeed=False):
+def _to_doc(a: dict) -> dict:
+    # country fallback from DOC 2.0; map ISO2 -> country name for geocoding
+    code = (a.get("sourcecountry") or "").upper()
+    place = ISO2_TO_COUNTRY.get(code) or code  # fall back to ISO code if unmapped
+
+    return {
+        "title": a.get("title"),
+        "url": a.get("url"),
+        "published_at": a.get("seendate") or a.get("date"),
+        "source": a.get("domain"),
+        "location": place,   # string to geocode later
+        "lat": None,         # leave empty; backfill will set centroids
+        "lon": None,
+    }
+
+def _iter_articles(params: dict, quiet: bool = False):
+    # Stream-parse the ArtList body so articles are yielded while it downloads
+    r = requests.get(BASE, params=params, headers={"User-Agent": "appnews/1.0"},
+                     timeout=30, stream=True)
+    if not quiet:
+        print("GDELT URL:", r.url, "HTTP", r.status_code)
+    if r.status_code != 200:
+        print("Body:", r.text[:200])
+        r.close()
+        return
+    try:
+        yield from iter_response_items(r, keys=("articles", "documents"))
+    except ValueError as e:
+        print(e)
+
+def _get_articles(params: dict, quiet: bool = False) -> list[dict]:
+    return list(_iter_articles(params, quiet=quiet))
+
+def iter_docs(hours=24, query="india", max_records=150, use_jsonfeed=False):
+    """Generator variant of `fetch_docs`: yields article dicts as they are parsed."""
     params = {
         "format": "JSONFeed" if use_jsonfeed else "JSON",
         "timespan": f"{hours}h",
@@ -28,33 +74,128 @@ def fetch_docs(hours=24, query="india", max_records=150, use_jsonfeed=False):
         "sort": "DateDesc",
         "query": query,  # must be non-empty
     }
-    r = requests.get(BASE, params=params, headers={"User-Agent": "appnews/1.0"}, timeout=30)
-    print("GDELT URL:", r.url, "HTTP", r.status_code)
-    if r.status_code != 200:
-        print("Body:", r.text[:200])
-        return []
-    try:
-        data = r.json()
-    except Exception:
-        print("Non-JSON body:", r.text[:200])
-        return []
-
-    arts = data.get("articles") or data.get("documents") or []
-    print("Articles fetched:", len(arts))
-
-    out = []
-    for a in arts:
-        # country fallback from DOC 2.0; map ISO2 -> country name for geocoding
-        code = (a.get("sourcecountry") or "").upper()
-        place = ISO2_TO_COUNTRY.get(code) or code  # fall back to ISO code if unmapped
-
-        out.append({
-            "title": a.get("title"),
-            "url": a.get("url"),
-            "published_at": a.get("seendate") or a.get("date"),
-            "source": a.get("domain"),
-            "location": place,   # string to geocode later
-            "lat": None,         # leave empty; backfill will set centroids
-            "lon": None,
-        })
-    return out
+    n = 0
+    for a in _iter_articles(params):
+        n += 1
+        yield _to_doc(a)
+    print("Articles fetched:", n)
+
+def fetch_docs(hours=24, query="india", max_records=150, use_jsonfeed=False):
+    return list(iter_docs(hours=hours, query=query, max_records=max_records, use_jsonfeed=use_jsonfeed))
+
+
+# ---------------------------------------------------
+# Sharded fetch (time-window split to get past maxrecords)
+# ---------------------------------------------------
+
+def _gdelt_ts(dt: datetime) -> str:
+    return dt.strftime("%Y%m%d%H%M%S")
+
+class _RateLimiter:
+    """Spaces out calls across threads so at most `rate_per_sec` requests start per second."""
+
+    def __init__(self, rate_per_sec: float):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec and rate_per_sec > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+def _fetch_window(query, start, end, max_records, use_jsonfeed, limiter):
+    params = {
+        "format": "JSONFeed" if use_jsonfeed else "JSON",
+        "startdatetime": _gdelt_ts(start),
+        "enddatetime": _gdelt_ts(end),
+        "maxrecords": max_records,
+        "mode": "ArtList",
+        "sort": "DateDesc",
+        "query": query,
+    }
+    limiter.wait()
+    return _get_articles(params, quiet=True)
+
+def iter_docs_sharded(query="india", hours=24, start=None, end=None, shard_hours=6,
+                      max_records=GDELT_MAX_RECORDS, min_shard_minutes=15,
+                      max_workers=4, rate_per_sec=2.0, use_jsonfeed=False):
+    """
+    Fetch every article in [start, end) by splitting the range into sub-windows.
+
+    Windows that come back full (== max_records) are bisected and re-fetched until
+    they fit under the cap or reach `min_shard_minutes`. Shards run concurrently,
+    throttled to `rate_per_sec` requests. New articles are yielded as each shard
+    completes, deduped by URL, in the same dict shape as `fetch_docs`; only the
+    seen-URL set is kept, not the articles.
+    """
+    max_records = min(int(max_records), GDELT_MAX_RECORDS)
+    end = end or datetime.utcnow().replace(microsecond=0)
+    start = start or end - timedelta(hours=hours)
+    step = timedelta(hours=shard_hours)
+    min_width = timedelta(minutes=min_shard_minutes)
+    limiter = _RateLimiter(rate_per_sec)
+
+    windows = []
+    cursor = start
+    while cursor < end:
+        windows.append((cursor, min(cursor + step, end)))
+        cursor += step
+
+    seen: set[str] = set()
+    requests_made = 0
+    bisected = 0
+    truncated = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {
+            pool.submit(_fetch_window, query, s, e, max_records, use_jsonfeed, limiter): (s, e)
+            for s, e in windows
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                s, e = pending.pop(fut)
+                requests_made += 1
+                try:
+                    arts = fut.result()
+                except Exception as ex:
+                    print(f"GDELT shard {_gdelt_ts(s)}-{_gdelt_ts(e)} failed: {ex}")
+                    continue
+
+                if len(arts) >= max_records:
+                    if e - s > min_width:
+                        mid = s + (e - s) / 2
+                        bisected += 1
+                        for half in ((s, mid), (mid, e)):
+                            f2 = pool.submit(_fetch_window, query, half[0], half[1],
+                                             max_records, use_jsonfeed, limiter)
+                            pending[f2] = half
+                    else:
+                        truncated += 1
+
+                for a in arts:
+                    url = a.get("url")
+                    if url and url not in seen:
+                        seen.add(url)
+                        yield _to_doc(a)
+
+    print(f"GDELT sharded fetch: {len(seen)} unique articles from {requests_made} requests "
+          f"({bisected} bisections, {truncated} windows still at cap)")
+
+def fetch_docs_sharded(query="india", hours=24, start=None, end=None, shard_hours=6,
+                       max_records=GDELT_MAX_RECORDS, min_shard_minutes=15,
+                       max_workers=4, rate_per_sec=2.0, use_jsonfeed=False):
+    """List variant of `iter_docs_sharded`, newest first."""
+    docs = list(iter_docs_sharded(
+        query=query, hours=hours, start=start, end=end, shard_hours=shard_hours,
+        max_records=max_records, min_shard_minutes=min_shard_minutes,
+        max_workers=max_workers, rate_per_sec=rate_per_sec, use_jsonfeed=use_jsonfeed,
+    ))
+    docs.sort(key=lambda d: d.get("published_at") or "", reverse=True)
+    return docs
@@ -0,0 +1,97 @@
+# backend/geo_backfill.py
+#
+# Set-based coordinate backfill: one GROUP BY over the distinct location
+# strings still missing coordinates, offline resolution of each distinct
+# string, then UPDATE ... FROM (VALUES ...) per chunk instead of per row.
+# On SQLite the VALUES list goes in a CTE (it rejects a column list on a
+# VALUES subquery).
+import time
+from typing import Callable
+
+from sqlalchemy import Float, String, column, func, select, update, values
+
+from .database import IS_SQLITE, SessionLocal
+from .gazetteer import GeoMatch, geocode_offline
+from .geocode_cache import lookup_many
+from .models import Article
+
+VALUES_CHUNK = 1000
+
+
+def _missing_filter():
+    return (
+        Article.location.isnot(None),
+        (Article.lat.is_(None)) | (Article.lon.is_(None)),
+        Article.published_at.isnot(None),         # Only update articles with a timestamp
+    )
+
+
+def pending_locations(db) -> list[tuple[str, int]]:
+    """Distinct location strings still lacking coordinates, with row counts."""
+    return (
+        db.query(Article.location, func.count(Article.id))
+        .filter(*_missing_filter())
+        .group_by(Article.location)
+        .all()
+    )
+
+
+def apply_coordinates(db, coords: list[tuple[str, float, float]]) -> int:
+    """UPDATE articles FROM (VALUES (location, lat, lon), ...) in chunks. Caller commits."""
+    updated = 0
+    for i in range(0, len(coords), VALUES_CHUNK):
+        chunk = coords[i:i + VALUES_CHUNK]
+        v = values(
+            column("loc", String), column("lat", Float), column("lon", Float), name="v"
+        ).data(chunk)
+        if IS_SQLITE:
+            v = v.cte("v")
+        stmt = (
+            update(Article)
+            .where(Article.location == v.c.loc, *_missing_filter())
+            .values(lat=v.c.lat, lon=v.c.lon)
+            .execution_options(synchronize_session=False)
+        )
+        result = db.execute(stmt)
+        if IS_SQLITE:
+            # sqlite3 reports rowcount -1 for statements starting with WITH
+            updated += db.execute(select(func.changes())).scalar() or 0
+        else:
+            updated += result.rowcount or 0
+    return updated
+
+
+def run_backfill(resolve: Callable[[str], GeoMatch | None] = geocode_offline) -> dict:
+    t0 = time.perf_counter()
+    db = SessionLocal()
+    try:
+        pending = pending_locations(db)
+        coords, failed, skipped = [], [], 0
+        # geocode_cache first; only strings never seen before reach `resolve`
+        matches = lookup_many(db, [(raw or "").strip() for raw, _ in pending], resolve)
+        for raw, n in pending:
+            loc = (raw or "").strip()
+            if not loc:
+                skipped += n
+                continue
+            m = matches.get(loc)
+            if m:
+                coords.append((raw, float(m.lat), float(m.lon)))
+            else:
+                failed.append(loc)
+        updated = apply_coordinates(db, coords)
+        db.commit()
+    finally:
+        db.close()
+
+    report = {
+        "distinct_locations": len(pending),
+        "resolved_locations": len(coords),
+        "updated_rows": updated,
+        "skipped_empty_rows": skipped,
+        "failed_locations": sorted(set(failed)),
+        "seconds": round(time.perf_counter() - t0, 2),
+    }
+    print(f"Done. Updated {updated} rows from {len(coords)}/{len(pending)} locations "
+          f"in {report['seconds']}s, skipped {skipped} empty locations.")
+    return report
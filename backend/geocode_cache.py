@@ -0,0 +1,147 @@
+# backend/geocode_cache.py
+#
+# Location string -> coordinates, resolved once and shared across processes.
+# Lookup order: in-process LRU -> geocode_cache table -> resolver (offline
+# gazetteer by default). New resolutions are written back to the table.
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Iterable
+
+from .database import upsert
+from .gazetteer import GeoMatch, geocode_offline, normalize_location
+from .models import GeocodeCache
+
+LRU_SIZE = 20000
+
+_MISS = object()   # negative result, cached in-process only
+
+
+class _LRU:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._d: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._d:
+                self._d.move_to_end(key)
+                self.hits += 1
+                return self._d[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._d[key] = value
+            self._d.move_to_end(key)
+            while len(self._d) > self.maxsize:
+                self._d.popitem(last=False)
+
+    def __len__(self):
+        return len(self._d)
+
+
+lru = _LRU(LRU_SIZE)
+
+
+def _from_row(r: GeocodeCache) -> GeoMatch:
+    return GeoMatch(r.lat, r.lon, r.key, "cached", r.source or "cache", r.confidence or 0.0)
+
+
+def store(db, entries: dict[str, GeoMatch]):
+    """Upsert resolved keys into geocode_cache. Caller commits."""
+    if not entries:
+        return
+    now = datetime.utcnow()
+    rows = [
+        {"key": k, "lat": float(m.lat), "lon": float(m.lon), "source": m.source,
+         "confidence": float(m.confidence), "updated_at": now}
+        for k, m in entries.items()
+    ]
+    stmt = upsert(GeocodeCache).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[GeocodeCache.key],
+        set_={c: stmt.excluded[c] for c in ("lat", "lon", "source", "confidence", "updated_at")},
+    )
+    db.execute(stmt)
+
+
+def lookup_many(db, locations: Iterable[str],
+                resolve: Callable[[str], GeoMatch | None] = geocode_offline) -> dict[str, GeoMatch | None]:
+    """
+    Resolve many location strings with one table query for the LRU misses.
+    Returns {original location string: GeoMatch or None}. Caller commits.
+    """
+    keys = {}
+    for loc in set(locations):
+        k = normalize_location(loc)
+        if k:
+            keys.setdefault(k, []).append(loc)
+
+    found: dict[str, object] = {}
+    missing = []
+    for k in keys:
+        v = lru.get(k)
+        if v is None:
+            missing.append(k)
+        else:
+            found[k] = v
+
+    if missing:
+        for r in db.query(GeocodeCache).filter(GeocodeCache.key.in_(missing)):
+            m = _from_row(r)
+            found[r.key] = m
+            lru.put(r.key, m)
+
+        new_entries = {}
+        for k in missing:
+            if k in found:
+                continue
+            m = resolve(keys[k][0])
+            if m:
+                new_entries[k] = m
+                found[k] = m
+                lru.put(k, m)
+            else:
+                found[k] = _MISS
+                lru.put(k, _MISS)
+        store(db, new_entries)
+
+    out = {}
+    for k, locs in keys.items():
+        v = found.get(k)
+        for loc in locs:
+            out[loc] = None if v is _MISS else v
+    return out
+
+
+def lookup(db, location: str, resolve=geocode_offline) -> GeoMatch | None:
+    return lookup_many(db, [location], resolve).get(location)
+
+
+def warm(db, limit: int = LRU_SIZE) -> int:
+    """Bulk-load the most recently used cache rows into the LRU (startup)."""
+    rows = (
+        db.query(GeocodeCache)
+        .order_by(GeocodeCache.updated_at.desc())
+        .limit(limit)
+        .all()
+    )
+    for r in reversed(rows):   # most recent ends up most-recently-used
+        lru.put(r.key, _from_row(r))
+    print(f"Geocode cache warmed with {len(rows)} entries")
+    return len(rows)
+
+
+def stats() -> dict:
+    total = lru.hits + lru.misses
+    return {
+        "lru_entries": len(lru),
+        "lru_hits": lru.hits,
+        "lru_misses": lru.misses,
+        "lru_hit_ratio": round(lru.hits / total, 3) if total else None,
+    }
@@ -0,0 +1,301 @@
+# backend/hydrate_fulltext.py
+#
+# Fetch article HTML, extract the main text and store it in Article.body.
+# Rows are marked with hydrated_at/hydrate_status so runs are incremental:
+# re-running picks up where the last one stopped.
+#
+#   python -m backend.hydrate_fulltext --limit 500 --workers 8 --per-domain-delay 1.0
+#
+# body is stored with lz4 TOAST compression (see schema_upgrades.py).
+import argparse
+import codecs
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from html.parser import HTMLParser
+from itertools import zip_longest
+from urllib import robotparser
+from urllib.parse import urlparse
+
+import requests
+from sqlalchemy import func, text
+
+from .database import SessionLocal
+from .models import Article
+
+USER_AGENT = "appnews/1.0 (+fulltext)"
+MIN_TEXT_CHARS = 200
+MAX_HTML_BYTES = 2 * 1024 * 1024
+SNIFF_BYTES = 4096          # <meta charset> must appear in the first 1024 bytes per spec; allow slack
+
+_HEADER_CHARSET = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+_META_CHARSET = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.I)
+
+# on-disk size of the (lz4-compressed) body values just written
+select_body_size = text("SELECT SUM(pg_column_size(body)) FROM articles WHERE id = ANY(:ids)")
+
+
+# ---------------------------------------------------
+# Main-text extraction
+# ---------------------------------------------------
+
+class _MainTextParser(HTMLParser):
+    SKIP = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "figure"}
+    BLOCK = {"p", "h2", "h3", "li", "blockquote"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skip_depth = 0
+        self.article_depth = 0
+        self.block = None
+        self.parts = []
+        self.article_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self.skip_depth += 1
+        elif tag == "article":
+            self.article_depth += 1
+        elif tag in self.BLOCK and not self.skip_depth:
+            self.block = []
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self.skip_depth:
+            self.skip_depth -= 1
+        elif tag == "article" and self.article_depth:
+            self.article_depth -= 1
+        elif tag in self.BLOCK and self.block is not None:
+            para = " ".join("".join(self.block).split())
+            if len(para) >= 40:
+                self.parts.append(para)
+                if self.article_depth:
+                    self.article_parts.append(para)
+            self.block = None
+
+    def handle_data(self, data):
+        if self.block is not None and not self.skip_depth:
+            self.block.append(data)
+
+
+def extract_main_text(html: str) -> str:
+    """Paragraph text, preferring <article> content when the page has it."""
+    p = _MainTextParser()
+    try:
+        p.feed(html)
+        p.close()
+    except Exception:
+        pass
+    parts = p.article_parts if sum(map(len, p.article_parts)) >= MIN_TEXT_CHARS else p.parts
+    return "\n\n".join(parts)
+
+
+# ---------------------------------------------------
+# Politeness
+# ---------------------------------------------------
+
+class DomainGate:
+    """One request at a time per domain, at least `delay` seconds apart; optional robots.txt."""
+
+    def __init__(self, delay: float = 1.0, respect_robots: bool = True):
+        self.delay = delay
+        self.respect_robots = respect_robots
+        self._guard = threading.Lock()
+        self._locks: dict[str, threading.Lock] = {}
+        self._last: dict[str, float] = {}
+        self._robots: dict[str, robotparser.RobotFileParser | None] = {}
+
+    def _lock_for(self, domain):
+        with self._guard:
+            return self._locks.setdefault(domain, threading.Lock())
+
+    def allowed(self, url: str) -> bool:
+        if not self.respect_robots:
+            return True
+        u = urlparse(url)
+        base = f"{u.scheme}://{u.netloc}"
+        with self._lock_for(u.netloc):
+            if base not in self._robots:
+                rp = robotparser.RobotFileParser()
+                try:
+                    r = requests.get(f"{base}/robots.txt", headers={"User-Agent": USER_AGENT}, timeout=10)
+                    rp.parse(r.text.splitlines() if r.status_code == 200 else [])
+                except Exception:
+                    rp = None  # unreachable robots.txt: don't block on it
+                self._robots[base] = rp
+            rp = self._robots[base]
+        return rp is None or rp.can_fetch(USER_AGENT, url)
+
+    def fetch(self, session: requests.Session, url: str) -> requests.Response:
+        domain = urlparse(url).netloc
+        with self._lock_for(domain):
+            wait = self._last.get(domain, 0.0) + self.delay - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return session.get(url, headers={"User-Agent": USER_AGENT}, timeout=20, stream=True)
+            finally:
+                self._last[domain] = time.monotonic()
+
+
+def _read_capped(resp: requests.Response) -> str:
+    buf = bytearray()
+    for chunk in resp.iter_content(64 * 1024):
+        buf.extend(chunk)
+        if len(buf) >= MAX_HTML_BYTES:
+            break
+    return buf.decode(_charset(resp.headers.get("Content-Type") or "", bytes(buf)), errors="replace")
+
+
+def _codec(name) -> str | None:
+    try:
+        return codecs.lookup(name.decode("ascii") if isinstance(name, bytes) else name).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+
+def _charset(content_type: str, buf: bytes) -> str:
+    """Encoding of an HTML page: Content-Type charset, then <meta charset>, then detection.
+
+    Not resp.encoding: requests falls back to ISO-8859-1 for any text/* without a
+    charset, which turns UTF-8 pages into mojibake."""
+    m = _HEADER_CHARSET.search(content_type)
+    if m and _codec(m.group(1)):
+        return _codec(m.group(1))
+    if buf.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    m = _META_CHARSET.search(buf[:SNIFF_BYTES])
+    if m and _codec(m.group(1)):
+        return _codec(m.group(1))
+    try:
+        buf.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        if e.start >= len(buf) - 3:
+            return "utf-8"      # cut mid-character at MAX_HTML_BYTES
+    # same detector as resp.apparent_encoding, on the bytes already read
+    return _codec(requests.compat.chardet.detect(buf[:64 * 1024])["encoding"] or "") or "utf-8"
+
+
+# ---------------------------------------------------
+# Worker
+# ---------------------------------------------------
+
+def _interleave_by_domain(rows):
+    # spread domains out so workers don't queue behind one host's politeness lock
+    by_domain: dict[str, list] = {}
+    for r in rows:
+        by_domain.setdefault(urlparse(r[1]).netloc, []).append(r)
+    return [r for group in zip_longest(*by_domain.values()) for r in group if r is not None]
+
+
+def _hydrate_one(gate: DomainGate, session: requests.Session, url: str):
+    if not gate.allowed(url):
+        return None, "robots"
+    try:
+        resp = gate.fetch(session, url)
+    except requests.RequestException as e:
+        return None, f"error:{type(e).__name__}"
+    try:
+        if resp.status_code != 200:
+            return None, f"http:{resp.status_code}"
+        if "html" not in (resp.headers.get("Content-Type") or "html"):
+            return None, "not_html"
+        # the body streams in here, so a dropped or stalled connection surfaces now
+        body = extract_main_text(_read_capped(resp))
+    except requests.RequestException as e:
+        return None, f"error:{type(e).__name__}"
+    finally:
+        resp.close()
+    if len(body) < MIN_TEXT_CHARS:
+        return None, "empty"
+    return body, "ok"
+
+
+def hydrate(limit: int = 500, workers: int = 8, per_domain_delay: float = 1.0,
+            batch_size: int = 100, retry_failed: bool = False, respect_robots: bool = True) -> dict:
+    gate = DomainGate(delay=per_domain_delay, respect_robots=respect_robots)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    pages = ok = raw_bytes = stored_bytes = 0
+    statuses: dict[str, int] = {}
+    t0 = time.perf_counter()
+    started = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while pages < limit:
+                q = db.query(Article.id, Article.url).filter(Article.url.isnot(None))
+                if retry_failed:
+                    # failures from earlier runs only, so one run never loops on the same URL
+                    q = q.filter((Article.hydrated_at.is_(None)) |
+                                 ((Article.hydrate_status != "ok") & (Article.hydrated_at < started)))
+                else:
+                    q = q.filter(Article.hydrated_at.is_(None))
+                rows = q.order_by(Article.id.desc()).limit(min(batch_size, limit - pages)).all()
+                if not rows:
+                    break
+                rows = _interleave_by_domain(rows)
+
+                results = pool.map(lambda r: _hydrate_one(gate, session, r[1]), rows)
+                now = datetime.utcnow()
+                ok_ids = []
+                for (aid, _), (body, status) in zip(rows, results):
+                    key = status.split(":")[0]
+                    statuses[key] = statuses.get(key, 0) + 1
+                    values = {"hydrated_at": now, "hydrate_status": status}
+                    if body:
+                        values["body"] = body
+                        raw_bytes += len(body.encode("utf-8"))
+                        ok_ids.append(aid)
+                    db.query(Article).filter(Article.id == aid).update(values, synchronize_session=False)
+                db.commit()
+                pages += len(rows)
+                ok += len(ok_ids)
+
+                if ok_ids and db.bind.dialect.name == "postgresql":
+                    stored_bytes += db.execute(
+                        select_body_size, {"ids": ok_ids}
+                    ).scalar() or 0
+
+                elapsed = time.perf_counter() - t0
+                print(f"hydrated {ok}/{pages} pages, {pages / elapsed:.1f} pages/s")
+    finally:
+        db.close()
+        session.close()
+
+    elapsed = time.perf_counter() - t0
+    report = {
+        "pages": pages,
+        "hydrated": ok,
+        "seconds": round(elapsed, 2),
+        "pages_per_sec": round(pages / elapsed, 2) if elapsed else 0.0,
+        "text_bytes": raw_bytes,
+        "stored_bytes": stored_bytes or raw_bytes,  # on-disk (compressed) size on PostgreSQL
+        "statuses": statuses,
+    }
+    print(report)
+    return report
+
+
+def hydration_progress(db) -> dict:
+    rows = db.query(Article.hydrate_status, func.count(Article.id)).group_by(Article.hydrate_status).all()
+    return {(status or "pending"): int(n) for status, n in rows}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Hydrate Article.body with extracted full text")
+    ap.add_argument("--limit", type=int, default=500)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--per-domain-delay", type=float, default=1.0)
+    ap.add_argument("--batch-size", type=int, default=100)
+    ap.add_argument("--retry-failed", action="store_true")
+    ap.add_argument("--ignore-robots", action="store_true")
+    args = ap.parse_args()
+    hydrate(limit=args.limit, workers=args.workers, per_domain_delay=args.per_domain_delay,
+            batch_size=args.batch_size, retry_failed=args.retry_failed,
+            respect_robots=not args.ignore_robots)
@@ -1,79 +1,102 @@
 # backend/ingest_gdelt.py
 from datetime import datetime
-from dateutil import parser
-from backend.gdelt_client import fetch_docs
+from itertools import batched
+from backend.gdelt_client import iter_docs, iter_docs_sharded
 from backend.database import SessionLocal
 from backend.models import Article
+from backend.near_dup import link_duplicate
+from backend import geocode_cache
+from backend.timestamps import naive_utc, parse_batch
 
-def parse_gdelt_datetime(s: str):
-    if not s:
-        return None
-    s = s.strip()
-    # Try generic ISO/textual parsing first
-    try:
-        return parser.parse(s)
-    except Exception:
-        pass
-    # Handle compact numeric formats sometimes used in feeds (YYYYMMDD[HH[MM[SS]]])
-    try:
-        if s.isdigit():
-            if len(s) == 8:
-                return datetime.strptime(s, "%Y%m%d")
-            if len(s) == 12:
-                return datetime.strptime(s, "%Y%m%d%H%M")
-            if len(s) == 14:
-                return datetime.strptime(s, "%Y%m%d%H%M%S")
-    except Exception:
-        return None
-    return None
+# Rows per flush/commit when persisting streamed docs
+BATCH_SIZE = 200
+
+def upsert_articles(db, docs) -> int:
+    """
+    Insert or backfill a batch of normalized article dicts (gdelt_client._to_doc shape).
+    One URL lookup per batch instead of one per article. Caller commits.
+    """
+    urls = [d.get("url") for d in docs if d.get("url")]
+    if not urls:
+        return 0
+    existing = {a.url: a for a in db.query(Article).filter(Article.url.in_(urls))}
+    new_rows = []
+
+    # Resolve coordinates at ingest so rows land with lat/lon already set
+    coords = geocode_cache.lookup_many(
+        db, (d["location"] for d in docs if d.get("location") and not (d.get("lat") and d.get("lon")))
+    )
+    # one feed per batch: detect the timestamp format once, parse all of it;
+    # stored naive UTC like every other DateTime column
+    stamps = [naive_utc(ts) for ts in parse_batch([d.get("published_at") for d in docs])]
+    now = datetime.utcnow()
+    for d, published in zip(docs, stamps):
+        url = d.get("url")
+        if not url:
+            continue
+
+        geo = coords.get(d.get("location"))
+        if geo and not (d.get("lat") and d.get("lon")):
+            d = {**d, "lat": geo.lat, "lon": geo.lon}
+
+        row = existing.get(url)
+        if row:
+            # backfill geo if the new payload has coordinates
+            if (row.lat is None or row.lon is None) and d.get("lat") and d.get("lon"):
+                row.lat, row.lon = d["lat"], d["lon"]
+            # set location if missing (e.g., country name from DOC sourcecountry)
+            if d.get("location") and not row.location:
+                row.location = d["location"]
+            # backfill published_at if missing
+            if not row.published_at:
+                row.published_at = published or now
+            if d.get("image_url") and not row.image_url:
+                row.image_url = d["image_url"]
+            continue
 
-def upsert_gdelt(hours=24, query=None, max_records=150):
+        row = Article(
+            title=d.get("title") or "(untitled)",
+            body=None,                      # hydrate later if you fetch fulltext
+            published_at=published or now,  # never NULL so it passes window filters
+            source=d.get("source"),
+            url=url,
+            location=d.get("location"),     # country fallback mapped in gdelt_client
+            lat=d.get("lat"),
+            lon=d.get("lon"),
+            description=d.get("description"),
+            image_url=d.get("image_url"),
+        )
+        db.add(row)
+        existing[url] = row                 # same URL twice in one batch
+        new_rows.append(row)
+
+    if new_rows:
+        db.flush()                          # ids for the near-dup index
+        for row in new_rows:
+            link_duplicate(db, row)
+    return len(new_rows)
+
+def upsert_gdelt(hours=24, query=None, max_records=150, sharded=False, shard_hours=6,
+                 batch_size=BATCH_SIZE):
     # Ensure query uses DOC 2.0 rules: non-empty and OR groups in parentheses
     # e.g., "(AI OR climate OR india)"
-    docs = fetch_docs(hours=hours, query=query, max_records=max_records)
+    if sharded:
+        # split the window so busy periods are not cut off at maxrecords
+        docs = iter_docs_sharded(query=query, hours=hours, shard_hours=shard_hours)
+    else:
+        docs = iter_docs(hours=hours, query=query, max_records=max_records)
     db = SessionLocal()
     inserted = 0
     try:
-        for d in docs:
-            url = d.get("url")
-            if not url:
-                continue
-
-            row = db.query(Article).filter(Article.url == url).first()
-            if row:
-                # backfill geo if the new payload has coordinates
-                if (row.lat is None or row.lon is None) and d.get("lat") and d.get("lon"):
-                    row.lat, row.lon = d["lat"], d["lon"]
-                # set location if missing (e.g., country name from DOC sourcecountry)
-                if d.get("location") and not row.location:
-                    row.location = d["location"]
-                # backfill published_at if missing
-                if not row.published_at:
-                    raw = d.get("published_at")
-                    row.published_at = parse_gdelt_datetime(raw) or datetime.utcnow()
-                continue
-
-            raw_ts = d.get("published_at")
-            published = parse_gdelt_datetime(raw_ts) or datetime.utcnow()
-
-            db.add(Article(
-                title=d.get("title") or "(untitled)",
-                body=None,                      # hydrate later if you fetch fulltext
-                published_at=published,         # never NULL so it passes window filters
-                source=d.get("source"),
-                url=url,
-                location=d.get("location"),     # country fallback mapped in gdelt_client
-                lat=d.get("lat"),
-                lon=d.get("lon"),
-                description=None,
-            ))
-            inserted += 1
-
-        db.commit()
+        # docs is a generator: persist fixed-size chunks as they stream in
+        for batch in batched(docs, batch_size):
+            inserted += upsert_articles(db, batch)
+            db.commit()
         print(f"Inserted {inserted} GDELT articles.")
     finally:
         db.close()
+    return inserted
 
 if __name__ == "__main__":
     # Parenthesized OR group is required by DOC 2.0 query syntax
-    upsert_gdelt(hours=168, query="(AI OR climate OR india)", max_records=150)
+    upsert_gdelt(hours=168, query="(AI OR climate OR india)", max_records=150, sharded=True)
@@ -0,0 +1,89 @@
+# backend/lean_queries.py
+#
+# Core selects for the read-only endpoints. They name the columns they need
+# and come back as plain rows (tuples), dicts, NumPy column arrays or an Arrow
+# table, so nothing is hydrated into ORM instances or tracked in the identity
+# map. Writes and anything that mutates rows keep using the ORM.
+#
+#   rows = (await db.execute(lean.recent_users(200))).mappings().all()      # AsyncSession
+#   rows = db.execute(lean.latest_news(20)).all()                           # Session / Connection
+#   cols = lean.to_numpy(db.execute(lean.geo_points(since)), {"lat": float, "lon": float})
+#
+# Benchmark against the ORM path: python tools/bench_lean_queries.py
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+
+from .models import Article, ArticleTopic, News, Sentiment, Topic, User
+
+
+# ---------------------------------------------------
+# Statements
+# ---------------------------------------------------
+
+def recent_users(limit: int = 200):
+    return (
+        select(User.id, User.username, User.email, User.is_admin, User.created_at)
+        .order_by(User.created_at.desc())
+        .limit(limit)
+    )
+
+
+def user_profile(username: str):
+    return (
+        select(User.username, User.email, User.language, User.interests)
+        .where(User.username == username)
+        .limit(1)
+    )
+
+
+def latest_news(limit: int = 20):
+    return select(News.title, News.description).order_by(News.published_at.desc()).limit(limit)
+
+
+def cached_results(ids: list[int]):
+    """Stored articles with their sentiment, for serving a cached query (prefetch.py)."""
+    return (
+        select(Article.id, Article.title, Article.description, Article.image_url, Article.canonical_id,
+               Sentiment.sentiment_label, Sentiment.sentiment)
+        .outerjoin(Sentiment, Sentiment.article_id == Article.id)
+        .where(Article.id.in_(ids))
+    )
+
+
+def geo_points(since: datetime, topic: str | None = None):
+    stmt = (
+        select(Article.lat, Article.lon, Article.published_at, Topic.name.label("topic"))
+        .outerjoin(ArticleTopic, ArticleTopic.article_id == Article.id)
+        .outerjoin(Topic, Topic.id == ArticleTopic.topic_id)
+        .where(Article.published_at >= since, Article.lat.isnot(None), Article.lon.isnot(None))
+    )
+    if topic:
+        stmt = stmt.where(Topic.name == topic)
+    return stmt
+
+
+# ---------------------------------------------------
+# Result shapes
+# ---------------------------------------------------
+
+def to_numpy(result, dtypes: dict[str, type] | None = None) -> dict[str, np.ndarray]:
+    """Column name -> array. Columns without a dtype in `dtypes` stay object arrays."""
+    keys = list(result.keys())
+    rows = result.all()
+    dtypes = dtypes or {}
+    out = {}
+    for i, key in enumerate(keys):
+        dtype = dtypes.get(key, object)
+        out[key] = np.fromiter((r[i] for r in rows), dtype=dtype, count=len(rows))
+    return out
+
+
+def to_arrow(result):
+    """pyarrow.Table of the result (pyarrow is optional; only needed here)."""
+    import pyarrow as pa
+
+    keys = list(result.keys())
+    columns = list(zip(*result.all())) or [()] * len(keys)
+    return pa.table({key: pa.array(col) for key, col in zip(keys, columns)})
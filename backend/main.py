@@ -3,18 +3,20 @@
 
 # main.py (clean, consolidated)
 
-from fastapi import FastAPI, Query, HTTPException, Body, Form
+from fastapi import FastAPI, Query, HTTPException, Body, Form, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import List
 from datetime import datetime, timedelta
-from dateutil import parser as dtparser
 import numpy as np
-from sqlalchemy import func
+import os
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 from backend.database import SessionLocal
-from backend.models import User, News, Article, Topic, ArticleTopic, Sentiment
+from backend.async_database import get_async_read_db
+from backend.models import User, Article
 from backend.auth_service import register_user, login_user
 from backend.text_cleaning import preprocess_text
 from backend.keyword_extractor import extract_keywords, extract_keywords_from_texts
@@ -22,6 +24,19 @@ from backend.news_service import fetch_news
 from backend.sentement_analyzer import NewsSentimentEmotionAnalyzer
 from backend.ner_analyzer import NewsNerAnalyzer
 from backend.topic_modeling import get_topics_from_articles
+from backend.near_dup import get_index, inherit_enrichment
+from backend import geocode_cache
+from backend import topic_cache
+from backend.reverse_geocode import countries_for
+from backend.enrichment import insert_sentiments, tag_topics as topic_modeling
+from backend.scheduler import start_scheduler, stop_scheduler
+from backend.prefetch import cached_results, flush_request_counts, remember
+from backend import rollups
+from backend import lean_queries as lean
+from backend import search
+from backend import related
+from backend.db_routing import read_session
+from backend import pool_metrics
 
 from backend.admin_routes import router as admin_router
 
@@ -63,9 +78,28 @@ def warm_db():
     try:
         with SessionLocal() as s:
             s.execute(text("SELECT 1"))
+            get_index(s)  # near-duplicate index over recent articles
+            geocode_cache.warm(s)
+            topic_cache.load(s)
     except Exception as e:
         # log but don't crash startup
         print("DB warm-up failed:", e)
+    # scheduled ingestion/backfills; only the elected leader node runs them
+    if os.getenv("SCHEDULER_ENABLED") == "1":
+        start_scheduler()
+
+
+@app.on_event("shutdown")
+def shutdown_scheduler():
+    stop_scheduler()   # hand leadership over right away instead of waiting for lease expiry
+
+
+@app.on_event("shutdown")
+def shutdown_prefetch_counts():
+    try:
+        flush_request_counts()   # /news hit/miss counts still held in this process
+    except Exception as e:
+        print("Flushing prefetch counts failed:", e)
 
 
 from fastapi.openapi.utils import get_openapi
@@ -98,33 +132,6 @@ app.openapi = custom_openapi
 
 
 
-def topic_modeling(text: str):
-    topics = []
-    description = (text or "").lower()
-    if "ai" in description or "artificial intelligence" in description:
-        topics.append("AI")
-    if "finance" in description or "economy" in description:
-        topics.append("Finance")
-    if "technology" in description or "tech" in description:
-        topics.append("Technology")
-    return topics if topics else ["General"]
-
-def _parse_dt(value):
-    if not value:
-        return None
-    try:
-        return dtparser.parse(value)
-    except Exception:
-        try:
-            return datetime.fromisoformat(value)
-        except Exception:
-            return None
-
-def _source_str(src):
-    if isinstance(src, dict):
-        return src.get("name") or str(src)
-    return src or ""
-
 def clean_sentiment_output(result: dict):
     if result and "score" in result:
         result["score"] = float(result["score"])
@@ -157,6 +164,14 @@ def health():
     return {"ok": True}
 
 
+@app.get("/metrics/pool")
+def metrics_pool(format: str = Query("json", pattern="^(json|prometheus)$")):
+    """Connection pool gauges, counters and checkout wait histogram (pool_metrics.py)."""
+    if format == "prometheus":
+        return PlainTextResponse(pool_metrics.prometheus(), media_type="text/plain; version=0.0.4")
+    return pool_metrics.snapshot()
+
+
 
 
 @app.get("/news")
@@ -169,83 +184,75 @@ def get_news(query: str = Query(..., description="Search term"),
         cleaned_query = processed["cleaned"]
         suggestion = processed["suggestion"]
 
+        # Warm results from the prefetcher (or an earlier identical query)
+        cached = cached_results(db, cleaned_query, language, page_size)
+        if cached is not None:
+            return {
+                "original_query": query,
+                "cleaned_query": cleaned_query,
+                "suggestion": suggestion,
+                "results": cached,
+                "cached": True,
+            }
+
+        # fetch_news stores each result once, in Article, and returns its id
         latest_articles = fetch_news(cleaned_query, language, page_size=page_size)
+        if isinstance(latest_articles, dict):
+            raise RuntimeError(latest_articles.get("error"))
+        stored = {
+            a.id: a for a in
+            db.query(Article).filter(Article.id.in_([d["article_id"] for d in latest_articles]))
+        }
 
         results = []
         for article_dict in latest_articles:
-            url = article_dict.get("url")
-            title = article_dict.get("title") or ""
-            desc = article_dict.get("description") or ""
-            published_dt = _parse_dt(article_dict.get("publishedAt"))
-            src_name = _source_str(article_dict.get("source"))
-            img = article_dict.get("urlToImage")
-
-            # News table
-            news_article = db.query(News).filter_by(url=url).first()
-            if not news_article:
-                news_article = News(
-                    title=title,
-                    description=desc,
-                    published_at=published_dt,
-                    source=src_name,
-                    url=url,
-                    image_url=img
-                )
-                db.add(news_article)
-                db.flush()
-
-            # Article table (mirror, keyed by URL)
-            article_obj = db.query(Article).filter_by(url=url).first()
-            if not article_obj:
-                article_obj = Article(
-                    title=title,
-                    description=desc,
-                    url=url,
-                    published_at=published_dt,
-                    source=src_name
-                )
-                db.add(article_obj)
-                db.flush()
-
+            article_obj = stored.get(article_dict["article_id"])
+            if article_obj is None:
+                continue
+            title = article_obj.title or ""
+            desc = article_obj.description or ""
             article_id = article_obj.id
 
-            # Sentiment (idempotent)
-            sentiment_result = sentiment_analyzer.analyze_sentiment(desc or title or "")
-            sentiment_result = clean_sentiment_output(sentiment_result)
-            if not db.query(Sentiment).filter_by(article_id=article_id).first():
-                db.add(Sentiment(
-                    article_id=article_id,
-                    title=title,
-                    sentiment=float(sentiment_result.get("score", 0.0)),
-                    sentiment_label=sentiment_result.get("label") or "neutral"
-                ))
-
-            # Topics mapping
-            detected_topics = topic_modeling(desc or title or "")
-            for topic_name in detected_topics:
-                topic_obj = db.query(Topic).filter_by(name=topic_name).first()
-                if not topic_obj:
-                    topic_obj = Topic(name=topic_name, description=f"News about {topic_name}")
-                    db.add(topic_obj)
-                    db.flush()
-                if not db.query(ArticleTopic).filter_by(article_id=article_id, topic_id=topic_obj.id).first():
-                    db.add(ArticleTopic(article_id=article_id, topic_id=topic_obj.id))
-
-            db.commit()
+            # Syndicated copy: reuse the canonical article's sentiment/topics
+            inherited = inherit_enrichment(db, article_obj)
+            if inherited is not None:
+                sentiment_result = {"label": inherited.sentiment_label, "score": float(inherited.sentiment or 0.0)}
+            else:
+                # Sentiment (idempotent)
+                sentiment_result = sentiment_analyzer.analyze_sentiment(desc or title or "")
+                sentiment_result = clean_sentiment_output(sentiment_result)
+                insert_sentiments(db, [{
+                    "article_id": article_id,
+                    "title": title,
+                    "sentiment": float(sentiment_result.get("score", 0.0)),
+                    "sentiment_label": sentiment_result.get("label") or "neutral",
+                }])
+
+                # Topics mapping (cached topic ids, idempotent insert)
+                detected_topics = topic_modeling(desc or title or "")
+                tids = topic_cache.ids(db, detected_topics)
+                topic_cache.map_topics(db, [(article_id, tids[name]) for name in detected_topics])
+                db.flush()
 
             results.append({
                 "title": title,
                 "description": desc,
                 "sentiment": sentiment_result,
-                "image_url": img,
-                "article_id": article_id
+                "image_url": article_obj.image_url,
+                "article_id": article_id,
+                "canonical_id": article_obj.canonical_id
             })
 
+        if results:
+            remember(db, cleaned_query, language, [r["article_id"] for r in results], page_size)
+        db.commit()
+
         return {
             "original_query": query,
             "cleaned_query": cleaned_query,
             "suggestion": suggestion,
-            "results": results
+            "results": results,
+            "cached": False,
         }
     except Exception as e:
         db.rollback()
@@ -253,6 +260,38 @@ def get_news(query: str = Query(..., description="Search term"),
     finally:
         db.close()
 
+@app.get("/search")
+async def search_stored(q: str = Query(..., min_length=1, description="Search term"),
+                        since: datetime | None = None,
+                        until: datetime | None = None,
+                        topic: str | None = None,
+                        source: str | None = None,
+                        sort: str = Query("relevance", pattern="^(relevance|date)$"),
+                        limit: int = Query(20, ge=1, le=search.MAX_LIMIT),
+                        cursor: str | None = None,
+                        db: AsyncSession = Depends(get_async_read_db)):
+    """Ranked full-text search over stored articles (search.py); never calls NewsAPI."""
+    processed = await run_in_threadpool(preprocess_text, q)
+    cleaned = processed["cleaned"] or q
+    try:
+        page = await search.search_articles(db, cleaned, since=since, until=until, topic=topic, source=source,
+                                            sort=sort, limit=limit, cursor=cursor)
+    except search.BadCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"query": q, "cleaned": cleaned, **page}
+
+@app.get("/articles/{article_id}/related")
+def get_related_articles(article_id: int, k: int = Query(10, ge=1, le=50)):
+    """Most similar stored articles by sentence embedding (related.py), near-duplicates excluded."""
+    db = read_session()
+    try:
+        items = related.related_articles(db, article_id, k)
+    finally:
+        db.close()
+    if items is None:
+        raise HTTPException(status_code=404, detail="Article not found")
+    return {"article_id": article_id, "related": items}
+
 @app.post("/extract_keywords")
 def extract_keywords_api(texts: list = Body(...)):
     keywords = extract_keywords_from_texts(texts, top_n=5)
@@ -262,8 +301,7 @@ def extract_keywords_api(texts: list = Body(...)):
 def get_keywords_for_latest_news(top_n: int = 5):
     db = SessionLocal()
     try:
-        articles = db.query(News).order_by(News.published_at.desc()).limit(20).all()
-        article_dicts = [{"title": a.title, "description": a.description} for a in articles]
+        article_dicts = [dict(r) for r in db.execute(lean.latest_news(20)).mappings()]
         keywords_list = extract_keywords(article_dicts, top_n=top_n)
         results = []
         for article, kws in zip(article_dicts, keywords_list):
@@ -304,15 +342,10 @@ def login_user_api(request: LoginRequest):
 def get_profile(username: str):
     db = SessionLocal()
     try:
-        user = db.query(User).filter(User.username == username).first()
+        user = db.execute(lean.user_profile(username)).mappings().first()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
-        return {
-            "username": user.username,
-            "email": user.email,
-            "language": user.language,
-            "interests": user.interests
-        }
+        return dict(user)
     finally:
         db.close()
 
@@ -373,59 +406,15 @@ async def analyze_batch(request: BatchAnalyzeRequest):
 
 # Analytics for Streamlit
 @app.get("/analytics/trend")
-def analytics_trend(days: int = 30):
-    db = SessionLocal()
-    try:
-        since = datetime.utcnow() - timedelta(days=days)
-
-        points = db.query(
-            func.date(Article.published_at).label("date"),
-            Topic.name.label("topic"),
-            func.count(Article.id).label("topic_count"),
-            func.avg(Sentiment.sentiment).label("avg_sentiment")
-        ).join(ArticleTopic, ArticleTopic.article_id == Article.id)\
-         .join(Topic, Topic.id == ArticleTopic.topic_id)\
-         .join(Sentiment, Sentiment.article_id == Article.id)\
-         .filter(Article.published_at.isnot(None))\
-         .filter(Article.published_at >= since)\
-         .group_by(func.date(Article.published_at), Topic.name).all()
-
-        sentiment_dist = dict(
-            db.query(Sentiment.sentiment_label, func.count(Sentiment.id))
-              .group_by(Sentiment.sentiment_label).all()
-        )
-
-        topic_sent = [
-            {
-                "topic": tname,
-                "avg_sentiment": float(avg or 0.0),
-                "n": int(n or 0)
-            }
-            for tname, avg, n in db.query(
-                Topic.name,
-                func.avg(Sentiment.sentiment),
-                func.count(Article.id)
-            ).join(ArticleTopic, ArticleTopic.topic_id == Topic.id)
-             .join(Article, Article.id == ArticleTopic.article_id)
-             .join(Sentiment, Sentiment.article_id == Article.id)
-             .group_by(Topic.name).all()
-        ]
-
-        return {
-            "points": [
-                {
-                    "date": str(d),
-                    "topic": topic,
-                    "topic_count": int(cnt or 0),
-                    "avg_sentiment": float(avg or 0.0)
-                }
-                for d, topic, cnt, avg in points
-            ],
-            "sentiment_distribution": sentiment_dist,
-            "topic_sentiment": topic_sent
-        }
-    finally:
-        db.close()
+async def analytics_trend(days: int = 30, db: AsyncSession = Depends(get_async_read_db)):
+    return {
+        "points": [
+            {k: p[k] for k in ("date", "topic", "topic_count", "avg_sentiment")}
+            for p in await rollups.trend_points(db, days)
+        ],
+        "sentiment_distribution": await rollups.sentiment_counts(db),
+        "topic_sentiment": await rollups.topic_sentiment(db)
+    }
 
 # Topic utilities
 class TopicsFromArticlesRequest(BaseModel):
@@ -447,26 +436,15 @@ class AddTopicsRequest(BaseModel):
 @app.post("/add_topics")
 def add_topics(request: AddTopicsRequest):
     db = SessionLocal()
-    created_topics: List[str] = []
-    added_mappings: List[dict] = []
     try:
         article = db.query(Article).filter_by(id=request.article_id).first()
         if not article:
             raise HTTPException(status_code=404, detail=f"Article with id {request.article_id} not found.")
-        for name in request.topic_names:
-            topic_obj = db.query(Topic).filter_by(name=name).first()
-            if not topic_obj:
-                topic_obj = Topic(name=name, description=f"News about {name}")
-                db.add(topic_obj)
-                db.flush()
-                created_topics.append(topic_obj.name)
-            mapping = db.query(ArticleTopic).filter_by(
-                article_id=request.article_id,
-                topic_id=topic_obj.id
-            ).first()
-            if not mapping:
-                db.add(ArticleTopic(article_id=request.article_id, topic_id=topic_obj.id))
-                added_mappings.append({"topic": name, "article_id": request.article_id})
+        names = [name for name in dict.fromkeys(request.topic_names) if name]
+        tids, created = topic_cache.get_or_create(db, names)
+        added = {tid for _, tid in topic_cache.map_topics(db, [(request.article_id, tids[name]) for name in names])}
+        created_topics = [name for name in names if name in created]
+        added_mappings = [{"topic": name, "article_id": request.article_id} for name in names if tids[name] in added]
         db.commit()
         return {
             "status": "success",
@@ -484,62 +462,12 @@ def add_topics(request: AddTopicsRequest):
 
 
 from fastapi import Query
-from sqlalchemy import func, case
-from datetime import datetime, timedelta
-from backend.database import SessionLocal
-from backend.models import Article, Topic, ArticleTopic, Sentiment
 
 @app.get("/analytics/trend_public")
-def analytics_trend_public(days: int = Query(30, ge=1, le=365), topic: str | None = None):
-    db = SessionLocal()
-    try:
-        since = datetime.utcnow() - timedelta(days=days)
-
-        # Counts by label from Sentiment.sentiment_label (string)
-        label_col = Sentiment.sentiment_label
-        pos = func.sum(case((label_col == "POSITIVE", 1), else_=0)).label("pos_count")
-        neg = func.sum(case((label_col == "NEGATIVE", 1), else_=0)).label("neg_count")
-        neu = func.sum(case((label_col == "NEUTRAL", 1), else_=0)).label("neu_count")
-
-        date_col = func.date(Article.published_at)
-
-        q = (
-            db.query(
-                date_col.label("date"),
-                Topic.name.label("topic"),
-                func.count(Article.id).label("topic_count"),
-                func.avg(Sentiment.sentiment).label("avg_sentiment"),
-                pos, neg, neu,
-            )
-            .join(ArticleTopic, ArticleTopic.article_id == Article.id)
-            .join(Topic, Topic.id == ArticleTopic.topic_id)
-            .join(Sentiment, Sentiment.article_id == Article.id)
-            .filter(Article.published_at.isnot(None))
-            .filter(Article.published_at >= since)
-        )
-        if topic:
-            q = q.filter(Topic.name == topic)
-
-        rows = (
-            q.group_by(date_col, Topic.name)
-             .order_by(date_col.asc())
-             .all()
-        )
-
-        return [
-            {
-                "date": str(d),
-                "topic": t,
-                "topic_count": int(cnt or 0),
-                "avg_sentiment": float(avg) if avg is not None else None,
-                "pos_count": int(pc or 0),
-                "neg_count": int(nc or 0),
-                "neu_count": int(ec or 0),
-            }
-            for d, t, cnt, avg, pc, nc, ec in rows
-        ]
-    finally:
-        db.close()
+async def analytics_trend_public(days: int = Query(30, ge=1, le=365), topic: str | None = None,
+                                 db: AsyncSession = Depends(get_async_read_db)):
+    # daily_topic_stats, kept current on commit by backend/rollups.py
+    return await rollups.trend_points(db, days, topic)
 
 
 
@@ -547,47 +475,27 @@ def analytics_trend_public(days: int = Query(30, ge=1, le=365), topic: str | Non
 
 
 
-from fastapi import Depends
-from sqlalchemy.orm import Session
-from backend.database import get_db
-
 @app.get("/geo/heat")
-def geo_heat(days: int = 30, topic: str | None = None, db: Session = Depends(get_db)):
+async def geo_heat(days: int = 30, topic: str | None = None, country: str | None = None,
+                   db: AsyncSession = Depends(get_async_read_db)):
     if not hasattr(Article, "lat") or not hasattr(Article, "lon"):
         return []
 
-    db = SessionLocal()
-    try:
-        since = datetime.utcnow() - timedelta(days=days)
-
-        q = (
-            db.query(
-                Article.lat,
-                Article.lon,
-                Article.published_at,
-                Topic.name.label("topic"),
-            )
-            .outerjoin(ArticleTopic, ArticleTopic.article_id == Article.id)
-            .outerjoin(Topic, Topic.id == ArticleTopic.topic_id)
-            .filter(Article.published_at.isnot(None))
-            .filter(Article.published_at >= since)
-            .filter(Article.lat.isnot(None))
-            .filter(Article.lon.isnot(None))
-        )
-
-        if topic:
-            q = q.filter(Topic.name == topic)
-
-        rows = q.all()
-        return [
-            {
-                "lat": float(lat),
-                "lon": float(lon),
-                "date": str(dt),
-                "topic": tp or "Unlabeled",
-                "weight": 1.0,
-            }
-            for lat, lon, dt, tp in rows
-        ]
-    finally:
-        db.close()
+    since = datetime.utcnow() - timedelta(days=days)
+    cols = lean.to_numpy(await db.execute(lean.geo_points(since, topic)), {"lat": float, "lon": float})
+    if not len(cols["lat"]):
+        return []
+    # one vectorized point-in-polygon pass for the whole result set, off the event loop
+    countries = await run_in_threadpool(countries_for, cols["lat"], cols["lon"])
+    return [
+        {
+            "lat": float(lat),
+            "lon": float(lon),
+            "date": str(dt),
+            "topic": tp or "Unlabeled",
+            "country": cn,
+            "weight": 1.0,
+        }
+        for lat, lon, dt, tp, cn in zip(cols["lat"], cols["lon"], cols["published_at"], cols["topic"], countries)
+        if not country or cn == country
+    ]
@@ -5,23 +5,28 @@
 
 
 # backend/models.py
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, Float, ForeignKey, Boolean, LargeBinary, MetaData, Table, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 import datetime
 
 # ----- Existing tables (unchanged except where noted) -----
 
+# NEW: read-only view over articles (schema_upgrades.py). NewsAPI results are
+# stored once, in Article; the view keeps older readers of News working.
+# Declared on its own MetaData so create_all never creates a `news` table.
 class News(Base):
-    __tablename__ = "news"
-    id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, nullable=False)
-    source = Column(String)
-    published_at = Column(DateTime)
-    url = Column(String, unique=True)
-    description = Column(String)
-    image_url = Column(String, nullable=True)
-    fetched_at = Column(DateTime, default=datetime.datetime.utcnow)
+    __table__ = Table(
+        "news", MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("title", String, nullable=False),
+        Column("source", String),
+        Column("published_at", DateTime),
+        Column("url", String),
+        Column("description", String),
+        Column("image_url", String),
+        Column("fetched_at", DateTime),
+    )
 
 class User(Base):
     __tablename__ = "users"
@@ -51,6 +56,16 @@ class Article(Base):
     # NEW: geo columns
     lat = Column(Float, nullable=True)
     lon = Column(Float, nullable=True)
+    # NEW: near-duplicate link (syndicated copies point at the first copy seen)
+    canonical_id = Column(Integer, ForeignKey('articles.id'), nullable=True, index=True)
+    # NEW: full-text hydration bookkeeping (hydrate_fulltext.py)
+    hydrated_at = Column(DateTime, nullable=True, index=True)
+    hydrate_status = Column(String, nullable=True)
+    # NEW: failed enrichment attempts; enrich_worker gives up after ENRICH_MAX_ATTEMPTS
+    enrich_failures = Column(Integer, nullable=True)
+    # NEW: formerly only on News (NewsAPI results are stored here directly now)
+    image_url = Column(String, nullable=True)
+    fetched_at = Column(DateTime, default=datetime.datetime.utcnow)
     topics = relationship("ArticleTopic", back_populates="article")
     sentiment = relationship("Sentiment", uselist=False, back_populates="article")
 
@@ -69,15 +84,19 @@ class ArticleTopic(Base):
     topic_id = Column(Integer, ForeignKey('topics.id'))
     article = relationship("Article", back_populates="topics")
     topic = relationship("Topic", back_populates="articles")
+    # NEW: ON CONFLICT target for mapping writes (topic_cache.py)
+    __table_args__ = (Index("uq_article_topics_article_topic", "article_id", "topic_id", unique=True),)
 
 class Sentiment(Base):
     __tablename__ = "sentiments"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String)
-    article_id = Column(Integer, ForeignKey('articles.id'))
+    article_id = Column(Integer, ForeignKey('articles.id'), index=True)
     sentiment = Column(Float)
     sentiment_label = Column(String)
     article = relationship("Article", back_populates="sentiment")
+    # NEW: one sentiment per article, the ON CONFLICT target of enrichment.insert_sentiments
+    __table_args__ = (Index("uq_sentiments_article_id", "article_id", unique=True),)
 
 
 # New: admin sessions (opaque token storage)
@@ -86,4 +105,83 @@ class AdminSession(Base):
     token = Column(String, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
-    expires_at = Column(DateTime, nullable=False)
\ No newline at end of file
+    expires_at = Column(DateTime, nullable=False)
+
+# NEW: persistent geocode cache shared by ingestion and backfill (geocode_cache.py)
+class GeocodeCache(Base):
+    __tablename__ = "geocode_cache"
+    key = Column(String, primary_key=True)          # gazetteer.normalize_location(location)
+    lat = Column(Float, nullable=False)
+    lon = Column(Float, nullable=False)
+    source = Column(String)                         # "gazetteer", "nominatim", ...
+    confidence = Column(Float)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+# NEW: leased locks for job coordination when advisory locks are unavailable (coordination.py)
+class JobLease(Base):
+    __tablename__ = "job_leases"
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)         # coordination.NODE_ID of the current owner
+    acquired_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+# NEW: RSS/Atom feeds with conditional-GET validators and adaptive polling (rss_ingest.py)
+class Feed(Base):
+    __tablename__ = "feeds"
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String, unique=True, nullable=False)
+    title = Column(String)
+    etag = Column(String)
+    last_modified = Column(String)                  # sent back verbatim as If-Modified-Since
+    poll_interval = Column(Integer, nullable=False, default=900)   # seconds
+    next_poll_at = Column(DateTime, index=True)
+    last_polled_at = Column(DateTime)
+    last_item_at = Column(DateTime)                 # newest item published_at seen so far
+    last_status = Column(String)                    # "200", "304", "error:..."
+    error_count = Column(Integer, nullable=False, default=0)
+    active = Column(Boolean, nullable=False, default=True)
+
+# NEW: warm results for user-interest / repeated /news queries (prefetch.py)
+class QueryCache(Base):
+    __tablename__ = "query_cache"
+    key = Column(String, primary_key=True)          # "<language>:<cleaned query>"
+    query = Column(String, nullable=False)
+    language = Column(String, nullable=False)
+    article_ids = Column(Text)                      # JSON list, newest first
+    fetched_size = Column(Integer, nullable=False, default=0)   # page_size used for the last refresh
+    refreshed_at = Column(DateTime)
+    source = Column(String)                         # "prefetch" or "live"
+    hits = Column(Integer, nullable=False, default=0)
+    misses = Column(Integer, nullable=False, default=0)
+    last_requested_at = Column(DateTime)
+
+# NEW: per-day rollups behind the trend/insight endpoints (rollups.py)
+class DailyTopicStat(Base):
+    __tablename__ = "daily_topic_stats"
+    day = Column(Date, primary_key=True)            # date(Article.published_at), UTC
+    topic_id = Column(Integer, ForeignKey('topics.id'), primary_key=True)
+    topic = Column(String, nullable=False)          # Topic.name, denormalised for reads
+    article_count = Column(Integer, nullable=False, default=0)     # topic mappings, enriched or not
+    sentiment_count = Column(Integer, nullable=False, default=0)   # of which have a sentiment row
+    sentiment_sum = Column(Float, nullable=False, default=0.0)
+    pos_count = Column(Integer, nullable=False, default=0)
+    neg_count = Column(Integer, nullable=False, default=0)
+    neu_count = Column(Integer, nullable=False, default=0)
+    computed_at = Column(DateTime, nullable=False)
+
+class DailySentimentStat(Base):
+    __tablename__ = "daily_sentiment_stats"
+    day = Column(Date, primary_key=True)
+    label = Column(String, primary_key=True)        # Sentiment.sentiment_label as stored
+    count = Column(Integer, nullable=False, default=0)
+    sentiment_sum = Column(Float, nullable=False, default=0.0)
+    computed_at = Column(DateTime, nullable=False)
+
+# NEW: sentence embeddings for related-article lookup (related.py)
+class ArticleEmbedding(Base):
+    __tablename__ = "article_embeddings"
+    id = Column(Integer, primary_key=True)          # load order for incremental index refreshes
+    article_id = Column(Integer, ForeignKey('articles.id'), unique=True, nullable=False)
+    model = Column(String, nullable=False)
+    vector = Column(LargeBinary, nullable=False)    # float32, L2-normalised
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
@@ -0,0 +1,228 @@
+# backend/near_dup.py
+#
+# Near-duplicate detection for syndicated stories (MinHash + LSH banding).
+# Wire copies republished with slightly different titles are linked to the
+# first copy we saw (Article.canonical_id) and reuse its sentiment/topics.
+#
+# The in-process index only holds the comparison window: articles older than
+# NEAR_DUP_WINDOW_DAYS (by published_at, or by when they were indexed) are
+# evicted as new ones arrive, and it never holds more than
+# NEAR_DUP_MAX_ARTICLES. Partition retention (partitioning.py) removes the
+# articles it retires.
+import hashlib
+import os
+import re
+import threading
+from collections import Counter, deque
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func
+
+from . import topic_cache
+from .enrichment import insert_sentiments
+from .models import Article, ArticleTopic, Sentiment
+
+NUM_PERM = 128
+BANDS = 32              # 32 bands x 4 rows -> candidates from ~0.42 Jaccard
+ROWS = NUM_PERM // BANDS
+THRESHOLD = 0.7         # estimated Jaccard needed to call it a duplicate
+SHINGLE = 5             # character shingles
+WINDOW_DAYS = int(os.getenv("NEAR_DUP_WINDOW_DAYS", "7"))
+MAX_ARTICLES = int(os.getenv("NEAR_DUP_MAX_ARTICLES", "500000"))
+
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, _PRIME, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, size=NUM_PERM, dtype=np.uint64)
+
+# "Headline - Reuters", "Headline | CNN"
+_SOURCE_SUFFIX = re.compile(r"\s+[-|–—]\s+[^-|–—]{1,40}$")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(title: str | None, description: str | None = None) -> str:
+    title = _SOURCE_SUFFIX.sub("", (title or "").strip())
+    text = f"{title} {description or ''}".lower()
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def signature(text: str) -> np.ndarray | None:
+    if len(text) < SHINGLE:
+        return None
+    shingles = {text[i:i + SHINGLE] for i in range(len(text) - SHINGLE + 1)}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    # ((a*x + b) mod p) & 0xffffffff for every permutation (uint64 wraparound is intended)
+    perm = ((np.outer(hashes, _A) + _B) % _PRIME) & _MAX_HASH
+    return perm.min(axis=0)
+
+
+class NearDupIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: dict[tuple[int, bytes], set[int]] = {}
+        self._sigs: dict[int, np.ndarray] = {}
+        self._canonical: dict[int, int] = {}
+        self._order: deque[tuple[datetime, int]] = deque()   # (indexed as of, article_id), oldest first
+        self.evicted = 0
+        self.warmed = False
+        self.inference_calls_saved = 0
+
+    def __len__(self):
+        return len(self._sigs)
+
+    def _bands(self, sig: np.ndarray):
+        for b in range(BANDS):
+            yield b, sig[b * ROWS:(b + 1) * ROWS].tobytes()
+
+    def _best_match(self, sig: np.ndarray) -> int | None:
+        candidates = set()
+        for key in self._bands(sig):
+            candidates.update(self._buckets.get(key, ()))
+        best, best_sim = None, THRESHOLD
+        for cid in candidates:
+            sim = float(np.mean(self._sigs[cid] == sig))
+            if sim >= best_sim:
+                best, best_sim = cid, sim
+        return best
+
+    def _drop(self, article_id: int) -> bool:
+        sig = self._sigs.pop(article_id, None)
+        if sig is None:
+            return False
+        self._canonical.pop(article_id, None)
+        for key in self._bands(sig):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(article_id)
+                if not bucket:
+                    del self._buckets[key]
+        self.evicted += 1
+        return True
+
+    def _evict(self, now: datetime):
+        cutoff = now - timedelta(days=WINDOW_DAYS)
+        while self._order and (self._order[0][0] < cutoff or len(self._sigs) >= MAX_ARTICLES):
+            _, aid = self._order.popleft()
+            self._drop(aid)
+
+    def remove(self, article_ids) -> int:
+        """Forget articles that were deleted (partition retention). Returns how many were indexed."""
+        with self._lock:
+            return sum(self._drop(a) for a in article_ids)
+
+    def add(self, article_id: int, title: str | None, description: str | None = None,
+            canonical_id: int | None = None, published_at: datetime | None = None) -> int | None:
+        """
+        Index an article. Returns the canonical article id it duplicates,
+        or None if it starts a new cluster.
+        """
+        sig = signature(normalize(title, description))
+        if sig is None:
+            return None
+        now = datetime.utcnow()
+        with self._lock:
+            if article_id in self._sigs:
+                return self._canonical.get(article_id)
+            self._evict(now)
+            if canonical_id is None:
+                match = self._best_match(sig)
+                if match is not None:
+                    canonical_id = self._canonical.get(match, match)
+            self._sigs[article_id] = sig
+            if canonical_id is not None:
+                self._canonical[article_id] = canonical_id
+            for key in self._bands(sig):
+                self._buckets.setdefault(key, set()).add(article_id)
+            # never in the future, so one bad timestamp can't hold up eviction behind it
+            self._order.append((min(published_at or now, now), article_id))
+            return canonical_id
+
+    def warm(self, db, days: int = WINDOW_DAYS):
+        """Load recent articles so duplicates of already-stored stories are caught."""
+        since = datetime.utcnow() - timedelta(days=days)
+        rows = (
+            db.query(Article.id, Article.title, Article.description, Article.canonical_id, Article.published_at)
+            .filter(Article.published_at >= since)
+            .order_by(Article.published_at.asc(), Article.id.asc())
+            .yield_per(1000)
+        )
+        for aid, title, desc, canonical, published in rows:
+            self.add(aid, title, desc, canonical_id=canonical, published_at=published)
+        self.warmed = True
+        print(f"Near-dup index warmed with {len(self)} articles")
+
+
+dup_index = NearDupIndex()
+
+
+def get_index(db) -> NearDupIndex:
+    if not dup_index.warmed:
+        dup_index.warm(db)
+    return dup_index
+
+
+def link_duplicate(db, article: Article) -> int | None:
+    """Index a freshly inserted (flushed) article and set canonical_id if it is a near-duplicate."""
+    canonical = get_index(db).add(article.id, article.title, article.description,
+                                  published_at=article.published_at)
+    if canonical is not None and canonical != article.id:
+        article.canonical_id = canonical
+    return article.canonical_id
+
+
+def inherit_enrichment(db, article: Article) -> Sentiment | None:
+    """
+    Copy sentiment and topic mappings from the canonical article.
+    Returns the canonical Sentiment, or None if the canonical has not been analysed yet
+    (caller then runs inference as usual).
+    """
+    if not article.canonical_id:
+        return None
+    src = db.query(Sentiment).filter_by(article_id=article.canonical_id).first()
+    if not src:
+        return None
+    insert_sentiments(db, [{
+        "article_id": article.id,
+        "title": article.title,
+        "sentiment": src.sentiment,
+        "sentiment_label": src.sentiment_label,
+    }])
+    topic_cache.map_topics(db, [
+        (article.id, topic_id)
+        for (topic_id,) in db.query(ArticleTopic.topic_id).filter_by(article_id=article.canonical_id)
+    ])
+    dup_index.inference_calls_saved += 2  # sentiment + topic tagging
+    return src
+
+
+def cluster_stats(db, top: int = 10) -> dict:
+    rows = (
+        db.query(Article.canonical_id, func.count(Article.id))
+        .filter(Article.canonical_id.isnot(None))
+        .group_by(Article.canonical_id)
+        .all()
+    )
+    sizes = {cid: n + 1 for cid, n in rows}  # + the canonical itself
+    histogram = Counter(sizes.values())
+    biggest = sorted(sizes.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    titles = dict(
+        db.query(Article.id, Article.title).filter(Article.id.in_([cid for cid, _ in biggest])).all()
+    ) if biggest else {}
+    duplicates = sum(n - 1 for n in sizes.values())
+    return {
+        "clusters": len(sizes),
+        "duplicate_articles": duplicates,
+        "cluster_size_histogram": {int(k): int(v) for k, v in sorted(histogram.items())},
+        "largest_clusters": [
+            {"canonical_id": cid, "size": n, "title": titles.get(cid)} for cid, n in biggest
+        ],
+        # per process since start; each duplicate skips one sentiment and one topic pass
+        "inference_calls_saved": dup_index.inference_calls_saved,
+        "indexed_articles": len(dup_index),
+        "evicted_articles": dup_index.evicted,
+    }
@@ -1,70 +1,91 @@
 import requests
-from datetime import datetime, timezone
+from itertools import batched
 from .config import NEWS_API_KEY, BASE_URL
 from .database import SessionLocal
-from .models import News
+from .models import Article
+from .feed_stream import iter_response_items
+from .ingest_gdelt import upsert_articles
 
-def make_aware(dt):
-    if dt is None:
-        return None
-    if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt
+# Rows per existence check/commit when persisting NewsAPI results
+BATCH_SIZE = 100
 
 
-
-def fetch_news(query: str, language: str = "en", page_size: int = 5):
+def iter_news(query: str, language: str = "en", page_size: int = 5):
+    """
+    Yield raw NewsAPI article dicts as the response body is stream-parsed.
+    Raises RuntimeError on a non-200 response.
+    """
     # Added sortBy=publishedAt to get latest news first
     url = f"{BASE_URL}?q={query}&language={language}&pageSize={page_size}&sortBy=publishedAt&apiKey={NEWS_API_KEY}"
     print(f"Fetching news from URL: {url}")  # Debug print of request URL
-    response = requests.get(url)
+    response = requests.get(url, stream=True)
 
     if response.status_code != 200:
         print(f"Error fetching news: {response.status_code} - {response.text}")  # Debug error
-        return {"error": f"Error fetching news: {response.status_code}"}
+        response.close()
+        raise RuntimeError(f"Error fetching news: {response.status_code}")
 
-    news_data = response.json()
-    articles = news_data.get("articles", [])
-    print(f"Fetched {len(articles)} articles")  # Print count of fetched articles
+    count = 0
+    for article in iter_response_items(response, keys=("articles",)):
+        # Print title and description of first few articles to inspect content presence
+        if count < 3:
+            print(f" Article {count + 1} published at: {article.get('publishedAt')}")
+            print(f" Article {count + 1} title: {article.get('title')}")
+            print(f" Article {count + 1} description: {article.get('description')}")
+        count += 1
+        yield article
+    print(f"Fetched {count} articles")  # Print count of fetched articles
 
-    # Print title and description of first few articles to inspect content presence
-    for i, article in enumerate(articles[:3]):
-        print(f" Article {i + 1} published at: {article.get('publishedAt')}")
-        print(f" Article {i + 1} title: {article.get('title')}")
-        print(f" Article {i + 1} description: {article.get('description')}")
 
-    results = []
-    db = SessionLocal()
+def _store_news_batch(db, articles) -> list[dict]:
+    # NewsAPI results go straight into Article (the `news` view reads from it)
+    docs = [
+        {
+            "title": article.get("title") or "No title",
+            "url": article.get("url"),
+            "published_at": article.get("publishedAt"),
+            "source": (article.get("source") or {}).get("name", "Unknown"),
+            "description": article.get("description"),
+            "image_url": article.get("urlToImage"),
+            "location": None,
+            "lat": None,
+            "lon": None,
+        }
+        for article in articles
+        if article.get("url")
+    ]
+    upsert_articles(db, docs)   # one existence check per batch, ISO timestamps parsed in bulk
+    db.commit()
 
-    for article in articles:
-        published_at = article.get("publishedAt")
-        if published_at:
-            published_at = datetime.fromisoformat(published_at.replace("Z", "+00:00"))
-            published_at = make_aware(published_at)
+    urls = [d["url"] for d in docs]
+    stored = {a.url: a for a in db.query(Article).filter(Article.url.in_(urls))} if urls else {}
+    return [
+        {
+            "title": a.title,
+            "source": a.source,
+            "publishedAt": a.published_at,
+            "url": a.url,
+            "description": a.description,
+            "urlToImage": a.image_url,
+            "article_id": a.id,
+            "canonical_id": a.canonical_id,
+        }
+        for a in (stored[u] for u in dict.fromkeys(urls) if u in stored)
+    ]
 
-        news_item = News(
-            title=article.get("title", "No title"),
-            source=article["source"].get("name", "Unknown"),
-            published_at=published_at,
-            url=article.get("url", "#"),
-            description=article.get("description", "No description"),  # Store description
-            image_url=article.get("urlToImage")
-        )
 
-        # Check for existing article by URL before inserting
-        if not db.query(News).filter(News.url == news_item.url).first():
-            db.add(news_item)
-            db.commit()
-
-        results.append({
-            "title": news_item.title,
-            "source": news_item.source,
-            "publishedAt": news_item.published_at,
-            "url": news_item.url,
-            "description": news_item.description,
-            "image": news_item.image_url
-        })
+def fetch_news(query: str, language: str = "en", page_size: int = 5):
+    try:
+        stream = iter_news(query, language, page_size=page_size)
+        results = []
+        db = SessionLocal()
+        try:
+            for batch in batched(stream, BATCH_SIZE):
+                results.extend(_store_news_batch(db, batch))
+        finally:
+            db.close()
+    except RuntimeError as e:
+        return {"error": str(e)}
 
-    db.close()
     print(f"Stored {len(results)} articles from NewsAPI")
     return results
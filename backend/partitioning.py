@@ -0,0 +1,281 @@
+# backend/partitioning.py
+#
+# Optional monthly range partitioning of `articles` on published_at
+# (PostgreSQL 13+ declarative partitioning).
+#
+#   articles                 PARTITION BY RANGE (published_at)
+#     articles_p202501       [2025-01-01, 2025-02-01)
+#     ...                    created PARTITION_AHEAD_MONTHS ahead of time
+#     articles_pdefault      NULL published_at and anything without a month
+#
+# Queries with `published_at >= since` then only scan the recent partitions.
+#
+# Constraints that a partitioned table cannot express are moved out:
+#   - a unique constraint must include the partition key, so url uniqueness is
+#     kept in article_urls (url PK) by a row trigger on articles;
+#   - foreign keys into articles(id) are dropped (sentiments, article_topics,
+#     article_embeddings, articles.canonical_id). Those tables have no published_at and stay
+#     unpartitioned; retention moves their rows out together with the month.
+#   - the parent has no primary key; ids still come from articles_id_seq and
+#     each partition gets an index on id.
+#
+# Retention (PARTITION_RETENTION_MONTHS, unset = keep everything) removes
+# whole months: "detach" (default) keeps each month as standalone
+# articles_pYYYYMM / _sentiments / _article_topics tables for dumping or
+# archiving, "drop" deletes them. Daily rollups (rollups.py) are not touched,
+# so trends still cover archived months.
+#
+#   python -m backend.partitioning migrate           # one-off, locks articles while copying
+#   python -m backend.partitioning maintain          # create ahead + apply retention
+#   python -m backend.partitioning status
+import argparse
+import os
+import re
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+from .near_dup import dup_index
+
+AHEAD_MONTHS = int(os.getenv("PARTITION_AHEAD_MONTHS", "3"))
+RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", "0")) or None
+RETENTION_MODE = os.getenv("PARTITION_RETENTION_MODE", "detach")    # detach | drop
+
+DEFAULT_PARTITION = "articles_pdefault"
+DEPENDENTS = ("sentiments", "article_topics", "article_embeddings")
+
+_NAME = re.compile(r"^articles_p(\d{4})(\d{2})$")
+
+_URL_TRIGGER = """
+CREATE OR REPLACE FUNCTION articles_url_unique() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.url IS NOT NULL THEN
+        DELETE FROM article_urls WHERE url = OLD.url AND article_id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.url IS NOT NULL THEN
+        INSERT INTO article_urls (url, article_id) VALUES (NEW.url, NEW.id);   -- unique_violation on duplicates
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql
+"""
+
+
+def _month(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def _add_months(d: date, n: int) -> date:
+    y, m = divmod(d.year * 12 + d.month - 1 + n, 12)
+    return date(y, m + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"articles_p{month:%Y%m}"
+
+
+def is_partitioned(conn) -> bool:
+    kind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('articles')")).scalar()
+    return kind == "p"
+
+
+def partitions(conn) -> dict[str, date | None]:
+    """Attached partitions: name -> first day of its month (None for the default partition)."""
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'articles'::regclass"
+    ))
+    out = {}
+    for (name,) in rows:
+        m = _NAME.match(name)
+        out[name] = date(int(m[1]), int(m[2]), 1) if m else None
+    return out
+
+
+def _insert_columns(conn, table: str) -> str:
+    """Column list for INSERT ... SELECT; generated columns (search_vector) can't be written."""
+    return conn.execute(text(
+        "SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) FROM pg_attribute "
+        "WHERE attrelid = CAST(:t AS regclass) AND attnum > 0 AND NOT attisdropped AND attgenerated = ''"
+    ), {"t": table}).scalar()
+
+
+def create_partition(conn, month: date) -> bool:
+    """Create the partition for `month` if missing. Rows already sitting in the default partition move in."""
+    name = partition_name(month)
+    if conn.execute(text("SELECT to_regclass(:n)"), {"n": name}).scalar():
+        return False
+    start, end = month, _add_months(month, 1)
+    bounds = {"s": start, "e": end}
+    # a new range may not overlap rows in the default partition: park them, create, put them back
+    conn.execute(text(
+        f"CREATE TEMP TABLE _moved ON COMMIT DROP AS SELECT * FROM {DEFAULT_PARTITION} "
+        "WHERE published_at >= :s AND published_at < :e"
+    ), bounds)
+    moved = conn.execute(text(
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE published_at >= :s AND published_at < :e"
+    ), bounds).rowcount
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF articles FOR VALUES FROM ('{start}') TO ('{end}')"
+    ))
+    if moved:
+        cols = _insert_columns(conn, "articles")
+        conn.execute(text(f"INSERT INTO articles ({cols}) SELECT {cols} FROM _moved"))
+    conn.execute(text("DROP TABLE _moved"))
+    print(f"[partitioning] created {name}" + (f" ({moved} rows from default)" if moved else ""))
+    return True
+
+
+def ensure_partitions(conn, ahead: int = AHEAD_MONTHS) -> int:
+    this_month = _month(datetime.utcnow().date())
+    return sum(create_partition(conn, _add_months(this_month, i)) for i in range(ahead + 1))
+
+
+# ---------------------------------------------------
+# Retention
+# ---------------------------------------------------
+
+def retire_partition(conn, name: str, mode: str = RETENTION_MODE):
+    """Detach one month and take its dependents and url entries with it."""
+    ids = f"SELECT id FROM {name}"
+    # this process's near-duplicate index must not match new articles against retired ones
+    retired = conn.execute(text(ids)).scalars().all() if len(dup_index) else []
+    conn.execute(text(f"ALTER TABLE articles DETACH PARTITION {name}"))
+    conn.execute(text(f"DELETE FROM article_urls WHERE article_id IN ({ids})"))
+    for dep in DEPENDENTS:
+        if mode == "detach":
+            conn.execute(text(f"CREATE TABLE {name}_{dep} AS SELECT * FROM {dep} WHERE article_id IN ({ids})"))
+        conn.execute(text(f"DELETE FROM {dep} WHERE article_id IN ({ids})"))
+    if mode == "drop":
+        conn.execute(text(f"DROP TABLE {name}"))
+    dup_index.remove(retired)
+    print(f"[partitioning] {'detached' if mode == 'detach' else 'dropped'} {name}")
+
+
+def apply_retention(conn, months: int | None = RETENTION_MONTHS, mode: str = RETENTION_MODE) -> list[str]:
+    """Retire monthly partitions entirely older than `months` full months."""
+    if not months:
+        return []
+    if mode not in ("detach", "drop"):
+        raise ValueError(f"unknown retention mode {mode!r}")
+    cutoff = _add_months(_month(datetime.utcnow().date()), -months)
+    old = sorted(n for n, m in partitions(conn).items() if m is not None and m < cutoff)
+    for name in old:
+        retire_partition(conn, name, mode)
+    return old
+
+
+def maintain(engine) -> dict:
+    """Scheduler entry point: create upcoming months, apply retention. No-op if not partitioned."""
+    if engine.dialect.name != "postgresql":
+        return {"partitioned": False}
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return {"partitioned": False}
+        conn.execute(text("SET LOCAL lock_timeout = '10s'"))
+        created = ensure_partitions(conn)
+        retired = apply_retention(conn)
+    return {"partitioned": True, "created": created, "retired": retired}
+
+
+# ---------------------------------------------------
+# One-off migration
+# ---------------------------------------------------
+
+def migrate(engine, ahead: int = AHEAD_MONTHS, keep_old: bool = False):
+    """Convert a plain `articles` table into a partitioned one, copying every row."""
+    if engine.dialect.name != "postgresql":
+        raise RuntimeError("partitioning needs PostgreSQL")
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            print("articles is already partitioned")
+            return
+        conn.execute(text("LOCK TABLE articles IN ACCESS EXCLUSIVE MODE"))
+
+        fks = conn.execute(text(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid = 'articles'::regclass"
+        )).all()
+        for table, fk in fks:
+            conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{fk}"'))
+            print(f"dropped foreign key {table}.{fk}")
+
+        conn.execute(text("ALTER TABLE articles RENAME TO articles_unpartitioned"))
+        conn.execute(text(
+            "CREATE TABLE articles (LIKE articles_unpartitioned INCLUDING DEFAULTS "
+            "INCLUDING GENERATED INCLUDING STORAGE INCLUDING COMPRESSION) PARTITION BY RANGE (published_at)"
+        ))
+        seq = conn.execute(text("SELECT pg_get_serial_sequence('articles_unpartitioned', 'id')")).scalar()
+        if seq:
+            # keep using the serial's sequence, but let it outlive the old table
+            conn.execute(text(f"ALTER SEQUENCE {seq} OWNED BY articles.id"))
+        for col in ("id", "published_at", "canonical_id", "hydrated_at", "url"):
+            conn.execute(text(f"CREATE INDEX ON articles ({col})"))
+        if conn.execute(text("SELECT 1 FROM pg_attribute WHERE attrelid = 'articles'::regclass "
+                             "AND attname = 'search_vector' AND NOT attisdropped")).scalar():
+            conn.execute(text("CREATE INDEX ON articles USING GIN (search_vector)"))
+
+        conn.execute(text("CREATE TABLE IF NOT EXISTS article_urls (url VARCHAR PRIMARY KEY, article_id INTEGER NOT NULL)"))
+        conn.execute(text(_URL_TRIGGER))
+        conn.execute(text(
+            "CREATE TRIGGER articles_url_unique AFTER INSERT OR UPDATE OF url, id OR DELETE ON articles "
+            "FOR EACH ROW EXECUTE FUNCTION articles_url_unique()"
+        ))
+
+        conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF articles DEFAULT"))
+        first = conn.execute(text("SELECT min(published_at) FROM articles_unpartitioned")).scalar()
+        month = _month(first.date()) if first else _month(datetime.utcnow().date())
+        last = _add_months(_month(datetime.utcnow().date()), ahead)
+        while month <= last:
+            create_partition(conn, month)
+            month = _add_months(month, 1)
+
+        cols = _insert_columns(conn, "articles")
+        n = conn.execute(text(f"INSERT INTO articles ({cols}) SELECT {cols} FROM articles_unpartitioned")).rowcount
+        conn.execute(text("SELECT setval(pg_get_serial_sequence('articles', 'id'), "
+                          "(SELECT coalesce(max(id), 0) + 1 FROM articles), false)"))
+        if not keep_old:
+            conn.execute(text("DROP TABLE articles_unpartitioned"))
+        print(f"Partitioned articles: {n} rows copied" + (", old table kept as articles_unpartitioned" if keep_old else ""))
+
+
+def partition_status(engine) -> dict:
+    if engine.dialect.name != "postgresql":
+        return {"partitioned": False}
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            return {"partitioned": False}
+        rows = conn.execute(text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint, "
+            "pg_total_relation_size(c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'articles'::regclass ORDER BY c.relname"
+        )).all()
+    return {
+        "partitioned": True,
+        "retention_months": RETENTION_MONTHS,
+        "retention_mode": RETENTION_MODE,
+        "partitions": [
+            {"name": name, "bounds": bounds, "approx_rows": max(int(n), 0), "bytes": int(size)}
+            for name, bounds, n, size in rows
+        ],
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Monthly partitioning of the articles table")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_mig = sub.add_parser("migrate")
+    p_mig.add_argument("--ahead", type=int, default=AHEAD_MONTHS)
+    p_mig.add_argument("--keep-old", action="store_true", help="keep the copied table as articles_unpartitioned")
+    sub.add_parser("maintain")
+    sub.add_parser("status")
+    args = ap.parse_args()
+
+    from backend.database import engine
+    if args.cmd == "migrate":
+        migrate(engine, ahead=args.ahead, keep_old=args.keep_old)
+    elif args.cmd == "maintain":
+        print(maintain(engine))
+    else:
+        for p in partition_status(engine).get("partitions", []):
+            print(f"{p['name']:<20} {p['approx_rows']:>10} rows  {p['bytes'] / 1e6:>8.1f} MB  {p['bounds']}")
@@ -0,0 +1,340 @@
+# backend/pipeline.py
+#
+# Staged streaming ingestion:
+#
+#   fetch -> normalize/dedupe -> geocode -> NLP enrich -> persist
+#
+# Stages are connected by bounded queues, so a slow stage blocks its
+# producers (backpressure) instead of letting memory grow. Each stage has its
+# own worker count; I/O stages use threads, model stages can use processes.
+#
+#   python -m backend.pipeline --source gdelt --query "(AI OR climate)" --hours 24 --sharded
+#   python -m backend.pipeline --source newsapi --query climate --workers enrich=2 --enrich-kind process
+import argparse
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from queue import Queue, Empty
+from typing import Callable, Iterable
+
+from .database import SessionLocal
+from .enrichment import analyze_texts, write_enrichment
+from .ingest_gdelt import upsert_articles
+from .models import Article
+from . import geocode_cache
+
+_STOP = object()
+
+
+class StageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.batches = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_batch_seconds = 0.0
+        self.blocked_seconds = 0.0   # time spent waiting on a full downstream queue
+        self._lock = threading.Lock()
+
+    def record(self, n_in: int, n_out: int, seconds: float, blocked: float):
+        with self._lock:
+            self.items_in += n_in
+            self.items_out += n_out
+            self.batches += 1
+            self.busy_seconds += seconds
+            self.blocked_seconds += blocked
+            self.max_batch_seconds = max(self.max_batch_seconds, seconds)
+
+    def snapshot(self, elapsed: float, queue_depth: int | None = None) -> dict:
+        return {
+            "stage": self.name,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "errors": self.errors,
+            "items_per_sec": round(self.items_out / elapsed, 1) if elapsed else 0.0,
+            "avg_batch_ms": round(1000 * self.busy_seconds / self.batches, 1) if self.batches else 0.0,
+            "max_batch_ms": round(1000 * self.max_batch_seconds, 1),
+            "blocked_s": round(self.blocked_seconds, 2),
+            "queue_depth": queue_depth,
+        }
+
+
+class Stage:
+    """
+    fn(batch: list) -> list. Workers pull up to `batch_size` items from the inbox
+    (flushing partial batches after `linger` seconds) and push outputs downstream.
+    kind="process" runs fn in a process pool of `workers` processes (fn must be
+    a picklable top-level function).
+    """
+
+    def __init__(self, name: str, fn: Callable[[list], list], workers: int = 1, kind: str = "thread",
+                 batch_size: int = 50, queue_size: int = 200, linger: float = 0.5):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.kind = kind
+        self.batch_size = batch_size
+        self.linger = linger
+        self.inbox: Queue = Queue(maxsize=queue_size)
+        self.stats = StageStats(name)
+        self._pool = None
+        self._alive = 0
+        self._lock = threading.Lock()
+
+    def _take_batch(self):
+        items = []
+        deadline = None
+        while len(items) < self.batch_size:
+            timeout = None if not items else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.inbox.get(timeout=timeout)
+            except Empty:
+                break
+            if item is _STOP:
+                self.inbox.put(_STOP)      # let sibling workers see it too
+                return items, True
+            items.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.linger
+        return items, False
+
+    def _run(self, downstream: "Stage | None"):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._take_batch()
+            if not batch:
+                continue
+            t0 = time.perf_counter()
+            try:
+                if self._pool is not None:
+                    out = self._pool.submit(self.fn, batch).result()
+                else:
+                    out = self.fn(batch)
+            except Exception as e:
+                self.stats.errors += len(batch)
+                print(f"[pipeline:{self.name}] batch of {len(batch)} failed: {e}")
+                out = []
+            busy = time.perf_counter() - t0
+            t1 = time.perf_counter()
+            if downstream is not None:
+                for item in out or ():
+                    downstream.inbox.put(item)  # blocks when downstream is full
+            self.stats.record(len(batch), len(out or ()), busy, time.perf_counter() - t1)
+
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+        if last and downstream is not None:
+            downstream.inbox.put(_STOP)
+
+    def start(self, downstream: "Stage | None") -> list[threading.Thread]:
+        if self.kind == "process":
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._alive = self.workers
+        threads = [
+            threading.Thread(target=self._run, args=(downstream,), name=f"{self.name}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in threads:
+            t.start()
+        return threads
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+
+
+class Pipeline:
+    def __init__(self, source: Iterable[dict], stages: list[Stage], report_every: float = 10.0):
+        self.source = source
+        self.stages = stages
+        self.report_every = report_every
+        self.source_stats = StageStats("fetch")
+        self._t0 = None
+
+    def stats(self) -> list[dict]:
+        elapsed = time.perf_counter() - self._t0 if self._t0 else 0.0
+        out = [self.source_stats.snapshot(elapsed, None)]
+        out += [s.stats.snapshot(elapsed, s.inbox.qsize()) for s in self.stages]
+        return out
+
+    def _feed(self):
+        first = self.stages[0]
+        it = iter(self.source)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                break
+            except Exception as e:
+                self.source_stats.errors += 1
+                print(f"[pipeline:fetch] source failed: {e}")
+                break
+            fetched = time.perf_counter() - t0
+            t1 = time.perf_counter()
+            first.inbox.put(item)
+            self.source_stats.record(1, 1, fetched, time.perf_counter() - t1)
+        first.inbox.put(_STOP)
+
+    def run(self) -> list[dict]:
+        self._t0 = time.perf_counter()
+        threads = []
+        for i, stage in enumerate(self.stages):
+            downstream = self.stages[i + 1] if i + 1 < len(self.stages) else None
+            threads += stage.start(downstream)
+        feeder = threading.Thread(target=self._feed, name="fetch", daemon=True)
+        feeder.start()
+
+        last_report = time.perf_counter()
+        try:
+            for t in [feeder, *threads]:
+                while t.is_alive():
+                    t.join(timeout=1.0)
+                    if self.report_every and time.perf_counter() - last_report >= self.report_every:
+                        last_report = time.perf_counter()
+                        self._print(self.stats())
+        finally:
+            for stage in self.stages:
+                stage.shutdown()
+        final = self.stats()
+        self._print(final)
+        return final
+
+    @staticmethod
+    def _print(stats: list[dict]):
+        for s in stats:
+            print(f"  {s['stage']:<10} in={s['items_in']:<7} out={s['items_out']:<7} "
+                  f"{s['items_per_sec']:>8}/s  avg={s['avg_batch_ms']}ms max={s['max_batch_ms']}ms "
+                  f"blocked={s['blocked_s']}s q={s['queue_depth']} err={s['errors']}")
+
+
+# ---------------------------------------------------
+# Stage functions for news ingestion
+# ---------------------------------------------------
+
+def newsapi_docs(query: str, language: str = "en", page_size: int = 100):
+    from .news_service import iter_news
+    for a in iter_news(query, language, page_size=page_size):
+        yield {
+            "title": a.get("title"),
+            "url": a.get("url"),
+            "published_at": a.get("publishedAt"),
+            "source": (a.get("source") or {}).get("name"),
+            "description": a.get("description"),
+            "image_url": a.get("urlToImage"),
+            "location": None,
+            "lat": None,
+            "lon": None,
+        }
+
+
+class NormalizeDedupe:
+    """Drop URL-less docs and URLs already seen in this run or already stored."""
+
+    def __init__(self):
+        self.seen: set[str] = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, batch: list[dict]) -> list[dict]:
+        fresh = []
+        with self._lock:
+            for d in batch:
+                url = d.get("url")
+                if url and url not in self.seen:
+                    self.seen.add(url)
+                    fresh.append(d)
+        if not fresh:
+            return []
+        db = SessionLocal()
+        try:
+            stored = {u for (u,) in db.query(Article.url).filter(Article.url.in_([d["url"] for d in fresh]))}
+        finally:
+            db.close()
+        return [d for d in fresh if d["url"] not in stored]
+
+
+def geocode_batch(batch: list[dict]) -> list[dict]:
+    locs = [d["location"] for d in batch if d.get("location") and d.get("lat") is None]
+    if not locs:
+        return batch
+    db = SessionLocal()
+    try:
+        coords = geocode_cache.lookup_many(db, locs)
+        db.commit()
+    finally:
+        db.close()
+    out = []
+    for d in batch:
+        m = coords.get(d.get("location"))
+        out.append({**d, "lat": m.lat, "lon": m.lon} if m and d.get("lat") is None else d)
+    return out
+
+
+def enrich_batch(batch: list[dict]) -> list[dict]:
+    results = analyze_texts([d.get("description") or d.get("title") or "" for d in batch])
+    return [{**d, "nlp": r} for d, r in zip(batch, results)]
+
+
+def persist_batch(batch: list[dict]) -> list[dict]:
+    db = SessionLocal()
+    try:
+        upsert_articles(db, batch)
+        db.flush()
+        ids = dict(db.query(Article.url, Article.id).filter(Article.url.in_([d["url"] for d in batch])).all())
+        write_enrichment(db, [
+            (ids[d["url"]], d.get("title"), d["nlp"]) for d in batch if d.get("nlp") and d["url"] in ids
+        ])
+        db.commit()
+    finally:
+        db.close()
+    return batch
+
+
+def build_news_pipeline(source: Iterable[dict], workers: dict[str, int] | None = None,
+                        enrich_kind: str = "thread", queue_size: int = 200, batch_size: int = 50) -> Pipeline:
+    w = {"normalize": 1, "geocode": 2, "enrich": 1, "persist": 1, **(workers or {})}
+    stages = [
+        Stage("normalize", NormalizeDedupe(), workers=w["normalize"], batch_size=batch_size, queue_size=queue_size),
+        Stage("geocode", geocode_batch, workers=w["geocode"], batch_size=batch_size, queue_size=queue_size),
+        Stage("enrich", enrich_batch, workers=w["enrich"], kind=enrich_kind,
+              batch_size=batch_size, queue_size=queue_size),
+        Stage("persist", persist_batch, workers=w["persist"], batch_size=batch_size * 4, queue_size=queue_size),
+    ]
+    return Pipeline(source, stages)
+
+
+def _parse_workers(spec: str) -> dict[str, int]:
+    out = {}
+    for part in filter(None, (spec or "").split(",")):
+        name, _, n = part.partition("=")
+        out[name.strip()] = int(n)
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Run the staged ingestion pipeline")
+    ap.add_argument("--source", choices=["gdelt", "newsapi"], default="gdelt")
+    ap.add_argument("--query", required=True)
+    ap.add_argument("--hours", type=int, default=24)
+    ap.add_argument("--sharded", action="store_true", help="GDELT: time-window sharding past maxrecords")
+    ap.add_argument("--language", default="en")
+    ap.add_argument("--page-size", type=int, default=100)
+    ap.add_argument("--workers", default="", help="e.g. normalize=1,geocode=2,enrich=4,persist=1")
+    ap.add_argument("--enrich-kind", choices=["thread", "process"], default="thread")
+    ap.add_argument("--queue-size", type=int, default=200)
+    ap.add_argument("--batch-size", type=int, default=50)
+    args = ap.parse_args()
+
+    if args.source == "gdelt":
+        from .gdelt_client import iter_docs, iter_docs_sharded
+        src = (iter_docs_sharded(query=args.query, hours=args.hours) if args.sharded
+               else iter_docs(hours=args.hours, query=args.query, max_records=250))
+    else:
+        src = newsapi_docs(args.query, args.language, args.page_size)
+
+    pipe = build_news_pipeline(src, _parse_workers(args.workers), enrich_kind=args.enrich_kind,
+                               queue_size=args.queue_size, batch_size=args.batch_size)
+    pipe.run()
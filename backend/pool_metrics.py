@@ -0,0 +1,296 @@
+# backend/pool_metrics.py
+#
+# Connection pool instrumentation for every engine we create (primary, async,
+# replicas), exposed at GET /metrics/pool (JSON, or ?format=prometheus):
+#
+#   checkout wait      histogram of the time spent getting a connection from
+#                      the pool (includes connecting when the pool has to open one)
+#   in_use / idle      gauges, plus the peak in use since the last adaptive window
+#   overflow           checkouts served beyond pool_size; timeouts = pool exhausted
+#   connects / closes  connection churn; under NullPool (port 6543) every
+#                      checkout is a connect and every checkin a close
+#
+# Optional adaptive sizing of the primary pool (DB_POOL_MODE=adaptive):
+#
+#   DB_MAX_CONNECTIONS=20        connections the app may hold on the server, all workers
+#   WEB_CONCURRENCY=1            worker processes sharing that budget (uvicorn/gunicorn)
+#   DB_POOL_MIN=2                never shrink below this
+#   DB_POOL_ADAPT_SECONDS=60     observation window
+#
+# Each worker gets ceiling = DB_MAX_CONNECTIONS // WEB_CONCURRENCY connections.
+# Every window the pool is resized to the peak concurrency seen (+25% headroom),
+# clamped to [DB_POOL_MIN, ceiling]; the rest of the ceiling stays available as
+# overflow, so bursts are served but do not keep idle connections open. The
+# async and replica pools are not resized; budget them separately.
+import bisect
+import math
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+POOL_MODE = os.getenv("DB_POOL_MODE", "fixed")      # fixed | adaptive
+MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "20"))
+WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+ADAPT_INTERVAL = float(os.getenv("DB_POOL_ADAPT_SECONDS", "60"))
+
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)      # last one is +Inf
+        self.wait_sum_ms = 0.0
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidated = 0
+        self.in_use = 0
+        self.peak_in_use = 0        # reset by the adaptive sizer each window
+        self.resizes = []           # (time, pool_size, max_overflow) for the last few resizes
+        self._lock = threading.Lock()
+
+    def observe_wait(self, seconds: float):
+        ms = seconds * 1000
+        with self._lock:
+            self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+            self.wait_sum_ms += ms
+
+    def quantile_ms(self, q: float) -> float | None:
+        """Upper bucket bound holding the q-quantile (None without samples)."""
+        total = sum(self.buckets)
+        if not total:
+            return None
+        seen = 0
+        for bound, n in zip(BUCKETS_MS + (math.inf,), self.buckets):
+            seen += n
+            if seen >= q * total:
+                return bound
+        return math.inf
+
+
+_stats: dict[str, tuple[object, PoolStats]] = {}     # name -> (engine, stats)
+
+
+def _wrap_do_get(pool, stats: PoolStats):
+    # Pool events fire after a connection is handed out, so the wait is timed
+    # around the pool's own acquire step instead.
+    inner = pool._do_get
+
+    def _timed_do_get():
+        t0 = time.perf_counter()
+        try:
+            return inner()
+        except exc.TimeoutError:
+            with stats._lock:
+                stats.timeouts += 1
+            raise
+        finally:
+            stats.observe_wait(time.perf_counter() - t0)
+
+    pool._do_get = _timed_do_get
+
+
+def instrument(engine, name: str) -> PoolStats:
+    """Attach counters to `engine` (sync Engine, or AsyncEngine.sync_engine)."""
+    stats = PoolStats(name)
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        pool = engine.pool
+        with stats._lock:
+            stats.checkouts += 1
+            stats.in_use += 1
+            stats.peak_in_use = max(stats.peak_in_use, stats.in_use)
+            if isinstance(pool, QueuePool) and pool.checkedout() > pool.size():
+                stats.overflow_checkouts += 1
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_conn, record):
+        with stats._lock:
+            stats.in_use = max(0, stats.in_use - 1)
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_conn, record):
+        with stats._lock:
+            stats.connects += 1
+
+    @event.listens_for(engine, "close")
+    def _close(dbapi_conn, record):
+        with stats._lock:
+            stats.closes += 1
+
+    @event.listens_for(engine, "invalidate")
+    def _invalidate(dbapi_conn, record, exception):
+        with stats._lock:
+            stats.invalidated += 1
+
+    _wrap_do_get(engine.pool, stats)
+    _stats[name] = (engine, stats)
+    return stats
+
+
+# ---------------------------------------------------
+# Adaptive sizing
+# ---------------------------------------------------
+
+def worker_ceiling(max_connections: int = MAX_CONNECTIONS, workers: int = WORKERS) -> int:
+    return max(1, max_connections // workers)
+
+
+def target_size(peak: int, ceiling: int, minimum: int = POOL_MIN) -> int:
+    return max(min(minimum, ceiling), min(ceiling, math.ceil(peak * 1.25)))
+
+
+def resize(engine, pool_size: int, max_overflow: int):
+    """Swap in a pool of the new size, the way Engine.dispose() does.
+
+    Idle connections of the old pool are closed; checked-out ones finish their
+    work and are closed when the old pool is garbage collected."""
+    old = engine.pool
+    new = old.__class__(
+        old._creator,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pre_ping=old._pre_ping,
+        use_lifo=old._pool.use_lifo,
+        timeout=old._timeout,
+        recycle=old._recycle,
+        echo=old.echo,
+        logging_name=old._orig_logging_name,
+        reset_on_return=old._reset_on_return,
+        _dispatch=old.dispatch,
+        dialect=old._dialect,
+    )
+    for name, (eng, stats) in _stats.items():
+        if eng is engine:
+            _wrap_do_get(new, stats)
+            stats.resizes = (stats.resizes + [(time.time(), pool_size, max_overflow)])[-10:]
+    engine.pool = new
+    old.dispose()
+
+
+class AdaptiveSizer:
+    def __init__(self, engine, stats: PoolStats, ceiling: int, interval: float = ADAPT_INTERVAL):
+        self.engine = engine
+        self.stats = stats
+        self.ceiling = ceiling
+        self.interval = interval
+
+    def step(self) -> bool:
+        with self.stats._lock:
+            peak = max(self.stats.peak_in_use, self.stats.in_use)
+            self.stats.peak_in_use = self.stats.in_use
+        size = target_size(peak, self.ceiling)
+        if size == self.engine.pool.size():
+            return False
+        print(f"[pool] {self.stats.name}: peak {peak} in use, resizing {self.engine.pool.size()} -> {size}"
+              f" (+{self.ceiling - size} overflow)")
+        resize(self.engine, size, self.ceiling - size)
+        return True
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.step()
+            except Exception as e:
+                print(f"[pool] adaptive sizing failed: {e}")
+
+    def start(self):
+        threading.Thread(target=self._run, name="pool-sizer", daemon=True).start()
+
+
+def initial_sizes(pool_size: int, max_overflow: int) -> tuple[int, int]:
+    """Primary pool size/overflow at startup; in adaptive mode capped by the per-worker ceiling."""
+    if POOL_MODE != "adaptive":
+        return pool_size, max_overflow
+    ceiling = worker_ceiling()
+    size = min(max(pool_size, POOL_MIN), ceiling)
+    return size, ceiling - size
+
+
+def enable_adaptive(engine, stats: PoolStats):
+    if POOL_MODE == "adaptive" and isinstance(engine.pool, QueuePool):
+        AdaptiveSizer(engine, stats, worker_ceiling()).start()
+
+
+# ---------------------------------------------------
+# Reporting
+# ---------------------------------------------------
+
+def _snapshot(engine, s: PoolStats) -> dict:
+    pool = engine.pool
+    queued = isinstance(pool, QueuePool)
+    return {
+        "pool": type(pool).__name__,
+        "pool_size": pool.size() if queued else None,
+        "max_overflow": pool._max_overflow if queued else None,
+        "in_use": s.in_use,
+        "idle": pool.checkedin() if queued else 0,
+        "peak_in_use": s.peak_in_use,
+        "checkouts": s.checkouts,
+        "overflow_checkouts": s.overflow_checkouts,
+        "timeouts": s.timeouts,
+        "connects": s.connects,
+        "closes": s.closes,
+        "invalidated": s.invalidated,
+        "wait_ms": {
+            "count": sum(s.buckets),
+            "sum": round(s.wait_sum_ms, 2),
+            "p50": s.quantile_ms(0.50),
+            "p95": s.quantile_ms(0.95),
+            "p99": s.quantile_ms(0.99),
+            "buckets": {str(b): n for b, n in zip(BUCKETS_MS + ("+Inf",), s.buckets)},
+        },
+        "resizes": [{"at": round(t), "pool_size": ps, "max_overflow": mo} for t, ps, mo in s.resizes],
+    }
+
+
+def snapshot() -> dict:
+    return {
+        "mode": POOL_MODE,
+        "workers": WORKERS,
+        "pools": {name: _snapshot(engine, s) for name, (engine, s) in _stats.items()},
+    }
+
+
+def prometheus() -> str:
+    """Same numbers in the Prometheus text format."""
+    lines = []
+
+    def add(metric, kind, help_, samples):
+        lines.append(f"# HELP {metric} {help_}")
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.extend(samples)
+
+    snaps = snapshot()["pools"]
+    for key, kind, help_ in (
+        ("in_use", "gauge", "Connections checked out"),
+        ("idle", "gauge", "Connections idle in the pool"),
+        ("checkouts", "counter", "Connection checkouts"),
+        ("overflow_checkouts", "counter", "Checkouts served beyond pool_size"),
+        ("timeouts", "counter", "Checkouts that timed out on an exhausted pool"),
+        ("connects", "counter", "New DBAPI connections"),
+        ("closes", "counter", "Closed DBAPI connections"),
+    ):
+        add(f"db_pool_{key}", kind, help_,
+            [f'db_pool_{key}{{pool="{name}"}} {snap[key]}' for name, snap in snaps.items()])
+
+    samples = []
+    for name, (_, s) in _stats.items():
+        cumulative = 0
+        for bound, n in zip(BUCKETS_MS + ("+Inf",), s.buckets):
+            cumulative += n
+            le = bound if bound == "+Inf" else bound / 1000
+            samples.append(f'db_pool_checkout_wait_seconds_bucket{{pool="{name}",le="{le}"}} {cumulative}')
+        samples.append(f'db_pool_checkout_wait_seconds_sum{{pool="{name}"}} {s.wait_sum_ms / 1000:.6f}')
+        samples.append(f'db_pool_checkout_wait_seconds_count{{pool="{name}"}} {cumulative}')
+    add("db_pool_checkout_wait_seconds", "histogram", "Time to get a connection from the pool", samples)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,300 @@
+# backend/prefetch.py
+#
+# Background prefetch of the queries users are likely to run: every distinct
+# (interest, language) pair from User.interests/User.language, plus queries
+# people actually repeat. Results are fetched, enriched and stored ahead of
+# time in query_cache, so /news can answer from local data instead of calling
+# NewsAPI and running NLP while the user waits.
+#
+# Refreshes run from the scheduler's prefetch job. Inside the off-peak window
+# (PREFETCH_OFFPEAK_HOURS, UTC) everything older than PREFETCH_REFRESH_MINUTES
+# is refreshed; outside it only entries about to expire are.
+#
+# Hit/miss counts are kept in process and written to query_cache in one batched
+# upsert every PREFETCH_STATS_FLUSH_SECONDS (and at shutdown), so serving a
+# warm query doesn't write to the primary.
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from . import lean_queries as lean
+from .database import SessionLocal, upsert
+from .enrich_worker import inherited_results
+from .enrichment import analyze_texts, write_enrichment
+from .models import Article, QueryCache, Sentiment, User
+
+PAGE_SIZE = int(os.getenv("PREFETCH_PAGE_SIZE", "20"))
+MAX_QUERIES = int(os.getenv("PREFETCH_MAX_QUERIES", "50"))
+REFRESH_AGE = timedelta(minutes=float(os.getenv("PREFETCH_REFRESH_MINUTES", "60")))
+MAX_AGE = timedelta(minutes=float(os.getenv("PREFETCH_MAX_AGE_MINUTES", "360")))   # older -> served live
+STATS_FLUSH_SECONDS = float(os.getenv("PREFETCH_STATS_FLUSH_SECONDS", "30"))
+
+
+def _offpeak_hours() -> set[int]:
+    # "0-6" or "22-23,0-5"
+    hours = set()
+    for part in filter(None, os.getenv("PREFETCH_OFFPEAK_HOURS", "0-6").split(",")):
+        lo, _, hi = part.partition("-")
+        lo, hi = int(lo), int(hi or lo)
+        hours.update(range(lo, hi + 1) if lo <= hi else [*range(lo, 24), *range(0, hi + 1)])
+    return hours
+
+
+def cache_key(cleaned_query: str, language: str) -> str:
+    return f"{(language or 'en').lower()}:{' '.join((cleaned_query or '').lower().split())}"
+
+
+# ---------------------------------------------------
+# Read path (/news)
+# ---------------------------------------------------
+
+class _RequestCounts:
+    """Per-process hit/miss counts not yet written to query_cache."""
+
+    def __init__(self):
+        self._pending: dict[str, list] = {}     # key -> [query, language, hits, misses, last_requested_at]
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def record(self, key: str, query: str, language: str, hit: bool):
+        with self._lock:
+            entry = self._pending.setdefault(key, [query, language, 0, 0, None])
+            entry[2 if hit else 3] += 1
+            entry[4] = datetime.utcnow()
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name="prefetch-stats", daemon=True)
+                self._flusher.start()
+
+    def flush(self) -> int:
+        """Add the pending counts to query_cache in one statement. Returns the number of queries written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        stmt = upsert(QueryCache).values([
+            {"key": key, "query": q, "language": lang, "hits": hits, "misses": misses, "last_requested_at": at}
+            for key, (q, lang, hits, misses, at) in sorted(pending.items())    # fixed lock order
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[QueryCache.key],
+            set_={
+                "hits": QueryCache.hits + stmt.excluded.hits,
+                "misses": QueryCache.misses + stmt.excluded.misses,
+                "last_requested_at": stmt.excluded.last_requested_at,
+            },
+        )
+        db = SessionLocal()
+        try:
+            db.execute(stmt)
+            db.commit()
+        except Exception:
+            db.rollback()
+            self._merge_back(pending)
+            raise
+        finally:
+            db.close()
+        return len(pending)
+
+    def _merge_back(self, pending: dict):
+        with self._lock:
+            for key, (q, lang, hits, misses, at) in pending.items():
+                entry = self._pending.setdefault(key, [q, lang, 0, 0, at])
+                entry[2] += hits
+                entry[3] += misses
+                entry[4] = max(entry[4], at)
+
+    def _run(self):
+        while True:
+            time.sleep(STATS_FLUSH_SECONDS)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[prefetch] flushing request counts failed: {e}")
+
+
+request_counts = _RequestCounts()
+
+
+def flush_request_counts() -> int:
+    return request_counts.flush()
+
+
+def cached_results(db, cleaned_query: str, language: str, page_size: int) -> list[dict] | None:
+    """
+    Warm results for a /news query in the /news result shape, or None on a miss
+    (unknown, expired, or refreshed with a smaller page size). Read-only; the
+    hit/miss is counted in process (request_counts).
+    """
+    key = cache_key(cleaned_query, language)
+    entry = db.get(QueryCache, key)
+    fresh = (
+        entry is not None and entry.refreshed_at is not None and entry.article_ids
+        and datetime.utcnow() - entry.refreshed_at <= MAX_AGE
+        and page_size <= entry.fetched_size
+    )
+    results = _load_results(db, json.loads(entry.article_ids)[:page_size]) if fresh else None
+    request_counts.record(key, cleaned_query, language, hit=results is not None)
+    return results
+
+
+def _load_results(db, ids: list[int]) -> list[dict] | None:
+    by_id = {r.id: r for r in db.execute(lean.cached_results(ids))}
+    if any(i not in by_id or by_id[i].sentiment_label is None for i in ids):
+        return None   # deleted or not enriched yet: serve live
+    return [
+        {
+            "title": r.title,
+            "description": r.description or "",
+            "sentiment": {"label": r.sentiment_label, "score": float(r.sentiment or 0.0)},
+            "image_url": r.image_url,
+            "article_id": r.id,
+            "canonical_id": r.canonical_id,
+        }
+        for r in (by_id[i] for i in ids)
+    ]
+
+
+def remember(db, cleaned_query: str, language: str, article_ids: list[int], page_size: int,
+             source: str = "live"):
+    """Store the article ids a query resolved to, so the next identical query is a hit. Caller commits."""
+    key = cache_key(cleaned_query, language)
+    now = datetime.utcnow()
+    values = {"article_ids": json.dumps(article_ids), "fetched_size": page_size,
+              "refreshed_at": now, "source": source}
+    stmt = upsert(QueryCache).values(key=key, query=cleaned_query, language=language, **values)
+    db.execute(stmt.on_conflict_do_update(index_elements=[QueryCache.key], set_=values))
+
+
+# ---------------------------------------------------
+# Refresh path (background)
+# ---------------------------------------------------
+
+def refresh_query(db, cleaned_query: str, language: str, page_size: int = PAGE_SIZE) -> int:
+    """Fetch, store and enrich one query's results and update its cache entry. Returns result count."""
+    from .news_service import fetch_news
+
+    fetched = fetch_news(cleaned_query, language, page_size=page_size)   # stored in Article already
+    if isinstance(fetched, dict):
+        raise RuntimeError(fetched.get("error"))
+    ids = [a["article_id"] for a in fetched]
+    articles = {a.id: a for a in db.query(Article).filter(Article.id.in_(ids))} if ids else {}
+    ordered = [articles[i] for i in ids if i in articles]
+
+    done = {a for (a,) in db.query(Sentiment.article_id).filter(Sentiment.article_id.in_([a.id for a in ordered]))}
+    todo = [a for a in ordered if a.id not in done]
+    results = inherited_results(db, todo)
+    rest = [a for a in todo if a.id not in results]
+    for a, r in zip(rest, analyze_texts([a.description or a.title or "" for a in rest])):
+        results[a.id] = r
+    write_enrichment(db, [(a.id, a.title, results[a.id]) for a in todo])
+
+    remember(db, cleaned_query, language, [a.id for a in ordered], page_size, source="prefetch")
+    db.commit()
+    return len(ordered)
+
+
+def _split_interests(s: str | None) -> list[str]:
+    return [p.strip() for p in re.split(r"[,;/|\n]+", s or "") if p.strip()]
+
+
+def prefetch_targets(db, limit: int = MAX_QUERIES) -> list[tuple[str, str]]:
+    """Distinct (cleaned query, language) pairs: user interests first, then the most requested queries."""
+    from .text_cleaning import preprocess_text
+
+    counts: dict[tuple[str, str], int] = {}
+    for interests, language in db.query(User.interests, User.language):
+        for interest in _split_interests(interests):
+            pair = (preprocess_text(interest)["cleaned"] or interest, (language or "en").lower())
+            counts[pair] = counts.get(pair, 0) + 1
+    targets = sorted(counts, key=counts.get, reverse=True)
+
+    popular = (
+        db.query(QueryCache.query, QueryCache.language)
+        .filter(QueryCache.hits + QueryCache.misses >= 2)
+        .order_by((QueryCache.hits + QueryCache.misses).desc())
+        .limit(limit)
+    )
+    seen = {cache_key(q, lang) for q, lang in targets}
+    for q, lang in popular:
+        if cache_key(q, lang) not in seen:
+            seen.add(cache_key(q, lang))
+            targets.append((q, lang))
+    return targets[:limit]
+
+
+def run_prefetch(force: bool = False, page_size: int = PAGE_SIZE) -> dict:
+    offpeak = datetime.utcnow().hour in _offpeak_hours()
+    stale_after = REFRESH_AGE if (offpeak or force) else MAX_AGE - REFRESH_AGE
+    report = {"offpeak": offpeak, "targets": 0, "refreshed": 0, "skipped_fresh": 0, "failed": 0, "articles": 0}
+    t0 = time.perf_counter()
+    try:
+        flush_request_counts()      # so popular queries rank on current counts
+    except Exception as e:
+        print(f"[prefetch] flushing request counts failed: {e}")
+    db = SessionLocal()
+    try:
+        targets = prefetch_targets(db)
+        report["targets"] = len(targets)
+        entries = {e.key: e for e in db.query(QueryCache).filter(
+            QueryCache.key.in_([cache_key(q, lang) for q, lang in targets]))}
+        now = datetime.utcnow()
+        for q, lang in targets:
+            e = entries.get(cache_key(q, lang))
+            if e and e.refreshed_at and now - e.refreshed_at < stale_after and e.fetched_size >= page_size:
+                report["skipped_fresh"] += 1
+                continue
+            try:
+                report["articles"] += refresh_query(db, q, lang, page_size)
+                report["refreshed"] += 1
+            except Exception as ex:
+                db.rollback()
+                report["failed"] += 1
+                print(f"[prefetch] '{q}' ({lang}) failed: {ex}")
+    finally:
+        db.close()
+    report["seconds"] = round(time.perf_counter() - t0, 2)
+    print(f"[prefetch] {report}")
+    return report
+
+
+def prefetch_stats(db, top: int = 50) -> dict:
+    hits, misses = db.query(func.coalesce(func.sum(QueryCache.hits), 0),
+                            func.coalesce(func.sum(QueryCache.misses), 0)).one()
+    rows = (
+        db.query(QueryCache)
+        .order_by((QueryCache.hits + QueryCache.misses).desc())
+        .limit(top)
+        .all()
+    )
+    now = datetime.utcnow()
+    total = int(hits) + int(misses)
+    return {
+        "requests": total,
+        "hit_ratio": round(int(hits) / total, 3) if total else None,
+        "queries": [
+            {
+                "query": r.query,
+                "language": r.language,
+                "hits": r.hits,
+                "misses": r.misses,
+                "hit_ratio": round(r.hits / (r.hits + r.misses), 3) if (r.hits + r.misses) else None,
+                "source": r.source,
+                "age_minutes": round((now - r.refreshed_at).total_seconds() / 60, 1) if r.refreshed_at else None,
+            }
+            for r in rows
+        ],
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Prefetch user-interest queries")
+    ap.add_argument("--force", action="store_true", help="refresh everything older than the refresh age now")
+    ap.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    args = ap.parse_args()
+    run_prefetch(force=args.force, page_size=args.page_size)
@@ -0,0 +1,286 @@
+# backend/related.py
+#
+# Related coverage: nearest neighbours over sentence embeddings of stored
+# articles, behind GET /articles/{id}/related.
+#
+#   article_embeddings   one float32 vector per article (title + description,
+#                        all-MiniLM-L6-v2, L2-normalised), written as articles
+#                        are enriched: enrich_worker batches, plus the
+#                        scheduler's related_embed job for everything else
+#   RelatedIndex         in-process ANN index per API process, HNSW via
+#                        hnswlib (a dependency). The exact NumPy dot-product
+#                        scan is only a fallback for installs without it.
+#                        Loads only embeddings it hasn't seen (by
+#                        article_embeddings.id), at most every
+#                        RELATED_REFRESH_SECONDS.
+#
+#   RELATED_MODEL=all-MiniLM-L6-v2   same model as topic_modeling.py
+#   RELATED_REFRESH_SECONDS=30
+#   RELATED_HNSW_M=16, RELATED_HNSW_EF=64
+#
+# An article that isn't embedded yet has no related articles until the next
+# refresh picks its vector up; the API never embeds on a request.
+#
+# Near-duplicates of the article (same canonical cluster) are left out, so the
+# results are other coverage rather than syndicated copies of the same story.
+#
+#   python -m backend.related --limit 5000      # embed the backlog by hand
+import argparse
+import importlib.util
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import exists, func, select
+
+from .models import Article, ArticleEmbedding, Sentiment
+
+MODEL_NAME = os.getenv("RELATED_MODEL", "all-MiniLM-L6-v2")
+REFRESH_SECONDS = float(os.getenv("RELATED_REFRESH_SECONDS", "30"))
+HNSW_M = int(os.getenv("RELATED_HNSW_M", "16"))
+HNSW_EF = int(os.getenv("RELATED_HNSW_EF", "64"))
+EMBED_BATCH = 256
+EMBED_ON_ENRICH = os.getenv("RELATED_EMBED_ON_ENRICH", "1") == "1"
+# concurrent writers can commit embedding ids out of order; re-read this many
+# ids behind the cursor so a late commit isn't skipped (already indexed ones are ignored)
+REFRESH_LOOKBACK = 1000
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    global _model
+    with _model_lock:
+        if _model is None:
+            from sentence_transformers import SentenceTransformer
+            _model = SentenceTransformer(MODEL_NAME)
+    return _model
+
+
+def available() -> bool:
+    """Embedding needs sentence-transformers; without it enrichment carries on and related stays empty."""
+    return importlib.util.find_spec("sentence_transformers") is not None
+
+
+def embedding_text(title: str | None, description: str | None) -> str:
+    return f"{title or ''}. {description or ''}".strip(". ")
+
+
+def embed_texts(texts: list[str]) -> np.ndarray:
+    """(n, dim) float32, L2-normalised, so a dot product is the cosine similarity."""
+    vecs = get_model().encode(texts, batch_size=64, normalize_embeddings=True, show_progress_bar=False)
+    return np.asarray(vecs, dtype=np.float32)
+
+
+# ---------------------------------------------------
+# Write path
+# ---------------------------------------------------
+
+def embed_articles(db, rows) -> int:
+    """Store embeddings for rows with .id/.title/.description that don't have one yet. Caller commits."""
+    ids = [r.id for r in rows]
+    if not ids:
+        return 0
+    done = {a for (a,) in db.query(ArticleEmbedding.article_id).filter(ArticleEmbedding.article_id.in_(ids))}
+    rows = [r for r in rows if r.id not in done]
+    if not rows:
+        return 0
+    vecs = embed_texts([embedding_text(r.title, r.description) for r in rows])
+    now = datetime.utcnow()
+    db.bulk_insert_mappings(ArticleEmbedding, [
+        {"article_id": r.id, "model": MODEL_NAME, "vector": v.tobytes(), "created_at": now}
+        for r, v in zip(rows, vecs)
+    ])
+    return len(rows)
+
+
+def embed_pending(limit: int = 1000) -> int:
+    """Embed enriched articles that have no embedding yet (scheduler job / CLI)."""
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    written = 0
+    try:
+        while written < limit:
+            rows = (
+                db.query(Article.id, Article.title, Article.description)
+                .filter(exists().where(Sentiment.article_id == Article.id),
+                        ~exists().where(ArticleEmbedding.article_id == Article.id))
+                .order_by(Article.id.desc())
+                .limit(min(EMBED_BATCH, limit - written))
+                .all()
+            )
+            if not rows:
+                break
+            written += embed_articles(db, rows)
+            db.commit()
+    finally:
+        db.close()
+    return written
+
+
+# ---------------------------------------------------
+# Index
+# ---------------------------------------------------
+
+class RelatedIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_seq = 0              # highest article_embeddings.id loaded
+        self._refreshed_at = 0.0
+        self._pos: dict[int, int] = {}  # article_id -> row in the index
+        self._ids: list[int] = []       # row -> article_id
+        self._chunks: list[np.ndarray] = []
+        self._matrix = None             # exact backend, concatenated lazily
+        self._hnsw = None
+        try:
+            import hnswlib
+            self._hnswlib = hnswlib
+        except ImportError:
+            self._hnswlib = None
+
+    @property
+    def backend(self) -> str:
+        return "hnsw" if self._hnswlib else "exact"
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _add(self, article_ids: list[int], vecs: np.ndarray) -> int:
+        fresh = [(i, a) for i, a in enumerate(article_ids) if a not in self._pos]
+        if not fresh:
+            return 0
+        vecs = vecs[[i for i, _ in fresh]]
+        start = len(self._ids)
+        for offset, (_, aid) in enumerate(fresh):
+            self._pos[aid] = start + offset
+            self._ids.append(aid)
+        if self._hnswlib:
+            if self._hnsw is None:
+                self._hnsw = self._hnswlib.Index(space="ip", dim=vecs.shape[1])
+                self._hnsw.init_index(max_elements=max(1024, 2 * len(vecs)), ef_construction=200, M=HNSW_M)
+                self._hnsw.set_ef(HNSW_EF)
+            need = len(self._ids)
+            if need > self._hnsw.get_max_elements():
+                self._hnsw.resize_index(max(need, 2 * self._hnsw.get_max_elements()))
+            self._hnsw.add_items(vecs, np.arange(start, start + len(vecs)))
+        else:
+            self._chunks.append(vecs)
+            self._matrix = None
+        return len(fresh)
+
+    def refresh(self, db, force: bool = False) -> int:
+        """Load embeddings written since the last refresh. Returns how many were added."""
+        if not force and time.monotonic() - self._refreshed_at < REFRESH_SECONDS:
+            return 0
+        added = 0
+        with self._lock:
+            rows = db.execute(
+                select(ArticleEmbedding.id, ArticleEmbedding.article_id, ArticleEmbedding.vector)
+                .where(ArticleEmbedding.id > self._last_seq - REFRESH_LOOKBACK, ArticleEmbedding.model == MODEL_NAME)
+                .order_by(ArticleEmbedding.id.asc())
+            ).all()
+            if rows:
+                vecs = np.frombuffer(b"".join(r.vector for r in rows), dtype=np.float32).reshape(len(rows), -1)
+                added = self._add([r.article_id for r in rows], vecs)
+                self._last_seq = max(self._last_seq, rows[-1].id)
+            self._refreshed_at = time.monotonic()
+        return added
+
+    def vector(self, article_id: int) -> np.ndarray | None:
+        with self._lock:
+            pos = self._pos.get(article_id)
+            if pos is None:
+                return None
+            if self._hnsw is not None:
+                return np.asarray(self._hnsw.get_items([pos])[0], dtype=np.float32)
+            return self._dense()[pos]
+
+    def _dense(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix = np.concatenate(self._chunks) if self._chunks else np.zeros((0, 1), np.float32)
+            self._chunks = [self._matrix]
+        return self._matrix
+
+    def nearest(self, vec: np.ndarray, k: int) -> list[tuple[int, float]]:
+        """(article_id, cosine similarity), best first."""
+        with self._lock:
+            n = len(self._ids)
+            if not n:
+                return []
+            k = min(k, n)
+            if self._hnsw is not None:
+                self._hnsw.set_ef(max(HNSW_EF, k))
+                labels, dists = self._hnsw.knn_query(vec, k=k)
+                return [(self._ids[int(p)], 1.0 - float(d)) for p, d in zip(labels[0], dists[0])]
+            scores = self._dense() @ vec
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self._ids[int(p)], float(scores[p])) for p in top]
+
+
+related_index = RelatedIndex()
+
+
+def related_articles(db, article_id: int, k: int = 10) -> list[dict] | None:
+    """Top-k similar stored articles, or None if the article doesn't exist."""
+    related_index.refresh(db)
+    article = db.execute(
+        select(Article.id, Article.canonical_id).where(Article.id == article_id)
+    ).first()
+    if article is None:
+        return None
+    vec = related_index.vector(article_id)
+    if vec is None:
+        # not embedded yet (enrichment backlog); the model never loads on the request path
+        return []
+
+    cluster = article.canonical_id or article.id
+    # over-fetch: the article itself and its near-duplicates are filtered out below
+    hits = related_index.nearest(vec, k * 3 + 1)
+    info = {
+        r.id: r for r in db.execute(
+            select(Article.id, Article.title, Article.description, Article.url, Article.source,
+                   Article.published_at, Article.image_url, Article.canonical_id)
+            .where(Article.id.in_([aid for aid, _ in hits]))
+        )
+    }
+    out = []
+    for aid, score in hits:
+        r = info.get(aid)
+        if r is None or aid == article_id or (r.canonical_id or r.id) == cluster:
+            continue
+        out.append({
+            "article_id": r.id,
+            "title": r.title,
+            "description": r.description or "",
+            "url": r.url,
+            "source": r.source,
+            "published_at": r.published_at.isoformat() if r.published_at else None,
+            "image_url": r.image_url,
+            "similarity": round(score, 4),
+        })
+        if len(out) == k:
+            break
+    return out
+
+
+def index_stats(db) -> dict:
+    return {
+        "backend": related_index.backend,
+        "model": MODEL_NAME,
+        "indexed": len(related_index),
+        "stored": db.query(func.count(ArticleEmbedding.id)).scalar() or 0,
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Embed enriched articles for related-article lookup")
+    ap.add_argument("--limit", type=int, default=5000)
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    n = embed_pending(args.limit)
+    print(f"Embedded {n} articles in {time.perf_counter() - t0:.1f}s")
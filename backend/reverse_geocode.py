@@ -0,0 +1,104 @@
+# backend/reverse_geocode.py
+#
+# Vectorized offline reverse geocoding: (lat, lon) arrays -> country names.
+# Simplified country polygons (Natural Earth 1:110m admin-0, public domain,
+# data/countries_110m.geojson) are loaded once into a shapely STR-tree
+# (shapely is a dependency). The bounding-box index with numpy ray casting is
+# only a fallback for installs without it.
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+POLYGONS_PATH = Path(os.getenv(
+    "COUNTRY_POLYGONS_PATH",
+    Path(__file__).resolve().parent / "data" / "countries_110m.geojson",
+))
+UNKNOWN = "Other"
+
+
+def _polygons(geometry: dict) -> list[list]:
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return geometry["coordinates"]
+    return []
+
+
+class CountryIndex:
+    def __init__(self, features: list[dict]):
+        self.names = np.array([f["properties"]["name"] for f in features], dtype=object)
+        self._rings = []     # per country: list of (n, 2) lon/lat arrays (exteriors + holes)
+        bounds = []
+        for f in features:
+            rings = [np.asarray(r, dtype=float) for poly in _polygons(f["geometry"]) for r in poly]
+            self._rings.append(rings)
+            pts = np.vstack(rings)
+            bounds.append((pts[:, 0].min(), pts[:, 1].min(), pts[:, 0].max(), pts[:, 1].max()))
+        self._bounds = np.array(bounds)
+
+        try:
+            import shapely
+            self._shapely = shapely
+            self._tree = shapely.STRtree([shapely.geometry.shape(f["geometry"]) for f in features])
+        except ImportError:
+            self._shapely = None
+            self._tree = None
+
+    @classmethod
+    def load(cls, path: Path = POLYGONS_PATH) -> "CountryIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["features"])
+
+    def __len__(self):
+        return len(self.names)
+
+    def classify(self, lat, lon) -> np.ndarray:
+        """Country name per point (object array); UNKNOWN for ocean/NaN."""
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        lon = (lon + 180.0) % 360.0 - 180.0
+        out = np.full(lat.shape, UNKNOWN, dtype=object)
+        ok = np.isfinite(lat) & np.isfinite(lon)
+        if not ok.any():
+            return out
+        if self._tree is not None:
+            sel = np.flatnonzero(ok)
+            pts = self._shapely.points(lon[sel], lat[sel])
+            hit_pt, hit_poly = self._tree.query(pts, predicate="intersects")
+            out[sel[hit_pt]] = self.names[hit_poly]
+            return out
+        return self._classify_numpy(lat, lon, ok, out)
+
+    def _classify_numpy(self, lat, lon, ok, out):
+        unassigned = ok.copy()
+        for i, (x0, y0, x1, y1) in enumerate(self._bounds):
+            cand = np.flatnonzero(unassigned & (lon >= x0) & (lon <= x1) & (lat >= y0) & (lat <= y1))
+            if not cand.size:
+                continue
+            px, py = lon[cand], lat[cand]
+            inside = np.zeros(cand.size, dtype=bool)
+            # even-odd rule across all rings (handles holes and multipolygons)
+            for ring in self._rings[i]:
+                xa, ya = ring[:-1, 0], ring[:-1, 1]
+                xb, yb = ring[1:, 0], ring[1:, 1]
+                for j in range(len(xa)):
+                    crosses = (ya[j] > py) != (yb[j] > py)
+                    if not crosses.any():
+                        continue
+                    x_at = xa[j] + (py - ya[j]) * (xb[j] - xa[j]) / ((yb[j] - ya[j]) or 1e-12)
+                    inside ^= crosses & (px < x_at)
+            out[cand[inside]] = self.names[i]
+            unassigned[cand[inside]] = False
+        return out
+
+
+@lru_cache(maxsize=1)
+def get_country_index() -> CountryIndex:
+    return CountryIndex.load()
+
+
+def countries_for(lat, lon) -> np.ndarray:
+    return get_country_index().classify(lat, lon)
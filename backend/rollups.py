@@ -0,0 +1,418 @@
+# backend/rollups.py
+#
+# Daily rollups behind /analytics/trend, /analytics/trend_public and the admin
+# trend/insight endpoints. Instead of joining articles x article_topics x
+# topics x sentiments on every dashboard load, the endpoints read two small
+# tables:
+#
+#   daily_topic_stats      (day, topic)  mappings, sentiment count/sum, pos/neg/neu
+#   daily_sentiment_stats  (day, label)  count, sentiment sum
+#
+# Maintenance is incremental: sessions from SessionLocal record which topic
+# mappings and sentiment rows they insert, delete or change (ORM flushes,
+# plus the bulk writes in enrichment.py / topic_cache.py via mark_sentiments
+# and mark_topics). Just before the commit the touched articles are read back
+# (three indexed lookups by article_id), their state before the transaction
+# is reconstructed from what was recorded, and the difference is added to the
+# rollup rows with INSERT ... ON CONFLICT DO UPDATE SET x = x + excluded.x.
+# Concurrent writers never wait on each other: they only take a shared
+# advisory lock per day, which full recomputes (rebuild) take exclusively, so
+# a recompute never overwrites a delta it didn't see.
+#
+# Writes that bypass SessionLocal are picked up by the scheduler's
+# rollup_refresh job (recent days), or rebuild a range by hand:
+#
+#   python -m backend.rollups --days 90
+#   python -m backend.rollups --start 2025-01-01 --end 2025-03-31
+import argparse
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, event, func, inspect, select
+
+from .database import IS_SQLITE, SessionLocal, upsert
+from .models import Article, ArticleTopic, DailySentimentStat, DailyTopicStat, Sentiment, Topic
+
+LOCK_NAMESPACE = 40_040     # first key of pg_advisory_xact_lock(int, int); second is the day ordinal
+
+_CHANGES = "rollup_changes"     # session.info: article_id -> _Change
+
+_TOPIC_COUNTS = ("article_count", "sentiment_count", "sentiment_sum", "pos_count", "neg_count", "neu_count")
+_LABEL_COUNTS = ("count", "sentiment_sum")
+
+
+# ---------------------------------------------------
+# Recompute
+# ---------------------------------------------------
+
+def _label_count(label: str):
+    # the model emits lower-case labels, older rows are upper-case
+    return func.sum(case((func.upper(Sentiment.sentiment_label) == label, 1), else_=0))
+
+
+def _refresh_day(db, day: date, now: datetime):
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    in_day = (Article.published_at >= start) & (Article.published_at < end)
+
+    topic_rows = (
+        db.query(
+            Topic.id, Topic.name,
+            func.count(ArticleTopic.id),
+            func.count(Sentiment.id),
+            func.coalesce(func.sum(Sentiment.sentiment), 0.0),
+            _label_count("POSITIVE"), _label_count("NEGATIVE"), _label_count("NEUTRAL"),
+        )
+        .select_from(ArticleTopic)
+        .join(Article, Article.id == ArticleTopic.article_id)
+        .join(Topic, Topic.id == ArticleTopic.topic_id)
+        .outerjoin(Sentiment, Sentiment.article_id == Article.id)
+        .filter(in_day)
+        .group_by(Topic.id, Topic.name)
+        .all()
+    )
+    if topic_rows:
+        stmt = upsert(DailyTopicStat).values([
+            {"day": day, "topic_id": tid, "topic": name, "article_count": n, "sentiment_count": ns,
+             "sentiment_sum": float(total or 0.0), "pos_count": int(pos or 0), "neg_count": int(neg or 0),
+             "neu_count": int(neu or 0), "computed_at": now}
+            for tid, name, n, ns, total, pos, neg, neu in topic_rows
+        ])
+        cols = ("topic", "article_count", "sentiment_count", "sentiment_sum",
+                "pos_count", "neg_count", "neu_count", "computed_at")
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[DailyTopicStat.day, DailyTopicStat.topic_id],
+            set_={c: stmt.excluded[c] for c in cols},
+        ))
+    (db.query(DailyTopicStat)
+       .filter(DailyTopicStat.day == day, DailyTopicStat.topic_id.notin_([r[0] for r in topic_rows]))
+       .delete(synchronize_session=False))
+
+    label_rows = (
+        db.query(Sentiment.sentiment_label, func.count(Sentiment.id),
+                 func.coalesce(func.sum(Sentiment.sentiment), 0.0))
+        .join(Article, Article.id == Sentiment.article_id)
+        .filter(in_day, Sentiment.sentiment_label.isnot(None))
+        .group_by(Sentiment.sentiment_label)
+        .all()
+    )
+    if label_rows:
+        stmt = upsert(DailySentimentStat).values([
+            {"day": day, "label": label, "count": n, "sentiment_sum": float(total or 0.0), "computed_at": now}
+            for label, n, total in label_rows
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[DailySentimentStat.day, DailySentimentStat.label],
+            set_={c: stmt.excluded[c] for c in ("count", "sentiment_sum", "computed_at")},
+        ))
+    (db.query(DailySentimentStat)
+       .filter(DailySentimentStat.day == day, DailySentimentStat.label.notin_([r[0] for r in label_rows]))
+       .delete(synchronize_session=False))
+
+
+def _lock_days(db, days, shared: bool):
+    if IS_SQLITE:   # SQLite already serialises writers on the database lock
+        return
+    lock = func.pg_advisory_xact_lock_shared if shared else func.pg_advisory_xact_lock
+    for day in sorted(set(days)):     # fixed lock order, no deadlocks with rebuilds
+        db.execute(lock(LOCK_NAMESPACE, day.toordinal()).select())
+
+
+def refresh_days(db, days) -> int:
+    """Recompute both rollups for the given dates. Caller commits; locks are held until then."""
+    days = sorted(set(days))
+    now = datetime.utcnow()
+    for day in days:
+        _lock_days(db, [day], shared=False)
+        _refresh_day(db, day, now)
+    return len(days)
+
+
+def rebuild(start: date, end: date, chunk_days: int = 7) -> int:
+    """Recompute every day in [start, end], committing every `chunk_days` days."""
+    db = SessionLocal()
+    done = 0
+    try:
+        day = start
+        while day <= end:
+            chunk = [day + timedelta(days=i) for i in range(chunk_days) if day + timedelta(days=i) <= end]
+            done += refresh_days(db, chunk)
+            db.commit()
+            day = chunk[-1] + timedelta(days=1)
+    finally:
+        db.close()
+    return done
+
+
+def refresh_recent(days: int = 2) -> int:
+    """Safety net for writes that bypassed SessionLocal: recompute the last `days` days."""
+    today = datetime.utcnow().date()
+    return rebuild(today - timedelta(days=days - 1), today)
+
+
+# ---------------------------------------------------
+# Incremental maintenance (SessionLocal hooks)
+# ---------------------------------------------------
+
+class _Change:
+    """What one transaction did to an article's rollup inputs."""
+    __slots__ = ("new_topics", "old_topics", "new_sentiment", "old_sentiment", "old_published", "moved")
+
+    def __init__(self):
+        self.new_topics: set[int] = set()     # mappings inserted
+        self.old_topics: set[int] = set()     # mappings deleted
+        self.new_sentiment = False            # sentiment row inserted
+        self.old_sentiment = None             # (label, score) of a deleted or updated row
+        self.old_published = None             # published_at before a move or delete
+        self.moved = False
+
+
+def _change(session, article_id) -> _Change:
+    return session.info.setdefault(_CHANGES, {}).setdefault(article_id, _Change())
+
+
+def mark_sentiments(db, article_ids):
+    """Record sentiment rows inserted outside the ORM unit of work (bulk inserts)."""
+    for a in article_ids:
+        _change(db, a).new_sentiment = True
+
+
+def mark_topics(db, pairs):
+    """Record (article_id, topic_id) mappings inserted outside the ORM unit of work."""
+    for a, t in pairs:
+        _change(db, a).new_topics.add(t)
+
+
+def _old(obj, attr):
+    hist = inspect(obj).attrs[attr].history
+    return (list(hist.deleted) or list(hist.unchanged) or [None])[0]
+
+
+# Load the previous value when these are overwritten on an expired instance,
+# otherwise the flush only knows the new one.
+@event.listens_for(Article.published_at, "set", active_history=True)
+@event.listens_for(Sentiment.sentiment, "set", active_history=True)
+@event.listens_for(Sentiment.sentiment_label, "set", active_history=True)
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _collect_changes(session, _ctx, _instances):
+    # updates and deletes: old values are still loadable before the flush
+    for obj in session.dirty:
+        if isinstance(obj, Sentiment) and obj.article_id:
+            state = inspect(obj).attrs
+            if state.sentiment_label.history.has_changes() or state.sentiment.history.has_changes():
+                c = _change(session, obj.article_id)
+                if c.old_sentiment is None and not c.new_sentiment:
+                    c.old_sentiment = (_old(obj, "sentiment_label"), _old(obj, "sentiment"))
+        elif isinstance(obj, Article) and inspect(obj).attrs.published_at.history.has_changes():
+            c = _change(session, obj.id)
+            if not c.moved:
+                c.moved, c.old_published = True, _old(obj, "published_at")
+    for obj in session.deleted:
+        if isinstance(obj, ArticleTopic) and obj.article_id:
+            c = _change(session, obj.article_id)
+            if obj.topic_id in c.new_topics:
+                c.new_topics.discard(obj.topic_id)
+            else:
+                c.old_topics.add(obj.topic_id)
+        elif isinstance(obj, Sentiment) and obj.article_id:
+            c = _change(session, obj.article_id)
+            if c.new_sentiment:
+                c.new_sentiment = False
+            elif c.old_sentiment is None:
+                c.old_sentiment = (obj.sentiment_label, obj.sentiment)
+        elif isinstance(obj, Article):
+            c = _change(session, obj.id)
+            if not c.moved:
+                c.moved, c.old_published = True, obj.published_at
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_inserts(session, _ctx):
+    # inserts: article_id is only known once the flush has run
+    for obj in session.new:
+        if isinstance(obj, ArticleTopic) and obj.article_id:
+            _change(session, obj.article_id).new_topics.add(obj.topic_id)
+        elif isinstance(obj, Sentiment) and obj.article_id:
+            _change(session, obj.article_id).new_sentiment = True
+
+
+def _add(topic_d, label_d, published, sentiment, topics, sign: int):
+    """Add (sign=1) or remove (sign=-1) one article's contribution to the rollup rows."""
+    if published is None:
+        return
+    day = published.date()
+    if sentiment is not None:
+        label, score = sentiment
+        score = float(score or 0.0)
+        if label is not None:
+            d = label_d.setdefault((day, label), [0, 0.0])
+            d[0] += sign
+            d[1] += sign * score
+        column = {"POSITIVE": 3, "NEGATIVE": 4, "NEUTRAL": 5}.get((label or "").upper())
+    for t in topics:
+        d = topic_d.setdefault((day, t), [0, 0, 0.0, 0, 0, 0])
+        d[0] += sign
+        if sentiment is not None:
+            d[1] += sign
+            d[2] += sign * score
+            if column:
+                d[column] += sign
+
+
+def article_deltas(db, changes: dict[int, _Change]) -> tuple[dict, dict]:
+    """(topic deltas, label deltas) of the recorded changes, keyed like the rollup tables."""
+    ids = list(changes)
+    published = dict(db.query(Article.id, Article.published_at).filter(Article.id.in_(ids)))
+    sentiments = {  # one row per article (uq_sentiments_article_id)
+        a: (label, score) for a, label, score in
+        db.query(Sentiment.article_id, Sentiment.sentiment_label, Sentiment.sentiment)
+        .filter(Sentiment.article_id.in_(ids))
+    }
+    topics: dict[int, set[int]] = {}
+    for a, t in db.query(ArticleTopic.article_id, ArticleTopic.topic_id).filter(ArticleTopic.article_id.in_(ids)):
+        topics.setdefault(a, set()).add(t)
+
+    topic_d, label_d = {}, {}
+    for a, c in changes.items():
+        now_topics = topics.get(a, set())
+        _add(topic_d, label_d, published.get(a), sentiments.get(a), now_topics, 1)
+        before = c.old_sentiment if c.old_sentiment is not None else (None if c.new_sentiment else sentiments.get(a))
+        _add(topic_d, label_d, c.old_published if c.moved else published.get(a), before,
+             (now_topics - c.new_topics) | c.old_topics, -1)
+    return ({k: v for k, v in topic_d.items() if any(v)},
+            {k: v for k, v in label_d.items() if any(v)})
+
+
+def apply_deltas(db, topic_d: dict, label_d: dict):
+    """Add the deltas to the rollup rows. Rows are written in key order, so concurrent writers can't deadlock."""
+    if not topic_d and not label_d:
+        return
+    now = datetime.utcnow()
+    _lock_days(db, {d for d, _ in topic_d} | {d for d, _ in label_d}, shared=True)
+    if topic_d:
+        names = dict(db.query(Topic.id, Topic.name).filter(Topic.id.in_({t for _, t in topic_d})))
+        stmt = upsert(DailyTopicStat).values([
+            {"day": day, "topic_id": t, "topic": names[t], "computed_at": now, **dict(zip(_TOPIC_COUNTS, v))}
+            for (day, t), v in sorted(topic_d.items())
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[DailyTopicStat.day, DailyTopicStat.topic_id],
+            set_={**{c: getattr(DailyTopicStat, c) + stmt.excluded[c] for c in _TOPIC_COUNTS},
+                  "computed_at": stmt.excluded.computed_at},
+        ))
+    if label_d:
+        stmt = upsert(DailySentimentStat).values([
+            {"day": day, "label": label, "computed_at": now, **dict(zip(_LABEL_COUNTS, v))}
+            for (day, label), v in sorted(label_d.items())
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[DailySentimentStat.day, DailySentimentStat.label],
+            set_={**{c: getattr(DailySentimentStat, c) + stmt.excluded[c] for c in _LABEL_COUNTS},
+                  "computed_at": stmt.excluded.computed_at},
+        ))
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _apply(session):
+    session.flush()
+    changes = session.info.pop(_CHANGES, None)
+    if changes:
+        apply_deltas(session, *article_deltas(session, changes))
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard(session):
+    session.info.pop(_CHANGES, None)
+
+
+# ---------------------------------------------------
+# Reads
+# ---------------------------------------------------
+
+def _since(days: int) -> date:
+    # whole UTC days: the window starts at midnight `days` days ago
+    return (datetime.utcnow() - timedelta(days=days)).date()
+
+
+# The API reads through AsyncSession (async_database.py); each helper is one small query.
+
+async def trend_points(db, days: int, topic: str | None = None) -> list[dict]:
+    """Per (day, topic) for enriched articles: count, average sentiment and label counts."""
+    stmt = (
+        select(DailyTopicStat)
+        .where(DailyTopicStat.day >= _since(days), DailyTopicStat.sentiment_count > 0)
+        .order_by(DailyTopicStat.day.asc(), DailyTopicStat.topic.asc())
+    )
+    if topic:
+        stmt = stmt.where(DailyTopicStat.topic == topic)
+    return [
+        {
+            "date": str(r.day),
+            "topic": r.topic,
+            "topic_count": r.sentiment_count,
+            "avg_sentiment": r.sentiment_sum / r.sentiment_count,
+            "pos_count": r.pos_count,
+            "neg_count": r.neg_count,
+            "neu_count": r.neu_count,
+        }
+        for r in (await db.execute(stmt)).scalars()
+    ]
+
+
+async def sentiment_counts(db, days: int | None = None) -> dict[str, int]:
+    """Sentiment rows per label, over the window or all time."""
+    stmt = select(DailySentimentStat.label, func.sum(DailySentimentStat.count)).group_by(DailySentimentStat.label)
+    if days is not None:
+        stmt = stmt.where(DailySentimentStat.day >= _since(days))
+    return {label: int(n) for label, n in await db.execute(stmt)}
+
+
+async def topic_counts(db, days: int, limit: int | None = None) -> list[tuple[str, int]]:
+    """(topic, article mappings) over the window, most frequent first."""
+    total = func.sum(DailyTopicStat.article_count)
+    stmt = (
+        select(DailyTopicStat.topic, total)
+        .where(DailyTopicStat.day >= _since(days))
+        .group_by(DailyTopicStat.topic)
+        .order_by(total.desc())
+    )
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return [(name, int(n)) for name, n in await db.execute(stmt)]
+
+
+async def topic_sentiment(db) -> list[dict]:
+    """All-time average sentiment per topic over enriched articles."""
+    n = func.sum(DailyTopicStat.sentiment_count)
+    stmt = (
+        select(DailyTopicStat.topic, func.sum(DailyTopicStat.sentiment_sum), n)
+        .group_by(DailyTopicStat.topic)
+        .having(n > 0)
+    )
+    return [{"topic": t, "avg_sentiment": float(s) / int(c), "n": int(c)} for t, s, c in await db.execute(stmt)]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Rebuild the daily topic/sentiment rollups")
+    ap.add_argument("--days", type=int, default=None, help="rebuild the last N days")
+    ap.add_argument("--start", type=date.fromisoformat, default=None)
+    ap.add_argument("--end", type=date.fromisoformat, default=None)
+    ap.add_argument("--chunk-days", type=int, default=7)
+    args = ap.parse_args()
+
+    end = args.end or datetime.utcnow().date()
+    if args.start:
+        start = args.start
+    elif args.days:
+        start = end - timedelta(days=args.days - 1)
+    else:
+        with SessionLocal() as s:
+            first = s.query(func.min(Article.published_at)).scalar()
+        start = first.date() if first else end
+    t0 = time.perf_counter()
+    n = rebuild(start, end, args.chunk_days)
+    print(f"Rebuilt {n} days ({start} .. {end}) in {time.perf_counter() - t0:.1f}s")
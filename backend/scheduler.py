@@ -0,0 +1,202 @@
+# backend/scheduler.py
+#
+# In-process job scheduler that runs on exactly one node. Every node runs the
+# loop, but only the current leader (coordination.LeaderElector) executes jobs;
+# the others keep campaigning and take over when the leader dies or its lease
+# expires.
+#
+# Enabled in the API with SCHEDULER_ENABLED=1, or run standalone:
+#
+#   python -m backend.scheduler
+#   python -m backend.scheduler --demo --ttl 6 --backend lease   # start 2-3 of these, kill the leader
+import argparse
+import os
+import threading
+import time
+from typing import Callable
+
+from .coordination import NODE_ID, LEASE_TTL, LeaderElector
+
+LEADER_NAME = "appnews-scheduler"
+TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "5"))
+
+
+class Job:
+    def __init__(self, name: str, interval: float, fn: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.last_run = None        # monotonic; per node, so a new leader runs each job once on takeover
+        self.runs = 0
+        self.failures = 0
+        self.last_seconds = None
+        self.last_error = None
+
+    def due(self, now: float) -> bool:
+        return self.last_run is None or now - self.last_run >= self.interval
+
+    def run(self):
+        t0 = time.perf_counter()
+        try:
+            self.fn()
+            self.last_error = None
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"[scheduler] job {self.name} failed: {e}")
+        finally:
+            self.runs += 1
+            self.last_run = time.monotonic()
+            self.last_seconds = round(time.perf_counter() - t0, 2)
+
+
+def _minutes(env: str, default: float) -> float:
+    return float(os.getenv(env, default)) * 60
+
+
+def _gdelt_poll():
+    from .ingest_gdelt import upsert_gdelt
+    upsert_gdelt(hours=int(os.getenv("SCHEDULER_GDELT_HOURS", "2")),
+                 query=os.getenv("SCHEDULER_GDELT_QUERY", "(AI OR climate OR india)"), sharded=True)
+
+
+def _rss_poll():
+    from .rss_ingest import poll_due
+    poll_due()
+
+
+def _prefetch():
+    from .prefetch import run_prefetch
+    run_prefetch()
+
+
+def _geocode_backfill():
+    from .geo_backfill import run_backfill
+    run_backfill()
+
+
+def _rollup_refresh():
+    from .rollups import refresh_recent
+    refresh_recent(days=int(os.getenv("SCHEDULER_ROLLUP_DAYS", "2")))
+
+
+def _related_embed():
+    from .related import available, embed_pending
+    if available():
+        embed_pending(limit=int(os.getenv("SCHEDULER_RELATED_EMBED_LIMIT", "2000")))
+
+
+def _partition_maintenance():
+    from .database import engine
+    from .partitioning import maintain
+    maintain(engine)
+
+
+def _session_cleanup():
+    from .admin_auth_simple import purge_expired_sessions
+    n = purge_expired_sessions()
+    if n:
+        print(f"[scheduler] purged {n} expired admin sessions")
+
+
+def default_jobs() -> list[Job]:
+    return [
+        Job("gdelt_poll", _minutes("SCHEDULER_GDELT_MINUTES", 15), _gdelt_poll),
+        # cheap when nothing is due: each feed carries its own adaptive next_poll_at
+        Job("rss_poll", _minutes("SCHEDULER_RSS_MINUTES", 1), _rss_poll),
+        # refreshes everything in the off-peak window, only near-expiry entries otherwise
+        Job("prefetch", _minutes("SCHEDULER_PREFETCH_MINUTES", 30), _prefetch),
+        Job("geocode_backfill", _minutes("SCHEDULER_GEOCODE_MINUTES", 60), _geocode_backfill),
+        # rollups are kept current on commit; this only catches writes made outside SessionLocal
+        Job("rollup_refresh", _minutes("SCHEDULER_ROLLUP_MINUTES", 15), _rollup_refresh),
+        # enrich_worker embeds as it goes; this covers articles enriched by /news and the pipeline
+        Job("related_embed", _minutes("SCHEDULER_RELATED_MINUTES", 10), _related_embed),
+        # no-op unless articles was migrated with `python -m backend.partitioning migrate`
+        Job("partition_maintenance", _minutes("SCHEDULER_PARTITION_MINUTES", 24 * 60), _partition_maintenance),
+        Job("session_cleanup", _minutes("SCHEDULER_SESSION_CLEANUP_MINUTES", 30), _session_cleanup),
+    ]
+
+
+class Scheduler:
+    def __init__(self, jobs: list[Job], elector: LeaderElector | None = None, tick: float = TICK_SECONDS):
+        self.jobs = jobs
+        self.elector = elector or LeaderElector(LEADER_NAME)
+        self.tick = tick
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run(self):
+        while not self._stop.is_set():
+            if self.elector.campaign():
+                for job in self.jobs:
+                    # re-check before every job: leadership can be lost mid-tick
+                    if self._stop.is_set() or not self.elector.is_leader:
+                        break
+                    if job.due(time.monotonic()):
+                        job.run()
+            self._stop.wait(self.tick)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.tick * 2)
+        self.elector.resign()
+
+    def status(self) -> dict:
+        return {
+            "node": NODE_ID,
+            "leader": self.elector.is_leader,
+            "backend": type(self.elector.lock).__name__,
+            "jobs": [
+                {"name": j.name, "interval_s": j.interval, "runs": j.runs, "failures": j.failures,
+                 "last_seconds": j.last_seconds, "last_error": j.last_error}
+                for j in self.jobs
+            ],
+        }
+
+
+_scheduler: Scheduler | None = None
+
+
+def start_scheduler() -> Scheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler(default_jobs()).start()
+        print(f"Scheduler started on {NODE_ID}")
+    return _scheduler
+
+
+def stop_scheduler():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
+
+
+def scheduler_status() -> dict:
+    return _scheduler.status() if _scheduler else {"node": NODE_ID, "enabled": False}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Run the leader-elected job scheduler")
+    ap.add_argument("--demo", action="store_true", help="only run a heartbeat job (failover testing)")
+    ap.add_argument("--backend", choices=["advisory", "lease"], default=None)
+    ap.add_argument("--ttl", type=float, default=LEASE_TTL)
+    ap.add_argument("--tick", type=float, default=TICK_SECONDS)
+    args = ap.parse_args()
+
+    jobs = ([Job("heartbeat", 2 * args.tick, lambda: print(f"[scheduler] heartbeat from {NODE_ID}"))]
+            if args.demo else default_jobs())
+    sched = Scheduler(jobs, LeaderElector(LEADER_NAME, args.backend, args.ttl), tick=args.tick)
+    print(f"Node {NODE_ID} campaigning for {LEADER_NAME}")
+    try:
+        sched.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sched.stop()
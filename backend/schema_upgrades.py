@@ -0,0 +1,115 @@
+# backend/schema_upgrades.py
+#
+# create_all() only creates missing tables, it never alters existing ones.
+# Columns/indexes added to existing models are applied here with idempotent DDL.
+# An embedded SQLite database (DB_BACKEND=sqlite) is always created fresh from
+# the models, so it only needs what create_all() can't express.
+from sqlalchemy import text
+
+from .search import SEARCH_VECTOR_SQL
+
+UPGRADES = [
+    # near-duplicate links (near_dup.py)
+    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS canonical_id INTEGER REFERENCES articles(id)",
+    "CREATE INDEX IF NOT EXISTS ix_articles_canonical_id ON articles (canonical_id)",
+    # full-text hydration (hydrate_fulltext.py); body compressed with lz4 TOAST (PG 14+)
+    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS hydrated_at TIMESTAMP",
+    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS hydrate_status VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_articles_hydrated_at ON articles (hydrated_at)",
+    "ALTER TABLE articles ALTER COLUMN body SET COMPRESSION lz4",
+    # anti-join used by the enrichment workers (enrich_worker.py)
+    "CREATE INDEX IF NOT EXISTS ix_sentiments_article_id ON sentiments (article_id)",
+    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS enrich_failures INTEGER",
+    # single article store: merge the old news table into articles, keep `news` as a view
+    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS image_url VARCHAR",
+    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS fetched_at TIMESTAMP",
+    """
+    DO $$
+    BEGIN
+        IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('news')) = 'r' THEN
+            INSERT INTO articles (title, source, published_at, url, description, image_url, fetched_at)
+            SELECT n.title, n.source, n.published_at, n.url, n.description, n.image_url, n.fetched_at
+            FROM news n
+            WHERE n.url IS NOT NULL AND NOT EXISTS (SELECT 1 FROM articles a WHERE a.url = n.url);
+            UPDATE articles a
+            SET image_url = COALESCE(a.image_url, n.image_url),
+                fetched_at = COALESCE(a.fetched_at, n.fetched_at)
+            FROM news n
+            WHERE a.url = n.url;
+            ALTER TABLE news RENAME TO news_legacy;   -- drop once the merge is verified
+        END IF;
+    END $$
+    """,
+    "CREATE OR REPLACE VIEW news AS "
+    "SELECT id, title, source, published_at, url, description, image_url, fetched_at FROM articles",
+    # full-text search (search.py): generated on every write; adding it rewrites the table once
+    f"ALTER TABLE articles ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_articles_search_vector ON articles USING GIN (search_vector)",
+    # one row per (article, topic), the ON CONFLICT target of topic_cache.map_topics; drop old duplicates first
+    """
+    DO $$
+    BEGIN
+        IF to_regclass('uq_article_topics_article_topic') IS NULL THEN
+            DELETE FROM article_topics a USING article_topics b
+            WHERE a.article_id = b.article_id AND a.topic_id = b.topic_id AND a.id > b.id;
+            CREATE UNIQUE INDEX uq_article_topics_article_topic ON article_topics (article_id, topic_id);
+        END IF;
+    END $$
+    """,
+    # one sentiment per article, the ON CONFLICT target of enrichment.insert_sentiments; keep the oldest row
+    """
+    DO $$
+    BEGIN
+        IF to_regclass('uq_sentiments_article_id') IS NULL THEN
+            DELETE FROM sentiments a USING sentiments b
+            WHERE a.article_id = b.article_id AND a.id > b.id;
+            CREATE UNIQUE INDEX uq_sentiments_article_id ON sentiments (article_id);
+        END IF;
+    END $$
+    """,
+]
+
+SQLITE_UPGRADES = [
+    "CREATE VIEW IF NOT EXISTS news AS "
+    "SELECT id, title, source, published_at, url, description, image_url, fetched_at FROM articles",
+    # full-text search (search.py): external-content FTS5 index kept in sync by triggers.
+    # The whole body is indexed (FTS5 has no size limit), so 'delete' entries match what was inserted.
+    "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5("
+    "title, description, body, content='articles', content_rowid='id', tokenize='porter unicode61')",
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts (rowid, title, description, body)
+        VALUES (new.id, new.title, new.description, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts (articles_fts, rowid, title, description, body)
+        VALUES ('delete', old.id, old.title, old.description, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE OF title, description, body ON articles BEGIN
+        INSERT INTO articles_fts (articles_fts, rowid, title, description, body)
+        VALUES ('delete', old.id, old.title, old.description, old.body);
+        INSERT INTO articles_fts (rowid, title, description, body)
+        VALUES (new.id, new.title, new.description, new.body);
+    END
+    """,
+    # reindex whatever was written before the triggers existed
+    "INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')",
+]
+
+
+def apply_upgrades(engine):
+    upgrades = SQLITE_UPGRADES if engine.dialect.name == "sqlite" else UPGRADES
+    with engine.begin() as conn:
+        for stmt in upgrades:
+            conn.execute(text(stmt))
+    print(f"Applied {len(upgrades)} schema upgrade statements.")
+
+
+if __name__ == "__main__":
+    from backend.database import engine
+    apply_upgrades(engine)
@@ -0,0 +1,155 @@
+# backend/search.py
+#
+# Full-text search over stored articles, behind GET /search. No NewsAPI call,
+# no quota.
+#
+# PostgreSQL: articles.search_vector is a stored generated tsvector
+#   (title weight A, description B, body C) with a GIN index, so every write
+#   keeps it current (schema_upgrades.py). Ranked with ts_rank_cd.
+# SQLite (DB_BACKEND=sqlite): an FTS5 table articles_fts over the same
+#   columns, kept in sync by triggers on articles. Ranked with bm25.
+#
+# The query goes through text_cleaning.preprocess_text first (lower-case,
+# lemmatise, drop stopwords), the same normalisation /news applies, and
+# every remaining term must match.
+#
+# Pages use keyset pagination: each page returns an opaque `next_cursor`
+# holding the last row's sort key, and the next page continues strictly after it
+# (no OFFSET, so deep pages cost the same as the first).
+#
+#   GET /search?q=central+bank&since=2025-01-01&topic=Economy&source=Reuters&sort=date&limit=20
+#   GET /search?q=central+bank&cursor=<next_cursor from the previous page>
+import base64
+import json
+import os
+import re
+from datetime import datetime
+
+from sqlalchemy import column, exists, func, literal_column, select, table, tuple_
+
+from .database import IS_SQLITE
+from .models import Article, ArticleTopic, Sentiment, Topic
+
+TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "english")
+if not re.fullmatch(r"[a-z_]+", TS_CONFIG):
+    raise ValueError(f"invalid SEARCH_TS_CONFIG {TS_CONFIG!r}")
+
+BODY_CHARS = 200_000    # body prefix that is indexed; keeps the tsvector under its 1 MB limit
+MAX_LIMIT = 100
+SORTS = ("relevance", "date")
+
+# also used by schema_upgrades.py, so the generated column and the queries agree
+SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector('{TS_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{TS_CONFIG}', coalesce(description, '')), 'B') || "
+    f"setweight(to_tsvector('{TS_CONFIG}', left(coalesce(body, ''), {BODY_CHARS})), 'C')"
+)
+
+
+class BadCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort: str, key, article_id: int) -> str:
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    raw = json.dumps([sort, key, article_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    try:
+        s, key, article_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if s != sort:
+            raise BadCursor("cursor was issued for a different sort order")
+        key = datetime.fromisoformat(key) if sort == "date" else float(key)
+        return key, int(article_id)
+    except BadCursor:
+        raise
+    except Exception as e:
+        raise BadCursor("malformed cursor") from e
+
+
+def _terms(cleaned: str) -> list[str]:
+    return [t for t in re.findall(r"\w+", cleaned.lower()) if t]
+
+
+def _match(terms: list[str]):
+    """(WHERE clause, rank expression, extra FROM) for the active backend; higher rank = better."""
+    if IS_SQLITE:
+        fts = table("articles_fts", column("rowid"))
+        name = literal_column("articles_fts")
+        # quoted terms, implicit AND; FTS5 applies the porter stemmer to both sides
+        query = " ".join('"' + t.replace('"', '""') + '"' for t in terms)
+        rank = -func.bm25(name, 10.0, 4.0, 1.0)
+        return name.op("MATCH")(query), rank, fts
+    vector = literal_column("articles.search_vector")
+    tsquery = func.plainto_tsquery(literal_column(f"'{TS_CONFIG}'::regconfig"), " ".join(terms))
+    return vector.op("@@")(tsquery), func.ts_rank_cd(vector, tsquery), None
+
+
+async def search_articles(db, cleaned: str, *, since: datetime | None = None, until: datetime | None = None,
+                          topic: str | None = None, source: str | None = None, sort: str = "relevance",
+                          limit: int = 20, cursor: str | None = None, include_duplicates: bool = False) -> dict:
+    """One page of stored articles matching `cleaned` (preprocess_text output)."""
+    if sort not in SORTS:
+        raise ValueError(f"sort must be one of {SORTS}")
+    terms = _terms(cleaned)
+    if not terms:
+        return {"results": [], "next_cursor": None}
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    where, rank, fts = _match(terms)
+    rank = rank.label("rank")
+    stmt = (
+        select(Article.id, Article.title, Article.description, Article.url, Article.source,
+               Article.published_at, Article.image_url, Sentiment.sentiment_label, Sentiment.sentiment, rank)
+        .outerjoin(Sentiment, Sentiment.article_id == Article.id)
+        .where(where)
+    )
+    if fts is not None:
+        stmt = stmt.join(fts, fts.c.rowid == Article.id)
+    if since:
+        stmt = stmt.where(Article.published_at >= since)
+    if until:
+        stmt = stmt.where(Article.published_at < until)
+    if source:
+        stmt = stmt.where(Article.source == source)
+    if topic:
+        stmt = stmt.where(exists().where(
+            ArticleTopic.article_id == Article.id, ArticleTopic.topic_id == Topic.id, Topic.name == topic))
+    if not include_duplicates:
+        stmt = stmt.where(Article.canonical_id.is_(None))     # near-duplicates point at their canonical
+
+    key_col = rank.element if sort == "relevance" else Article.published_at
+    if sort == "date":
+        stmt = stmt.where(Article.published_at.isnot(None))
+    if cursor:
+        key, last_id = decode_cursor(cursor, sort)
+        stmt = stmt.where(tuple_(key_col, Article.id) < tuple_(key, last_id))
+    stmt = stmt.order_by(key_col.desc(), Article.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(stmt)).all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(sort, last.rank if sort == "relevance" else last.published_at, last.id)
+    return {
+        "results": [
+            {
+                "article_id": r.id,
+                "title": r.title,
+                "description": r.description or "",
+                "url": r.url,
+                "source": r.source,
+                "published_at": r.published_at.isoformat() if r.published_at else None,
+                "image_url": r.image_url,
+                "sentiment": {"label": r.sentiment_label, "score": float(r.sentiment or 0.0)}
+                if r.sentiment_label else None,
+                "rank": float(r.rank),
+            }
+            for r in page
+        ],
+        "next_cursor": next_cursor,
+    }
@@ -0,0 +1,155 @@
+# backend/timestamps.py
+#
+# One place for turning feed timestamps into tz-aware UTC datetimes.
+#
+# Feeds are consistent within themselves, so the format is detected once per
+# batch from a small sample and every value goes through that format's fast
+# path (datetime.fromisoformat / fromtimestamp in C, email.utils for RSS). Only values the fast
+# path rejects fall back to trying the other formats and finally dateutil.
+#
+#   parse_batch(["20240101T120000Z", ...])   -> [datetime(2024, 1, 1, 12, tzinfo=UTC), ...]
+#   parse_timestamp("Tue, 02 Jan 2024 10:00:00 GMT")
+#
+# The DateTime columns are naive UTC (datetime.utcnow defaults); writers pass
+# parsed values through naive_utc() before storing them.
+import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Iterable
+
+from dateutil import parser as dtparser
+
+UTC = timezone.utc
+SAMPLE_SIZE = 16
+
+_DETECT = {
+    # GDELT DOC 2.0 seendate: 20240101T120000Z
+    "gdelt": re.compile(r"^\d{8}T\d{6}Z$"),
+    # 2024-01-01T12:00:00Z, 2024-01-01 12:00:00.123+05:30, 2024-01-01
+    "iso": re.compile(r"^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}(:?\d{2})?)?)?$"),
+    # YYYYMMDD[HHMM[SS]]
+    "compact": re.compile(r"^\d{8}(\d{4}(\d{2})?)?$"),
+    # unix seconds / milliseconds
+    "epoch": re.compile(r"^\d{10}(\d{3})?$"),
+    # RSS pubDate (RFC 822/2822): Tue, 02 Jan 2024 10:00:00 GMT
+    "rfc822": re.compile(r"^([A-Za-z]{3}, )?\d{1,2} [A-Za-z]{3} \d{2,4} \d{2}:\d{2}(:\d{2})? \S+$"),
+}
+
+
+def _to_utc(dt: datetime) -> datetime:
+    tz = dt.tzinfo
+    if tz is UTC:
+        return dt
+    if tz is None:
+        return dt.replace(tzinfo=UTC)   # feeds without an offset are UTC
+    return dt.astimezone(UTC)
+
+
+def naive_utc(dt: datetime | None) -> datetime | None:
+    """tz-aware (or naive UTC) datetime -> naive UTC, the form the DateTime columns store."""
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return _to_utc(dt).replace(tzinfo=None)
+
+
+def _iso(s: str) -> datetime:
+    # fromisoformat (3.11+) takes the extended and basic forms, incl. "Z" and GDELT's seendate
+    return _to_utc(datetime.fromisoformat(s))
+
+
+def _compact(s: str) -> datetime:
+    if len(s) not in (8, 12, 14) or not s.isdigit():
+        raise ValueError(s)
+    return _iso(s if len(s) == 8 else f"{s[:8]}T{s[8:]}")
+
+
+def _epoch(s: str) -> datetime:
+    if len(s) not in (10, 13) or not s.isdigit():
+        raise ValueError(s)
+    n = int(s)
+    return datetime.fromtimestamp(n / 1000 if len(s) == 13 else n, UTC)
+
+
+def _rfc822(s: str) -> datetime:
+    return _to_utc(parsedate_to_datetime(s))
+
+
+_FAST = {"gdelt": _iso, "iso": _iso, "compact": _compact, "epoch": _epoch, "rfc822": _rfc822}
+
+
+def detect_format(values: Iterable) -> str | None:
+    """Most common known format among the first SAMPLE_SIZE non-empty string values."""
+    votes: dict[str, int] = {}
+    seen = 0
+    for v in values:
+        if not isinstance(v, str) or not v.strip():
+            continue
+        s = v.strip()
+        for name, rx in _DETECT.items():
+            if rx.match(s):
+                votes[name] = votes.get(name, 0) + 1
+                break
+        seen += 1
+        if seen >= SAMPLE_SIZE:
+            break
+    return max(votes, key=votes.get) if votes else None
+
+
+def _slow(s: str) -> datetime | None:
+    for name, rx in _DETECT.items():
+        if rx.match(s):
+            try:
+                return _FAST[name](s)
+            except (ValueError, OverflowError):
+                break
+    try:
+        return _to_utc(dtparser.parse(s))
+    except (ValueError, OverflowError):
+        return None
+
+
+def parse_timestamp(value) -> datetime | None:
+    """Any single timestamp (str, datetime, unix number) -> tz-aware UTC datetime, or None."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return _to_utc(value)
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, UTC)
+    s = str(value).strip()
+    return _slow(s) if s else None
+
+
+def parse_batch(values, fmt: str | None = None, stats: dict | None = None) -> list[datetime | None]:
+    """
+    Parse a batch of timestamps from one feed. `fmt` skips detection
+    ("gdelt", "iso", "compact", "epoch", "rfc822"). Pass a dict as `stats` to get
+    fast/fallback/failed counts.
+    """
+    values = values if isinstance(values, list) else list(values)
+    fmt = fmt or detect_format(values)
+    fast = _FAST.get(fmt)
+    out = []
+    n_fast = n_slow = n_failed = 0
+    for v in values:
+        if isinstance(v, str):
+            if not v:
+                out.append(None)
+                continue
+            if fast is not None:
+                try:
+                    out.append(fast(v))
+                    n_fast += 1
+                    continue
+                except (ValueError, OverflowError):
+                    pass
+            dt = _slow(v.strip()) if v.strip() else None
+            n_slow += 1
+        else:
+            dt = parse_timestamp(v)
+        if dt is None and v:
+            n_failed += 1
+        out.append(dt)
+    if stats is not None:
+        stats.update(format=fmt, fast=n_fast, fallback=n_slow, failed=n_failed)
+    return out
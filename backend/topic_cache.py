@@ -0,0 +1,123 @@
+# backend/topic_cache.py
+#
+# Topic name -> id, process-wide. Loaded at startup (main.warm_db) and
+# refreshed from the topics table on a miss, so tagging an article with known
+# topics costs no reads:
+#
+#   tids = topic_cache.ids(db, ["AI", "Finance"])                  # get-or-create
+#   topic_cache.map_topics(db, [(article_id, tids["AI"]), ...])     # idempotent
+#
+# New names go in with one INSERT ... ON CONFLICT (name) DO NOTHING, so two
+# writers creating the same topic don't fail each other. Mappings rely on the
+# unique (article_id, topic_id) index and ON CONFLICT DO NOTHING instead of
+# looking for an existing row first.
+#
+# Ids created inside a transaction only enter the shared dict once it commits;
+# after a rollback they would point at topics that don't exist.
+import threading
+from typing import Iterable
+
+from sqlalchemy import event, select
+
+from .database import SessionLocal, upsert
+from .models import ArticleTopic, Topic
+from .rollups import mark_topics
+
+_PENDING = "topic_cache_pending"     # session.info key: ids created in the open transaction
+
+_ids: dict[str, int] = {}
+_lock = threading.Lock()
+_counts = {"hits": 0, "misses": 0, "created": 0}
+
+
+def load(db) -> int:
+    """Bulk-load every topic (startup). Topics are few, so the whole table fits."""
+    rows = db.execute(select(Topic.name, Topic.id)).all()
+    with _lock:
+        _ids.update(rows)
+    print(f"Topic cache loaded with {len(rows)} topics")
+    return len(rows)
+
+
+def _select(db, names) -> dict[str, int]:
+    return dict(db.execute(select(Topic.name, Topic.id).where(Topic.name.in_(names))).all())
+
+
+def get_or_create(db, names: Iterable[str]) -> tuple[dict[str, int], set[str]]:
+    """(name -> id for all `names`, names created by this call). Caller commits."""
+    names = {n for n in names if n}
+    pending = db.info.get(_PENDING, {})
+    out = {}
+    with _lock:
+        for n in names:
+            tid = _ids.get(n, pending.get(n))
+            if tid is not None:
+                out[n] = tid
+        _counts["hits"] += len(out)
+        _counts["misses"] += len(names) - len(out)
+    missing = names - out.keys()
+    if not missing:
+        return out, set()
+
+    # created by another process since we loaded
+    found = _select(db, missing)
+    missing -= found.keys()
+    created = {}
+    if missing:
+        stmt = (
+            upsert(Topic)
+            .values([{"name": n, "description": f"News about {n}"} for n in sorted(missing)])
+            .on_conflict_do_nothing(index_elements=[Topic.name])
+            .returning(Topic.name, Topic.id)
+        )
+        created = dict(db.execute(stmt).all())
+        db.info.setdefault(_PENDING, {}).update(created)
+        missing -= created.keys()
+    if missing:
+        # lost the insert to a concurrent writer, whose row is committed by now
+        found.update(_select(db, missing))
+    with _lock:
+        _ids.update(found)
+        _counts["created"] += len(created)
+    out.update(found)
+    out.update(created)
+    return out, set(created)
+
+
+def ids(db, names: Iterable[str]) -> dict[str, int]:
+    return get_or_create(db, names)[0]
+
+
+def map_topics(db, pairs: Iterable[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Insert (article_id, topic_id) mappings, skipping existing ones. Returns the pairs added. Caller commits."""
+    rows = [{"article_id": a, "topic_id": t} for a, t in dict.fromkeys(pairs)]
+    if not rows:
+        return []
+    stmt = (
+        upsert(ArticleTopic)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=[ArticleTopic.article_id, ArticleTopic.topic_id])
+        .returning(ArticleTopic.article_id, ArticleTopic.topic_id)
+    )
+    added = [tuple(r) for r in db.execute(stmt)]
+    # Core insert, so the rollup hooks don't see it
+    mark_topics(db, added)
+    return added
+
+
+def stats() -> dict:
+    with _lock:
+        return {"topics": len(_ids), **_counts}
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish(session):
+    created = session.info.pop(_PENDING, None)
+    if created:
+        with _lock:
+            _ids.update(created)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard(session):
+    session.info.pop(_PENDING, None)
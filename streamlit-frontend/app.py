@@ -875,6 +875,7 @@ def article_analytics_page():
         sentiment = {}
         entities = []
         topics = {}
+        related = None
 
         # Keywords Extraction
         try:
@@ -894,16 +895,26 @@ def article_analytics_page():
         except Exception as e:
             st.warning(f"Sentiment/Entity analysis failed: {e}")
 
-        # Topic Modeling
-        try:
-            resp = requests.post(
-                f"{API_BASE}/topics",
-                json={"articles": [analysis_text], "num_topics": 3},
-            )
-            if resp.status_code == 200:
-                topics = resp.json()
-        except Exception as e:
-            st.warning(f"Topic modeling failed: {e}")
+        # Related coverage from the embedding index; stored articles only
+        if article.get("article_id"):
+            try:
+                resp = requests.get(f"{API_BASE}/articles/{article['article_id']}/related", params={"k": 5})
+                if resp.status_code == 200:
+                    related = resp.json().get("related", [])
+            except Exception as e:
+                st.warning(f"Related articles lookup failed: {e}")
+
+        # Topic Modeling (fallback when there is no related coverage)
+        if not related:
+            try:
+                resp = requests.post(
+                    f"{API_BASE}/topics",
+                    json={"articles": [analysis_text], "num_topics": 3},
+                )
+                if resp.status_code == 200:
+                    topics = resp.json()
+            except Exception as e:
+                st.warning(f"Topic modeling failed: {e}")
 
     col1, col2 = st.columns(2)
 
@@ -918,22 +929,32 @@ def article_analytics_page():
             st.info("No keywords detected")
         st.markdown("</div>", unsafe_allow_html=True)
 
-        # Topic Modeling Section
+        # Related Coverage / Topic Modeling Section
         st.markdown('<div class="analytics-section">', unsafe_allow_html=True)
-        st.markdown('<div class="analytics-title">📝 Topics</div>', unsafe_allow_html=True)
-        topic_list = topics.get("topics", [])
-        if topic_list:
-            for topic in topic_list:
+        if related:
+            st.markdown('<div class="analytics-title">🔗 Related Coverage</div>', unsafe_allow_html=True)
+            for rel in related:
                 st.markdown(
-                    f'<div class="topic-tag"><strong>{topic["label"]}</strong>: '
-                    + ", ".join(topic["keywords"])
-                    + f" <span style='color:#999'>(Docs: {topic['count']})</span></div>",
+                    f'<div class="topic-tag"><a href="{rel.get("url", "#")}" target="_blank">'
+                    f'<strong>{rel.get("title", "")}</strong></a> '
+                    f"<span style='color:#999'>({rel.get('source', '')}, similarity {rel.get('similarity', 0):.2f})</span></div>",
                     unsafe_allow_html=True,
                 )
-        elif "error" in topics:
-            st.info(topics["error"])
         else:
-            st.info("No topics detected")
+            st.markdown('<div class="analytics-title">📝 Topics</div>', unsafe_allow_html=True)
+            topic_list = topics.get("topics", [])
+            if topic_list:
+                for topic in topic_list:
+                    st.markdown(
+                        f'<div class="topic-tag"><strong>{topic["label"]}</strong>: '
+                        + ", ".join(topic["keywords"])
+                        + f" <span style='color:#999'>(Docs: {topic['count']})</span></div>",
+                        unsafe_allow_html=True,
+                    )
+            elif "error" in topics:
+                st.info(topics["error"])
+            else:
+                st.info("No topics detected")
         st.markdown("</div>", unsafe_allow_html=True)
 
         # Named Entity Recognition
@@ -173,14 +173,9 @@ def run():
             return "Unlabeled"
         df["topic"] = df.apply(_fallback_topic, axis=1)
 
-    # Country filter (coarse buckets; replace with reverse geocode later)
-    def _bucket_country(lat, lon):
-        if 5 <= lat <= 37 and 68 <= lon <= 97: return "India"
-        if 24 <= lat <= 49 and -125 <= lon <= -66: return "USA"
-        if 35 <= lat <= 72 and -10 <= lon <= 40: return "Europe"
-        if -45 <= lat <= -10 and -75 <= lon <= -34: return "Brazil"
-        return "Other"
-    df["country"] = df.apply(lambda r: _bucket_country(float(r["lat"]), float(r["lon"])), axis=1)
+    # Country filter (reverse-geocoded server-side from country polygons)
+    if "country" not in df.columns: df["country"] = "Other"
+    df["country"] = df["country"].fillna("Other")
     countries = ["All"] + sorted(df["country"].unique().tolist())
     country_idx = countries.index(q_country) if q_country and q_country in countries else 0
     country = st.selectbox("Country", countries, index=country_idx, key="geo_country")
@@ -0,0 +1,132 @@
+# tools/bench_lean_queries.py
+#
+# ORM entities vs the Core selects in backend/lean_queries.py, reading the
+# same five article columns: rows/sec (best of --repeat) and peak Python
+# memory per 100k rows (tracemalloc, includes the result itself).
+#
+# Runs against a throwaway SQLite file seeded with --rows articles, so it needs
+# no server and is reproducible. --use-env-db reads the configured database
+# instead (no seeding; --rows caps the read).
+#
+#   python tools/bench_lean_queries.py                     # 100k rows
+#   python tools/bench_lean_queries.py --rows 500000 --repeat 5
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COLUMNS = ("id", "title", "lat", "lon", "published_at")
+
+
+def seed(engine, n: int, seed: int = 1):
+    from backend.models import Article
+
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1)
+    rows = [
+        {
+            "title": f"Article {i} " + "x" * rng.randrange(20, 80),
+            "description": "d" * rng.randrange(50, 200),
+            "body": "b" * rng.randrange(500, 2000),     # what the ORM path drags along
+            "url": f"https://example.com/{i}",
+            "source": "bench",
+            "published_at": base + timedelta(seconds=rng.randrange(365 * 86400)),
+            "lat": rng.uniform(-60, 70),
+            "lon": rng.uniform(-180, 180),
+        }
+        for i in range(n)
+    ]
+    with engine.begin() as conn:
+        for i in range(0, n, 10_000):
+            conn.execute(Article.__table__.insert(), rows[i:i + 10_000])
+
+
+def make_paths(limit: int):
+    from sqlalchemy import select
+
+    from backend import lean_queries as lean
+    from backend.models import Article
+
+    cols = [getattr(Article, c) for c in COLUMNS]
+
+    def orm(db):
+        return [tuple(getattr(a, c) for c in COLUMNS) for a in db.query(Article).limit(limit).all()]
+
+    def core_tuples(db):
+        return db.execute(select(*cols).limit(limit)).all()
+
+    def core_numpy(db):
+        return lean.to_numpy(db.execute(select(*cols).limit(limit)), {"id": int, "lat": float, "lon": float})
+
+    def core_arrow(db):
+        return lean.to_arrow(db.execute(select(*cols).limit(limit)))
+
+    paths = {"orm_entities": orm, "core_tuples": core_tuples, "core_numpy": core_numpy}
+    try:
+        import pyarrow  # noqa: F401
+        paths["core_arrow"] = core_arrow
+    except ImportError:
+        print("pyarrow not installed, skipping core_arrow")
+    return paths
+
+
+def _len(result) -> int:
+    if isinstance(result, dict):
+        return len(next(iter(result.values())))
+    return getattr(result, "num_rows", None) or len(result)
+
+
+def measure(SessionLocal, fn, repeat: int) -> dict:
+    best, n = float("inf"), 0
+    for _ in range(repeat):
+        with SessionLocal() as db:
+            t0 = time.perf_counter()
+            n = _len(fn(db))
+            best = min(best, time.perf_counter() - t0)
+    with SessionLocal() as db:
+        tracemalloc.start()
+        result = fn(db)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+    return {"rows": n, "rows_per_s": n / best if best else 0.0, "mb_per_100k": peak / 1e6 * 100_000 / max(n, 1)}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark ORM vs Core read paths")
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--use-env-db", action="store_true", help="read the configured database instead of a seeded SQLite file")
+    args = ap.parse_args()
+
+    tmp = None
+    if not args.use_env_db:
+        tmp = tempfile.mkdtemp(prefix="bench_lean_")
+        os.environ["DB_BACKEND"] = "sqlite"
+        os.environ["SQLITE_PATH"] = os.path.join(tmp, "bench.db")
+
+    from backend.database import Base, SessionLocal, engine
+    from backend import models  # noqa: F401
+
+    if tmp:
+        Base.metadata.create_all(engine)
+        t0 = time.perf_counter()
+        seed(engine, args.rows)
+        print(f"seeded {args.rows} articles in {time.perf_counter() - t0:.1f}s")
+
+    results = {name: measure(SessionLocal, fn, args.repeat) for name, fn in make_paths(args.rows).items()}
+    base = results["orm_entities"]
+    print(f"\n{'path':<14} {'rows':>8} {'rows/s':>12} {'MB/100k':>9} {'speedup':>8} {'memory':>7}")
+    for name, r in results.items():
+        print(f"{name:<14} {r['rows']:>8} {r['rows_per_s']:>12,.0f} {r['mb_per_100k']:>9.1f} "
+              f"{r['rows_per_s'] / base['rows_per_s']:>7.1f}x {r['mb_per_100k'] / base['mb_per_100k']:>6.2f}x")
+    if tmp:
+        engine.dispose()
+        shutil.rmtree(tmp, ignore_errors=True)
@@ -0,0 +1,80 @@
+# tools/bench_timestamps.py
+#
+# Micro-benchmark: timestamps.parse_batch vs the per-item parsing it replaced
+# (dateutil first, as ingest_gdelt did before it moved to timestamps.py).
+#
+#   python tools/bench_timestamps.py                  # 1M values per format
+#   python tools/bench_timestamps.py --n 200000 --baseline-sample 20000
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dateutil import parser as dtparser  # noqa: E402
+
+from backend.timestamps import parse_batch  # noqa: E402
+
+FORMATS = {
+    "gdelt": lambda dt: dt.strftime("%Y%m%dT%H%M%SZ"),
+    "newsapi": lambda dt: dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    "iso_offset": lambda dt: dt.astimezone(timezone(timedelta(hours=5, minutes=30))).isoformat(),
+    "compact": lambda dt: dt.strftime("%Y%m%d%H%M%S"),
+}
+
+
+def make_values(fmt: str, n: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    render = FORMATS[fmt]
+    return [render(base + timedelta(seconds=rng.randrange(365 * 86400))) for _ in range(n)]
+
+
+def old_parse(s: str):
+    # the pre-timestamps.py path: dateutil for everything
+    try:
+        return dtparser.parse(s)
+    except Exception:
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=1_000_000)
+    ap.add_argument("--batch", type=int, default=200, help="values per parse_batch call (ingest batch size)")
+    ap.add_argument("--baseline-sample", type=int, default=50_000,
+                    help="dateutil is timed on this many values and extrapolated to --n")
+    args = ap.parse_args()
+
+    print(f"{'format':<11} {'parse_batch':>12} {'dateutil':>12} {'speedup':>8}   values/s (batch)")
+    for fmt in FORMATS:
+        values = make_values(fmt, args.n)
+
+        t0 = time.perf_counter()
+        stats = {}
+        out = []
+        for i in range(0, len(values), args.batch):
+            out.extend(parse_batch(values[i:i + args.batch], stats=stats))
+        new = time.perf_counter() - t0
+        assert all(dt is not None and dt.tzinfo is not None for dt in out)
+
+        sample = values[:min(args.baseline_sample, args.n)]
+        t0 = time.perf_counter()
+        for v in sample:
+            old_parse(v)
+        old = (time.perf_counter() - t0) * (args.n / len(sample))
+
+        # same instants as dateutil
+        for v, dt in zip(sample[:1000], out[:1000]):
+            ref = dtparser.parse(v)
+            assert (ref if ref.tzinfo else ref.replace(tzinfo=timezone.utc)) == dt, (v, dt)
+
+        print(f"{fmt:<11} {new:>11.2f}s {old:>11.2f}s {old / new:>7.1f}x   {args.n / new:,.0f}"
+              f"  (detected {stats['format']}, last batch fallback {stats['fallback']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,45 @@
-import os, sys
+# tools/geocode_backfill.py
+#
+# Fill Article.lat/lon from Article.location using the bundled offline gazetteer.
+#   python tools/geocode_backfill.py              # offline only, no network
+#   python tools/geocode_backfill.py --nominatim  # also try Nominatim for gazetteer misses
+import argparse
+import os
+import sys
 from time import sleep
-from geopy.geocoders import Nominatim
-from backend.database import SessionLocal
-from backend.models import Article
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-geoloc = Nominatim(user_agent="news-geo")
-
-db = SessionLocal()
-try:
-    rows = (
-        db.query(Article)
-        .filter(Article.location.isnot(None))
-        .filter((Article.lat.is_(None)) | (Article.lon.is_(None)))
-        .filter(Article.published_at.isnot(None))         # Only update articles with a timestamp
-        .all()
-    )
-
-    seen: dict[str, tuple[float | None, float | None]] = {}
-    updated = 0
-    skipped = 0
-    failed_locs = []
-
-    for a in rows:
-        loc = (a.location or "").strip()
-        if not loc:
-            skipped += 1
-            continue
-        if loc not in seen:
-            try:
-                r = geoloc.geocode(loc, timeout=10)
-                seen[loc] = (r.latitude, r.longitude) if r else (None, None)
-                if not r:
-                    failed_locs.append(loc)
-                sleep(1.1)  # Respect Nominatim rate limit
-            except Exception as e:
-                print(f"Geocoding failed for location '{loc}': {e}")
-                seen[loc] = (None, None)
-                failed_locs.append(loc)
-        lat, lon = seen[loc]
-        if lat is not None and lon is not None:
-            a.lat, a.lon = float(lat), float(lon)
-            updated += 1
-            if updated % 50 == 0:    # Commit in larger batches for speed
-                db.commit()
-                print(f"Updated {updated} rows...")
-    db.commit()
-    print(f"Done. Updated {updated} rows, skipped {skipped} empty locations.")
-    if failed_locs:
+
+from backend.gazetteer import GeoMatch, geocode_offline
+from backend.geo_backfill import run_backfill
+
+
+def nominatim_fallback():
+    from geopy.geocoders import Nominatim
+    geoloc = Nominatim(user_agent="news-geo")
+
+    def resolve(loc: str):
+        m = geocode_offline(loc)
+        if m:
+            return m
+        try:
+            r = geoloc.geocode(loc, timeout=10)
+            sleep(1.1)  # Respect Nominatim rate limit
+        except Exception as e:
+            print(f"Geocoding failed for location '{loc}': {e}")
+            return None
+        return GeoMatch(r.latitude, r.longitude, loc, "unknown", "nominatim", 0.5) if r else None
+
+    return resolve
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--nominatim", action="store_true", help="network fallback for gazetteer misses")
+    args = ap.parse_args()
+
+    report = run_backfill(nominatim_fallback() if args.nominatim else geocode_offline)
+    if report["failed_locations"]:
         print("Failed to geocode the following locations:")
-        for loc in set(failed_locs):
+        for loc in report["failed_locations"]:
             print(loc)
-finally:
-    db.close()
@@ -0,0 +1,181 @@
+# tools/load_test.py
+#
+# Closed-loop HTTP load test for the read endpoints: N concurrent clients on
+# keep-alive connections, each sending the next request as soon as the last
+# one returns. Reports requests/s, latency percentiles and errors per
+# concurrency level. Stdlib only (asyncio streams), no client dependencies.
+#
+# Comparing the async handlers with the previous sync ones: serve the commit
+# before the async change from a worktree on another port, against the same DB.
+#
+#   git worktree add /tmp/appnews-sync <commit-before-async>
+#   (cd /tmp/appnews-sync && uvicorn backend.main:app --port 8001) &
+#   uvicorn backend.main:app --port 8000 &
+#   python tools/load_test.py --base http://127.0.0.1:8001 --label sync --out sync.json
+#   python tools/load_test.py --base http://127.0.0.1:8000 --label async --out async.json --baseline sync.json
+#
+# Add --admin-token <token> to include the admin endpoints. At 500 clients a
+# single client process can become the bottleneck; check its CPU usage.
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+PATHS = [
+    "/analytics/trend?days=30",
+    "/analytics/trend_public?days=30",
+    "/geo/heat?days=7",
+]
+ADMIN_PATHS = [
+    "/admin/stats/trend?days=30",
+    "/admin/insights?days=30",
+    "/admin/topics/summary?days=30",
+]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.statuses: dict[int, int] = {}
+
+
+async def _read_response(reader) -> int:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    length, chunked = 0, False
+    close = status_line.startswith(b"HTTP/1.0")     # unless it says keep-alive
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value:
+            chunked = True
+        elif name == "connection":
+            close = value == "close"
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return -status if close else status
+
+
+async def _client(host, port, paths, headers, stop_at, stats, offset):
+    reader = writer = None
+    i = offset
+    while time.perf_counter() < stop_at:
+        path = paths[i % len(paths)]
+        i += 1
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n{headers}\r\n".encode())
+            t0 = time.perf_counter()
+            status = await _read_response(reader)
+            elapsed = time.perf_counter() - t0
+            if status < 0:      # server asked to close
+                status = -status
+                writer.close()
+                writer = None
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if 200 <= status < 300:
+                stats.latencies.append(elapsed)
+            else:
+                stats.errors += 1
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            stats.errors += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def run_level(base: str, paths: list[str], concurrency: int, duration: float, warmup: float,
+                    headers: str) -> dict:
+    u = urlsplit(base)
+    host, port = u.hostname, u.port or 80
+    if warmup:
+        await asyncio.gather(*(_client(host, port, paths, headers, time.perf_counter() + warmup, Stats(), k)
+                               for k in range(min(concurrency, 20))))
+    stats = Stats()
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, paths, headers, t0 + duration, stats, k)
+                           for k in range(concurrency)))
+    wall = time.perf_counter() - t0
+    lat = sorted(stats.latencies)
+
+    def pct(p):
+        return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 1) if lat else None
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(lat),
+        "errors": stats.errors,
+        "rps": round(len(lat) / wall, 1),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "mean_ms": round(statistics.fmean(lat) * 1000, 1) if lat else None,
+        "statuses": stats.statuses,
+    }
+
+
+def print_table(label: str, results: list[dict], baseline: dict | None = None):
+    base = {r["concurrency"]: r for r in (baseline or {}).get("levels", [])}
+    print(f"\n{label}")
+    print(f"{'clients':>8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+          + (f" {'vs ' + baseline['label']:>12}" if baseline else ""))
+    for r in results:
+        line = (f"{r['concurrency']:>8} {r['rps']:>9} {r['p50_ms'] or '-':>8} {r['p95_ms'] or '-':>8} "
+                f"{r['p99_ms'] or '-':>8} {r['errors']:>7}")
+        b = base.get(r["concurrency"])
+        if b and b["rps"]:
+            line += f" {r['rps'] / b['rps']:>11.2f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Load test the read endpoints at increasing concurrency")
+    ap.add_argument("--base", default="http://127.0.0.1:8000")
+    ap.add_argument("--concurrency", default="50,100,200,500")
+    ap.add_argument("--duration", type=float, default=15.0, help="seconds per level")
+    ap.add_argument("--warmup", type=float, default=2.0)
+    ap.add_argument("--paths", nargs="*", default=None, help="override the default endpoint list")
+    ap.add_argument("--admin-token", default=None)
+    ap.add_argument("--label", default="run")
+    ap.add_argument("--out", default=None, help="write results as JSON")
+    ap.add_argument("--baseline", default=None, help="JSON from an earlier run to compare against")
+    args = ap.parse_args()
+
+    paths = args.paths or (PATHS + (ADMIN_PATHS if args.admin_token else []))
+    headers = f"Authorization: Bearer {args.admin_token}\r\n" if args.admin_token else ""
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    results = []
+    for c in levels:
+        r = asyncio.run(run_level(args.base, paths, c, args.duration, args.warmup, headers))
+        print(f"[{args.label}] {c} clients: {r['rps']} req/s, p95 {r['p95_ms']} ms, {r['errors']} errors")
+        results.append(r)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_table(args.label, results, baseline)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"label": args.label, "base": args.base, "paths": paths, "levels": results}, f, indent=2)
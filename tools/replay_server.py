@@ -0,0 +1,475 @@
+# tools/replay_server.py
+#
+# Offline stand-in for the upstream news APIs, for ingestion and end-to-end
+# benchmarks on an isolated machine. Serves:
+#
+#   /v2/everything      NewsAPI "everything" (q, language, pageSize, page)
+#   /api/v2/doc/doc     GDELT DOC 2.0 ArtList (timespan or start/enddatetime, maxrecords cap 250)
+#   /articles/<n>.html  article pages for full-text hydration, plus /robots.txt
+#   /pages/<case>.html  hydration edge cases: utf8-nocharset, latin1-meta, truncated
+#   /feeds/<name>       RSS/Atom: synthetic.rss, synthetic.atom, or files from --fixtures DIR/feeds/;
+#                       ETag/Last-Modified with 304 on If-None-Match / If-Modified-Since
+#   /__stats            request/error counters
+#
+# Responses come from recorded fixtures (--fixtures DIR with newsapi.json /
+# gdelt.json, as saved by --record) or a deterministic synthetic corpus.
+#
+#   python tools/replay_server.py --articles 5000 --latency-ms 80 --error-rate 0.02
+#   NEWSAPI_BASE_URL=http://127.0.0.1:8766/v2/everything \
+#   GDELT_BASE_URL=http://127.0.0.1:8766/api/v2/doc/doc  uvicorn backend.main:app
+#
+#   python tools/replay_server.py --check      # self-check against the real clients,
+#                                              # incl. plain vs sharded GDELT fetch past the cap,
+#                                              # feeds, and hydration of the /pages edge cases
+#   python tools/replay_server.py --record fixtures/ --query climate   # save live responses
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+GDELT_CAP = 250
+GDELT_TS = "%Y%m%dT%H%M%SZ"
+
+SOURCES = [("reuters", "Reuters", "reuters.com", "US"), ("bbc-news", "BBC News", "bbc.co.uk", "GB"),
+           ("the-hindu", "The Hindu", "thehindu.com", "IN"), ("abc-news-au", "ABC News", "abc.net.au", "AU"),
+           ("le-monde", "Le Monde", "lemonde.fr", "FR"), ("cbc-news", "CBC News", "cbc.ca", "CA")]
+SUBJECTS = ["AI startup", "central bank", "climate summit", "chipmaker", "election commission",
+            "tech regulator", "monsoon forecast", "stock market", "EV maker", "space agency"]
+VERBS = ["unveils", "warns over", "delays", "expands", "cuts", "backs", "probes", "reports record"]
+OBJECTS = ["new model", "interest rates", "emissions targets", "factory plans", "voter rolls",
+           "privacy rules", "crop outlook", "quarterly profit", "battery supply", "lunar mission"]
+FILLER = ("Officials said the decision followed months of consultation with industry groups and "
+          "analysts expect further announcements in the coming weeks. ")
+
+
+# ---------------------------------------------------
+# Corpus
+# ---------------------------------------------------
+
+def synthetic_corpus(n: int, hours: int, base_url: str, seed: int = 7, dup_rate: float = 0.15,
+                     payload_bytes: int = 0) -> list[dict]:
+    """
+    n articles spread over the last `hours`, newest first, in a neutral shape that
+    both API renderers map from. ~dup_rate of them are syndicated copies with a
+    slightly different title (exercises near-duplicate detection).
+    """
+    rng = random.Random(seed)
+    end = datetime.utcnow().replace(microsecond=0)
+    out = []
+    for i in range(n):
+        if out and rng.random() < dup_rate:
+            src = rng.choice(out)
+            title = re.sub(r"\s+-\s+.*$", "", src["title"]) + f" - {rng.choice(SOURCES)[1]}"
+            description = src["description"]
+        else:
+            title = f"{rng.choice(SUBJECTS).capitalize()} {rng.choice(VERBS)} {rng.choice(OBJECTS)}"
+            description = f"{title}. " + FILLER
+        source = rng.choice(SOURCES)
+        if payload_bytes and len(description) < payload_bytes:
+            description = (description + FILLER * (payload_bytes // len(FILLER) + 1))[:payload_bytes]
+        out.append({
+            "n": i,
+            "title": title,
+            "description": description,
+            "url": f"{base_url}/articles/{i}.html",
+            "image": f"{base_url}/images/{i}.jpg",
+            "published": end - timedelta(seconds=rng.uniform(0, hours * 3600)),
+            "source": source,
+        })
+    out.sort(key=lambda a: a["published"], reverse=True)
+    return out
+
+
+def as_newsapi(a: dict) -> dict:
+    sid, name, _, _ = a["source"]
+    return {
+        "source": {"id": sid, "name": name},
+        "author": None,
+        "title": a["title"],
+        "description": a["description"],
+        "url": a["url"],
+        "urlToImage": a["image"],
+        "publishedAt": a["published"].strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "content": a["description"][:200],
+    }
+
+
+def as_gdelt(a: dict) -> dict:
+    _, _, domain, country = a["source"]
+    return {
+        "url": a["url"],
+        "url_mobile": "",
+        "title": a["title"],
+        "seendate": a["published"].strftime(GDELT_TS),
+        "socialimage": a["image"],
+        "domain": domain,
+        "language": "English",
+        "sourcecountry": country,
+    }
+
+
+def article_html(a: dict) -> str:
+    paras = "".join(f"<p>{a['description']} {FILLER * 2}</p>" for _ in range(4))
+    return (f"<html><head><title>{a['title']}</title></head><body>"
+            f"<nav><a href='/'>Home</a></nav><article><h1>{a['title']}</h1>{paras}</article>"
+            f"<footer>replay server</footer></body></html>")
+
+
+PAGE_TEXT = "Café society in Zürich: naïve résumés, São Paulo and Kraków. " * 8
+
+
+def edge_page(case: str) -> tuple[bytes, str, int | None] | None:
+    """(body, Content-Type, Content-Length override) for a /pages/<case>.html edge case."""
+    html = f"<html><head>{{meta}}<title>Edge case</title></head><body><article><p>{PAGE_TEXT}</p></article></body></html>"
+    if case == "utf8-nocharset":
+        # requests would decode this as ISO-8859-1
+        return html.format(meta="").encode("utf-8"), "text/html", None
+    if case == "latin1-meta":
+        return html.format(meta='<meta charset="iso-8859-1">').encode("latin-1"), "text/html", None
+    if case == "truncated":
+        # promises more bytes than it sends, then drops the connection mid-body
+        body = html.format(meta="").encode("utf-8")
+        return body[:len(body) // 2], "text/html; charset=utf-8", len(body)
+    return None
+
+
+def synthetic_feed(corpus: list[dict], kind: str, limit: int = 50) -> bytes:
+    from xml.sax.saxutils import escape
+    items = corpus[:limit]
+    if kind == "atom":
+        entries = "".join(
+            f"<entry><title>{escape(a['title'])}</title><link href=\"{a['url']}\"/>"
+            f"<id>urn:replay:{a['n']}</id><updated>{a['published'].strftime('%Y-%m-%dT%H:%M:%SZ')}</updated>"
+            f"<summary>{escape(a['description'])}</summary></entry>" for a in items)
+        return (f'<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+                f"<title>Replay synthetic (Atom)</title>{entries}</feed>").encode()
+    rss_items = "".join(
+        f"<item><title>{escape(a['title'])}</title><link>{a['url']}</link>"
+        f"<pubDate>{format_datetime(a['published'].replace(tzinfo=timezone.utc), usegmt=True)}</pubDate>"
+        f"<description>{escape(a['description'])}</description></item>" for a in items)
+    return (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f"<title>Replay synthetic (RSS)</title>{rss_items}</channel></rss>").encode()
+
+
+# ---------------------------------------------------
+# Server
+# ---------------------------------------------------
+
+def _parse_timespan(s: str) -> timedelta | None:
+    m = re.fullmatch(r"(\d+)\s*(min|h|d|w)?", (s or "").strip().lower())
+    if not m:
+        return None
+    n, unit = int(m.group(1)), m.group(2) or "min"
+    return {"min": timedelta(minutes=n), "h": timedelta(hours=n), "d": timedelta(days=n),
+            "w": timedelta(weeks=n)}[unit]
+
+
+def _matches(text: str, query: str) -> bool:
+    # "(AI OR climate)" / "climate" -> any term; an empty or "stub" query matches everything
+    terms = [t for t in re.split(r"\s+OR\s+|[()\"]", query or "") if t.strip()]
+    terms = [t.strip().lower() for t in terms if t.strip().lower() not in ("and", "stub")]
+    text = text.lower()
+    return not terms or any(t in text for t in terms)
+
+
+class ReplayState:
+    def __init__(self, corpus, newsapi_fixture=None, gdelt_fixture=None, latency_ms=0.0, jitter_ms=0.0,
+                 error_rate=0.0, trickle_ms=0.0, seed=7, feeds_dir=None):
+        self.corpus = corpus
+        self.feeds_dir = feeds_dir
+        self.by_n = {a["n"]: a for a in corpus}
+        self.newsapi_fixture = newsapi_fixture
+        self.gdelt_fixture = gdelt_fixture
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.trickle_ms = trickle_ms
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts: dict[str, int] = {}
+
+    def count(self, key: str):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            with self.lock:
+                ms = max(0.0, self.rng.gauss(self.latency_ms, self.jitter_ms))
+            time.sleep(ms / 1000)
+
+    def should_fail(self) -> bool:
+        if not self.error_rate:
+            return False
+        with self.lock:
+            return self.rng.random() < self.error_rate
+
+
+def make_handler(state: ReplayState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, body: bytes, ctype: str = "application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if state.trickle_ms and len(body) > 16384:
+                # dribble large bodies out to exercise the streaming parsers
+                for i in range(0, len(body), 16384):
+                    self.wfile.write(body[i:i + 16384])
+                    self.wfile.flush()
+                    time.sleep(state.trickle_ms / 1000)
+            else:
+                self.wfile.write(body)
+
+        def _json(self, status: int, obj):
+            self._send(status, json.dumps(obj).encode())
+
+        def do_GET(self):
+            u = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(u.query).items()}
+            route = u.path.rstrip("/") or "/"
+
+            if route == "/__stats":
+                return self._json(200, {"requests": state.counts, "articles": len(state.corpus)})
+            if route == "/robots.txt":
+                return self._send(200, b"User-agent: *\nAllow: /\n", "text/plain")
+
+            state.count(route if not route.startswith("/articles/") else "/articles")
+            state.delay()
+            if state.should_fail():
+                state.count("errors")
+                if route == "/v2/everything":
+                    return self._json(429, {"status": "error", "code": "rateLimited",
+                                            "message": "replay server: injected error"})
+                return self._send(500, b"replay server: injected error", "text/plain")
+
+            if route == "/v2/everything":
+                return self._newsapi(q)
+            if route == "/api/v2/doc/doc":
+                return self._gdelt(q)
+            if route.startswith("/feeds/"):
+                return self._feed(route[len("/feeds/"):])
+            m = re.fullmatch(r"/pages/([\w-]+)\.html", route)
+            if m and edge_page(m.group(1)):
+                return self._edge(*edge_page(m.group(1)))
+            m = re.fullmatch(r"/articles/(\d+)\.html", route)
+            if m and int(m.group(1)) in state.by_n:
+                return self._send(200, article_html(state.by_n[int(m.group(1))]).encode(),
+                                  "text/html; charset=utf-8")
+            return self._send(404, b"not found", "text/plain")
+
+        def _edge(self, body: bytes, ctype: str, length: int | None):
+            if length is None:
+                return self._send(200, body, ctype)
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(length))
+            self.end_headers()
+            self.wfile.write(body)
+            self.close_connection = True
+
+        def _newsapi(self, q):
+            if state.newsapi_fixture is not None:
+                return self._json(200, state.newsapi_fixture)
+            rows = [a for a in state.corpus if _matches(f"{a['title']} {a['description']}", q.get("q"))]
+            size = min(int(q.get("pageSize", 20)), 100)
+            page = max(1, int(q.get("page", 1)))
+            items = [as_newsapi(a) for a in rows[(page - 1) * size:page * size]]
+            self._json(200, {"status": "ok", "totalResults": len(rows), "articles": items})
+
+        def _gdelt(self, q):
+            if state.gdelt_fixture is not None:
+                return self._json(200, state.gdelt_fixture)
+            rows = [a for a in state.corpus if _matches(a["title"], q.get("query"))]
+            if "startdatetime" in q and "enddatetime" in q:
+                lo = datetime.strptime(q["startdatetime"], "%Y%m%d%H%M%S")
+                hi = datetime.strptime(q["enddatetime"], "%Y%m%d%H%M%S")
+                rows = [a for a in rows if lo <= a["published"] < hi]
+            elif _parse_timespan(q.get("timespan")):
+                since = datetime.utcnow() - _parse_timespan(q["timespan"])
+                rows = [a for a in rows if a["published"] >= since]
+            if q.get("sort", "").lower() == "dateasc":
+                rows = rows[::-1]
+            cap = min(int(q.get("maxrecords", 75)), GDELT_CAP)
+            self._json(200, {"articles": [as_gdelt(a) for a in rows[:cap]]})
+
+        def _feed(self, name: str):
+            if name in ("synthetic.rss", "synthetic.atom"):
+                body = synthetic_feed(state.corpus, name.rsplit(".", 1)[1])
+                newest = state.corpus[0]["published"] if state.corpus else datetime.utcnow()
+            else:
+                path = os.path.join(state.feeds_dir or "", os.path.basename(name))
+                if not state.feeds_dir or not os.path.isfile(path):
+                    return self._send(404, b"no such feed", "text/plain")
+                with open(path, "rb") as f:
+                    body = f.read()
+                newest = datetime.utcfromtimestamp(os.path.getmtime(path))
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            last_modified = format_datetime(newest.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True)
+
+            inm = self.headers.get("If-None-Match")
+            ims = self.headers.get("If-Modified-Since")
+            fresh = inm == etag if inm else False
+            if not inm and ims:
+                try:
+                    fresh = parsedate_to_datetime(ims) >= parsedate_to_datetime(last_modified)
+                except (TypeError, ValueError):
+                    fresh = False
+            if fresh:
+                state.count("feeds_304")
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            state.count("feeds_200")
+            self.send_response(200)
+            ctype = "application/atom+xml" if body.lstrip().find(b"<feed") != -1 else "application/rss+xml"
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def _load_fixture(directory: str | None, name: str):
+    if not directory:
+        return None
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record(directory: str, query: str, hours: int):
+    """Save one live NewsAPI and one live GDELT response as fixtures."""
+    import requests
+    from backend.config import NEWS_API_KEY
+    os.makedirs(directory, exist_ok=True)
+    r = requests.get("https://newsapi.org/v2/everything", timeout=30, params={
+        "q": query, "language": "en", "pageSize": 100, "sortBy": "publishedAt", "apiKey": NEWS_API_KEY})
+    with open(os.path.join(directory, "newsapi.json"), "w", encoding="utf-8") as f:
+        json.dump(r.json(), f)
+    r = requests.get("https://api.gdeltproject.org/api/v2/doc/doc", timeout=30, params={
+        "format": "JSON", "mode": "ArtList", "sort": "DateDesc", "maxrecords": GDELT_CAP,
+        "timespan": f"{hours}h", "query": query})
+    with open(os.path.join(directory, "gdelt.json"), "w", encoding="utf-8") as f:
+        json.dump(r.json(), f)
+    print(f"Recorded fixtures to {directory}")
+
+
+def self_check(base: str, n: int, hours: int):
+    # the clients read their endpoints from the environment at import, as a deployment would
+    os.environ["NEWSAPI_BASE_URL"] = f"{base}/v2/everything"
+    os.environ["GDELT_BASE_URL"] = f"{base}/api/v2/doc/doc"
+    from backend import gdelt_client, news_service
+
+    t0 = time.perf_counter()
+    news = list(news_service.iter_news("climate", page_size=100))
+    plain = gdelt_client.fetch_docs(hours=hours, query="stub", max_records=GDELT_CAP)
+    docs = gdelt_client.fetch_docs_sharded(query="stub", hours=hours, shard_hours=4, rate_per_sec=100)
+    elapsed = time.perf_counter() - t0
+    print(f"newsapi: {len(news)} articles  gdelt plain: {len(plain)}  sharded: {len(docs)}/{n}  in {elapsed:.2f}s")
+    assert news and all("climate" in f"{a['title']} {a['description']}".lower() for a in news)
+    assert len(plain) == min(n, GDELT_CAP), "plain GDELT fetch should stop at maxrecords"
+    urls = [d["url"] for d in docs]
+    assert len(urls) == len(set(urls)), "sharded result contains duplicate URLs"
+    assert len(docs) == n, "sharded GDELT fetch should see the whole synthetic corpus"
+
+    import requests
+    from backend.rss_ingest import fetch_feed, parse_feed
+    session = requests.Session()
+    for name in ("synthetic.rss", "synthetic.atom", "world.rss", "tech.atom"):
+        first = fetch_feed(session, f"{base}/feeds/{name}")
+        if first.status == 404:
+            continue  # fixture feeds need --fixtures
+        title, items = parse_feed(first.body)
+        again = fetch_feed(session, f"{base}/feeds/{name}", first.etag, first.last_modified)
+        print(f"feed {name}: {first.status} ({len(first.body)} bytes, {len(items)} items, '{title}') -> {again.status}")
+        assert first.status == 200 and items and all(d["url"] for d in items)
+        assert again.status == 304 and again.body is None
+
+    from backend.hydrate_fulltext import DomainGate, _hydrate_one
+    gate = DomainGate(delay=0.0)
+    body, status = _hydrate_one(gate, session, f"{base}/articles/0.html")
+    print(f"hydrate article: {status} ({len(body or '')} chars)")
+    assert status == "ok"
+    for case in ("utf8-nocharset", "latin1-meta"):
+        body, status = _hydrate_one(gate, session, f"{base}/pages/{case}.html")
+        print(f"hydrate {case}: {status}")
+        assert status == "ok" and PAGE_TEXT.strip() in body, "page decoded with the wrong charset"
+    body, status = _hydrate_one(gate, session, f"{base}/pages/truncated.html")
+    print(f"hydrate truncated: {status}")
+    assert body is None and status.startswith("error:"), status
+    print("OK")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay server for NewsAPI and GDELT DOC 2.0")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8766)
+    ap.add_argument("--articles", type=int, default=2000, help="synthetic corpus size")
+    ap.add_argument("--hours", type=int, default=24, help="synthetic corpus time span")
+    ap.add_argument("--dup-rate", type=float, default=0.15, help="share of syndicated near-duplicates")
+    ap.add_argument("--payload-bytes", type=int, default=0, help="pad descriptions to this size")
+    ap.add_argument("--fixtures", help="directory with recorded newsapi.json / gdelt.json and feeds/")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of API calls answered 429/500")
+    ap.add_argument("--trickle-ms", type=float, default=0.0, help="pause per 16 KB of large bodies")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--check", action="store_true", help="run the client self-check and exit")
+    ap.add_argument("--record", metavar="DIR", help="save live API responses as fixtures and exit")
+    ap.add_argument("--query", default="climate", help="query for --record")
+    args = ap.parse_args()
+
+    if args.record:
+        record(args.record, args.query, args.hours)
+        return
+
+    base = f"http://{args.host}:{args.port}"
+    corpus = synthetic_corpus(args.articles, args.hours, base, args.seed, args.dup_rate, args.payload_bytes)
+    state = ReplayState(corpus, _load_fixture(args.fixtures, "newsapi.json"),
+                        _load_fixture(args.fixtures, "gdelt.json"), args.latency_ms, args.jitter_ms,
+                        0.0 if args.check else args.error_rate, args.trickle_ms, args.seed,
+                        os.path.join(args.fixtures, "feeds") if args.fixtures else None)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+
+    if args.check:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            self_check(base, len(corpus), args.hours)
+        finally:
+            server.shutdown()
+        return
+
+    print(f"Replay server on {base} ({len(corpus)} synthetic articles"
+          f"{', fixtures from ' + args.fixtures if args.fixtures else ''})")
+    print(f"  NEWSAPI_BASE_URL={base}/v2/everything")
+    print(f"  GDELT_BASE_URL={base}/api/v2/doc/doc")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# tools/sqlite_check.py
+#
+# Self-check of the embedded SQLite backend (DB_BACKEND=sqlite): builds a
+# throwaway database from the models, seeds a few articles and runs the paths
+# that have SQLite-specific code against it:
+#
+#   schema        create_all + schema_upgrades.SQLITE_UPGRADES (news view, FTS5)
+#   coordination  job lease acquire / release
+#   enrichment    bulk sentiment + topic writes, rollups equal a full rebuild
+#   geocoding     geo_backfill.run_backfill (UPDATE ... FROM a VALUES CTE)
+#   search        /search query over FTS5, keyset pagination
+#   reads         lean_queries on the async engine (aiosqlite)
+#
+#   python tools/sqlite_check.py
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LOCATIONS = ["Paris, France", "Berlin", "Paris, France", "Nowhereville", None]
+
+
+def seed(SessionLocal):
+    from backend.models import Article
+
+    base = datetime.utcnow() - timedelta(days=2)
+    with SessionLocal() as db:
+        db.add_all([
+            Article(title=f"Central bank raises rates, part {i}", description="Inflation and the economy",
+                    body="Markets reacted to the central bank decision.", url=f"https://example.com/{i}",
+                    source="check", location=loc, published_at=base + timedelta(hours=7 * i))
+            for i, loc in enumerate(LOCATIONS)
+        ])
+        db.commit()
+        return [a.id for a in db.query(Article.id).order_by(Article.id)]
+
+
+def check_coordination():
+    from backend.coordination import make_lock
+
+    lock = make_lock("sqlite_check")
+    assert lock.try_acquire(), "lease not acquired"
+    lock.release()
+    print("coordination: lease acquired and released")
+
+
+def check_enrichment(SessionLocal, ids):
+    from backend import rollups
+    from backend.enrichment import write_enrichment
+    from backend.models import DailySentimentStat, DailyTopicStat
+
+    def snapshot():
+        with SessionLocal() as db:
+            topics = {(r.day, r.topic_id): (r.article_count, r.sentiment_count, round(r.sentiment_sum, 6))
+                      for r in db.query(DailyTopicStat)}
+            labels = {(r.day, r.label): (r.count, round(r.sentiment_sum, 6)) for r in db.query(DailySentimentStat)}
+        return topics, labels
+
+    with SessionLocal() as db:
+        n = write_enrichment(db, [
+            (aid, "t", {"label": "positive" if i % 2 else "negative", "score": 0.5 + i / 10,
+                        "topics": ["Finance", "Economy"]})
+            for i, aid in enumerate(ids)
+        ])
+        db.commit()
+    incremental = snapshot()
+    today = datetime.utcnow().date()
+    rollups.rebuild(today - timedelta(days=7), today)
+    assert snapshot() == incremental, "incremental rollups differ from a rebuild"
+    print(f"enrichment: {n} articles enriched, rollups match a full rebuild")
+
+
+def check_geocoding(SessionLocal):
+    from backend.geo_backfill import run_backfill
+    from backend.models import Article
+
+    report = run_backfill()
+    with SessionLocal() as db:
+        placed = db.query(Article).filter(Article.lat.isnot(None)).count()
+    assert report["updated_rows"] == placed == 3, report
+    assert report["failed_locations"] == ["Nowhereville"], report
+    print(f"geocoding: {report['updated_rows']} rows backfilled, failed {report['failed_locations']}")
+
+
+async def check_async_reads():
+    from backend import lean_queries as lean
+    from backend import search
+    from backend.async_database import AsyncSessionLocal, async_engine
+
+    try:
+        async with AsyncSessionLocal() as db:
+            first = await search.search_articles(db, "central bank", sort="date", limit=3)
+            rest = await search.search_articles(db, "central bank", sort="date", limit=3,
+                                                cursor=first["next_cursor"])
+            found = [r["article_id"] for r in first["results"] + rest["results"]]
+            assert len(found) == len(set(found)) == len(LOCATIONS), found
+            points = (await db.execute(lean.geo_points(datetime.utcnow() - timedelta(days=7)))).all()
+            assert points, "no geo points"
+    finally:
+        await async_engine.dispose()
+    print(f"search: {len(found)} articles over 2 pages; reads: {len(points)} geo points")
+
+
+if __name__ == "__main__":
+    tmp = tempfile.mkdtemp(prefix="sqlite_check_")
+    os.environ["DB_BACKEND"] = "sqlite"
+    os.environ["SQLITE_PATH"] = os.path.join(tmp, "check.db")
+    try:
+        from backend.database import Base, SessionLocal, engine
+        from backend import models  # noqa: F401
+        from backend.schema_upgrades import apply_upgrades
+
+        Base.metadata.create_all(engine)
+        apply_upgrades(engine)
+        ids = seed(SessionLocal)
+        check_coordination()
+        check_enrichment(SessionLocal, ids)
+        check_geocoding(SessionLocal)
+        asyncio.run(check_async_reads())
+        engine.dispose()
+        print("OK")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)